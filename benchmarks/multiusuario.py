@@ -0,0 +1,168 @@
+"""Rendimiento de la aplicación en modo multiusuario con muchas sesiones abiertas a la vez.
+
+Crea una base de datos por usuario en un directorio de perfiles temporal (varios
+usuarios pueden tener el mismo libro, como plantillas compartidas, y así la misma
+huella) y abre todas las sesiones de finanzas.py con AppTest en el mismo proceso:
+cada una entra con su usuario, calcula la cascada del mes y luego el simulador, paso
+por paso y sesión por sesión, con todas abiertas al mismo tiempo. Mide las sesiones
+por segundo, la latencia de cada paso, la memoria pico del proceso y la memoria que
+queda retenida por sesión abierta, y guarda los resultados en JSON.
+
+AppTest no admite ejecuciones simultáneas en varios hilos (cambia estado global de
+Streamlit), así que los pasos se intercalan en un solo hilo; en el servidor el GIL
+también serializa casi todo el trabajo de las ejecuciones del script.
+
+Uso:
+    python benchmarks/multiusuario.py [--sesiones 100] [--usuarios 50] [--libros-distintos 10]
+                                      [--items 1000] [--salida resultados_multiusuario.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+def _memoria_mb() -> float:
+    """Memoria residente actual del proceso (Linux; 0 si no se puede leer)"""
+    try:
+        paginas = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return 0.0
+    return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+def _registros(libro) -> list[dict]:
+    """Registros de un libro sintético listos para guardar_registros (NaN como None)"""
+    registros = libro.df.astype(object).where(libro.df.notna(), None).to_dict("records")
+    if libro.tabla == "gastos":
+        for registro, propia, fila in zip(registros, libro.personalizada, libro.distribucion):
+            registro["Distribucion semanas"] = (
+                {f"Semana {i}": float(monto) for i, monto in enumerate(fila, start=1) if monto} if propia else None
+            )
+    return registros
+
+def crear_perfiles(usuarios: int, libros_distintos: int, items: int) -> list[str]:
+    """Una base de datos por usuario; el usuario u recibe el libro sintético u % libros_distintos"""
+    from motor_financiero import guardar_registros, ruta_usuario
+    from sinteticos import gastos_sinteticos, ingresos_sinteticos
+
+    plantillas = [(_registros(ingresos_sinteticos(items, semilla)), _registros(gastos_sinteticos(items, semilla)))
+                  for semilla in range(libros_distintos)]
+    nombres = []
+    for u in range(usuarios):
+        nombre = f"usuario{u:03d}@ejemplo.com"
+        ingresos, gastos = plantillas[u % libros_distintos]
+        ruta = ruta_usuario(nombre)
+        guardar_registros("ingresos", ingresos, ruta)
+        guardar_registros("gastos", gastos, ruta)
+        nombres.append(nombre)
+    return nombres
+
+def compartir_compilacion() -> None:
+    """Compila finanzas.py una vez para todas las sesiones, como el servidor de Streamlit.
+
+    AppTest crea un ScriptCache nuevo en cada ejecución y volvería a compilar el script
+    cada vez; el servidor usa un solo ScriptCache por proceso, que es lo que se reproduce aquí.
+    """
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+
+    original = ScriptCache.get_bytecode
+    compartido = ScriptCache()
+    ScriptCache.get_bytecode = lambda self, ruta: original(compartido, ruta)
+
+# Paso de cada sesión -> botón que lo dispara (None: la entrada con el usuario)
+PASOS = {
+    "entrada": None,
+    "cascada": "Calcular flujo mensual en cascada",
+    "simulador": "Calcular comportamiento financiero proyectado",
+}
+
+def ejecutar_paso(at: Any, usuario: str, boton: str | None) -> None:
+    """Una ejecución del script en la sesión `at`"""
+    if boton is None:
+        at.session_state["usuario"] = usuario
+        at.run()
+    else:
+        next(b for b in at.button if b.label == boton).click().run()
+    if at.exception:
+        raise RuntimeError(f"{usuario}: {at.exception[0].message}")
+
+def ejecutar_sesiones(usuarios: list[str], sesiones: int) -> tuple[list[Any], dict[str, list[float]]]:
+    """Abre `sesiones` sesiones y avanza todas paso por paso; devuelve las sesiones abiertas y las latencias"""
+    from streamlit.testing.v1 import AppTest
+
+    abiertas = [AppTest.from_file(str(RAIZ / "finanzas.py"), default_timeout=600) for _ in range(sesiones)]
+    latencias: dict[str, list[float]] = {paso: [] for paso in PASOS}
+    for paso, boton in PASOS.items():
+        for i, at in enumerate(abiertas):
+            inicio = time.perf_counter()
+            ejecutar_paso(at, usuarios[i % len(usuarios)], boton)
+            latencias[paso].append(time.perf_counter() - inicio)
+    return abiertas, latencias
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sesiones", type=int, default=100)
+    parser.add_argument("--usuarios", type=int, default=50)
+    parser.add_argument("--libros-distintos", type=int, default=10)
+    parser.add_argument("--items", type=int, default=1_000, help="Ingresos y gastos por usuario")
+    parser.add_argument("--salida", default="resultados_multiusuario.json")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directorio:
+        # El directorio de perfiles se lee al importar el motor: se define antes de la primera importación
+        os.environ["FINANZAS_PERFILES"] = directorio
+        os.environ["FINANZAS_SIN_AUTENTICACION"] = "1"  # AppTest no puede iniciar sesión: el usuario se escribe
+        usuarios = crear_perfiles(args.usuarios, args.libros_distintos, args.items)
+        print(f"{len(usuarios)} usuarios con {args.items:,} ingresos y {args.items:,} gastos cada uno "
+              f"({args.libros_distintos} libros distintos)", flush=True)
+
+        compartir_compilacion()
+        memoria_inicial = _memoria_mb()
+        inicio = time.perf_counter()
+        abiertas, latencias = ejecutar_sesiones(usuarios, args.sesiones)
+        duracion = time.perf_counter() - inicio
+        memoria_final = _memoria_mb()  # Con todas las sesiones todavía abiertas
+        del abiertas
+
+    resumen = {
+        "sesiones": args.sesiones,
+        "usuarios": args.usuarios,
+        "libros_distintos": args.libros_distintos,
+        "items": args.items,
+        "segundos": duracion,
+        "sesiones_por_segundo": args.sesiones / duracion,
+        "latencia_ms": {paso: {f"p{p}": float(np.percentile(valores, p) * 1000) for p in (50, 90, 99)}
+                        for paso, valores in latencias.items()},
+        "memoria_pico_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "memoria_por_sesion_mb": (memoria_final - memoria_inicial) / args.sesiones,
+    }
+    print(f"{args.sesiones} sesiones en {duracion:.1f} s: {resumen['sesiones_por_segundo']:.2f} sesiones/s")
+    for paso, percentiles in resumen["latencia_ms"].items():
+        print(f"{paso:>10}: " + "  ".join(f"{p} {ms:,.0f} ms" for p, ms in percentiles.items()))
+    print(f"Memoria pico {resumen['memoria_pico_mb']:,.0f} MB, "
+          f"retenida por sesión abierta {resumen['memoria_por_sesion_mb']:,.2f} MB")
+
+    Path(args.salida).write_text(json.dumps({
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "resultados": resumen,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
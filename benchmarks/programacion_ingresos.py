@@ -0,0 +1,87 @@
+"""Compara la programación unificada de ingresos con el cálculo por ciclos que repetía cada vista.
+
+Antes cada vista recorría los ingresos item por item y semana por semana con su propia
+regla. Este script reproduce ese recorrido con la regla de fechas (la de
+calcular_ingreso_semanal), comprueba que el motor da los mismos montos y mide ambos.
+
+Uso: python benchmarks/programacion_ingresos.py [items ...]
+"""
+from __future__ import annotations
+
+import calendar
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from motor_financiero import FRECUENCIAS, Libro, calcular_proyeccion, calendario_mes, matriz_ingresos  # noqa: E402
+from sinteticos import ingresos_sinteticos  # noqa: E402
+
+YEAR, MONTH = 2025, 3
+MESES_PROYECCION = 12
+REPETICIONES = 3
+
+def matriz_por_ciclos(registros: list[dict], year: int, month: int) -> np.ndarray:
+    """Monto de cada ingreso en cada semana recorriendo items × semanas × días"""
+    semanas = calendario_mes(year, month).semanas
+    ultimo = calendar.monthrange(year, month)[1]
+    primer_dia, ultimo_dia = date(year, month, 1), date(year, month, ultimo)
+    matriz = np.zeros((len(registros), len(semanas)))
+    for fila, registro in enumerate(registros):
+        for columna, (inicio, fin) in enumerate(semanas):
+            inicio, fin = max(inicio, primer_dia), min(fin, ultimo_dia)
+            frecuencia, monto, dia_pago = registro["Frecuencia"], registro["Monto"], registro["Día de pago"]
+            dia = inicio
+            while dia <= fin:
+                if (frecuencia == "Diario"
+                        or (frecuencia == "Semanal" and dia.weekday() == 5)
+                        or (frecuencia == "Quincenal" and dia.day in (15, ultimo))
+                        or (frecuencia == "Mensual" and dia.day == min(int(dia_pago or ultimo), ultimo))):
+                    matriz[fila, columna] += monto
+                dia += timedelta(days=1)
+    return matriz
+
+def proyeccion_por_ciclos(registros: list[dict], year: int, month: int, meses: int) -> float:
+    """Total de ingresos del horizonte repitiendo el recorrido mes por mes"""
+    total = 0.0
+    for k in range(meses):
+        y, m = divmod(year * 12 + month - 1 + k, 12)
+        total += matriz_por_ciclos(registros, y, m + 1).sum()
+    return total
+
+def medir(funcion, *args) -> float:
+    """Mejor tiempo (s) de REPETICIONES ejecuciones"""
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion(*args)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+def main(tamanos: list[int]) -> None:
+    print(f"{'items':>8} {'vista':>12} {'ciclos (s)':>12} {'motor (s)':>12} {'aceleración':>12}")
+    for n in tamanos:
+        libro = ingresos_sinteticos(n)
+        registros = libro.df.replace({np.nan: None}).to_dict("records")
+        for registro, frecuencia in zip(registros, libro.codigos):
+            registro["Frecuencia"] = FRECUENCIAS[frecuencia]
+
+        # Mismos montos que el recorrido por fechas, en el mes y en el horizonte
+        assert np.allclose(matriz_por_ciclos(registros, YEAR, MONTH), matriz_ingresos(libro, YEAR, MONTH))
+        proyeccion = calcular_proyeccion(libro, Libro("gastos"), YEAR, MONTH, MESES_PROYECCION)
+        assert np.isclose(proyeccion_por_ciclos(registros, YEAR, MONTH, MESES_PROYECCION), proyeccion["ingresos"].sum())
+
+        for vista, ciclos, motor in (
+            ("mes", (matriz_por_ciclos, registros, YEAR, MONTH), (matriz_ingresos, libro, YEAR, MONTH)),
+            (f"{MESES_PROYECCION} meses", (proyeccion_por_ciclos, registros, YEAR, MONTH, MESES_PROYECCION),
+             (calcular_proyeccion, libro, Libro("gastos"), YEAR, MONTH, MESES_PROYECCION)),
+        ):
+            t_ciclos, t_motor = medir(*ciclos), medir(*motor)
+            print(f"{n:>8} {vista:>12} {t_ciclos:>12.4f} {t_motor:>12.4f} {t_ciclos / t_motor:>11.0f}x")
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [100, 1_000, 5_000])
@@ -0,0 +1,64 @@
+"""Libros sintéticos de ingresos y gastos para los benchmarks."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from motor_financiero import FRECUENCIAS, MAX_SEMANAS_MES, Libro  # noqa: E402
+
+FRACCION_PERSONALIZADOS = 0.10  # Gastos con distribución semanal propia
+FRACCION_DEUDAS = 0.05
+FRACCION_DIA_PAGO = 0.5  # De los mensuales
+
+def _dias_pago(rng: np.random.Generator, frecuencias: np.ndarray) -> np.ndarray:
+    """Día de pago aleatorio para una parte de los items mensuales (NaN para los demás)"""
+    n = len(frecuencias)
+    return np.where((frecuencias == "Mensual") & (rng.random(n) < FRACCION_DIA_PAGO),
+                    rng.integers(1, 32, size=n), np.nan)
+
+def ingresos_sinteticos(n: int, semilla: int = 0) -> Libro:
+    """Libro de `n` ingresos con frecuencias, tipos, montos y días de pago aleatorios"""
+    rng = np.random.default_rng(semilla)
+    frecuencias = rng.choice(FRECUENCIAS, size=n)
+    libro = Libro("ingresos")
+    libro.agregar_columnas(np.arange(1, n + 1), {
+        "Nombre": [f"Ingreso {i}" for i in range(n)],
+        "Monto": rng.uniform(10, 5000, size=n).round(2),
+        "Tipo": rng.choice(["Fijo", "Variable"], size=n),
+        "Frecuencia": frecuencias,
+        "Día de pago": _dias_pago(rng, frecuencias),
+    })
+    return libro
+
+def gastos_sinteticos(n: int, semilla: int = 0) -> Libro:
+    """Libro de `n` gastos con frecuencias mezcladas, distribuciones personalizadas y deudas"""
+    rng = np.random.default_rng(semilla + 1)
+    frecuencias = rng.choice(FRECUENCIAS, size=n)
+    montos = rng.uniform(5, 2000, size=n).round(2)
+    deuda = rng.random(n) < FRACCION_DEUDAS
+    personalizada = ~deuda & (rng.random(n) < FRACCION_PERSONALIZADOS)
+
+    # Distribuciones que reparten el monto mensual entre semanas al azar
+    distribucion = rng.random((n, MAX_SEMANAS_MES)) * (rng.random((n, MAX_SEMANAS_MES)) < 0.6)
+    distribucion *= (montos * 4 / np.maximum(distribucion.sum(axis=1), 1e-9))[:, None]
+    distribucion[~personalizada] = 0.0
+
+    plazo = rng.integers(6, 361, size=n).astype(np.float64)
+    libro = Libro("gastos")
+    libro.agregar_columnas(np.arange(1, n + 1), {
+        "Nombre": [f"Gasto {i}" for i in range(n)],
+        "Monto": montos,
+        "Frecuencia": frecuencias,
+        "Día de pago": _dias_pago(rng, frecuencias),
+        "Es deuda": deuda,
+        "Deuda total": np.where(deuda, montos * plazo * rng.uniform(0.6, 1.0, size=n), np.nan),
+        "Plazo (meses)": np.where(deuda, plazo, np.nan),
+        "Pagos realizados": np.where(deuda, rng.integers(0, 6, size=n), np.nan),
+        "Tasa anual (%)": np.where(deuda, rng.uniform(0, 40, size=n).round(1), np.nan),
+        "Distribucion personalizada": personalizada,
+    }, distribucion)
+    return libro
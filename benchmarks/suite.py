@@ -0,0 +1,191 @@
+"""Suite de benchmarks de las rutas de cálculo con libros sintéticos.
+
+Mide el tiempo (mejor de varias ejecuciones) y la memoria pico (tracemalloc) de cada
+ruta para libros de 10 a 100k items y horizontes de un mes, un año y una década, y
+guarda los resultados en JSON. Con --comparar marca las rutas que se volvieron más
+lentas que en un archivo de resultados anterior y termina con código 1.
+
+Uso:
+    python benchmarks/suite.py [--items 10 100 ...] [--salida resultados.json]
+                               [--comparar base.json] [--tolerancia 0.25]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from motor_financiero import (  # noqa: E402
+    FRECUENCIAS,
+    calcular_flujo_diario,
+    calcular_flujo_semanal,
+    calcular_gasto_semanal,
+    calcular_proyeccion,
+    calendario_mes,
+    etapas_cascada,
+    inicializar_distribucion,
+    plan_amortizacion,
+    resumen_flujo_mensual,
+    tabla_detalle_movimientos,
+    tabla_flujo,
+)
+from sinteticos import gastos_sinteticos, ingresos_sinteticos  # noqa: E402
+
+YEAR, MONTH = 2025, 3
+TAMANOS = [10, 100, 1_000, 10_000, 100_000]
+HORIZONTES = {"mes": 1, "año": 12, "década": 120}
+REPETICIONES = 5
+TIEMPO_MAXIMO = 1.0  # Segundos: una ruta más lenta se mide una sola vez
+PISO_REGRESION = 1e-3  # Diferencias menores a 1 ms se consideran ruido
+
+def cascada(ingresos, gastos, meses):
+    """Bloque de la cascada: flujo del mes, tabla, etapas del gráfico y detalle"""
+    flujo = calcular_flujo_semanal(ingresos, gastos, YEAR, MONTH)
+    tabla_flujo(flujo)
+    etapas_cascada(flujo)
+    tabla_detalle_movimientos(flujo, ingresos, gastos)
+
+def rerun_alta(ingresos, gastos, meses):
+    """Rerun tras agregar un gasto: alta en el libro y resumen desde los totales materializados.
+
+    Modifica el libro de gastos, así que se mide sobre una copia nueva en cada ejecución (ver copia_gastos).
+    """
+    gastos.agregar([{"Nombre": "Nuevo", "Monto": 100.0, "Frecuencia": "Semanal"}])
+    resumen_flujo_mensual(ingresos, gastos, YEAR, MONTH)
+
+def gasto_semanal(ingresos, gastos, meses):
+    """calcular_gasto_semanal para cada semana del mes"""
+    semanas = calendario_mes(YEAR, MONTH).semanas
+    for numero in range(1, len(semanas) + 1):
+        calcular_gasto_semanal(gastos, numero, semanas)
+
+def distribuciones(ingresos, gastos, meses):
+    """inicializar_distribucion para cada gasto del libro"""
+    dias = gastos.columna("Día de pago")
+    for monto, codigo, dia in zip(gastos.montos.tolist(), gastos.codigos.tolist(), dias.tolist()):
+        frecuencia = FRECUENCIAS[codigo] if codigo < len(FRECUENCIAS) else ""
+        inicializar_distribucion(monto, frecuencia, YEAR, MONTH, None if np.isnan(dia) else int(dia))
+
+def simulador(ingresos, gastos, meses):
+    calcular_proyeccion(ingresos, gastos, YEAR, MONTH, meses)
+
+def flujo_diario(ingresos, gastos, meses):
+    calcular_flujo_diario(ingresos, gastos, YEAR, MONTH, meses)
+
+def amortizacion(ingresos, gastos, meses):
+    plan_amortizacion(gastos, YEAR, MONTH, meses)
+
+def copia_gastos(ingresos, gastos, meses):
+    """Copia del libro de gastos con los totales del mes ya materializados, como en la sesión antes del alta"""
+    copia = gastos.subconjunto(np.arange(len(gastos)))
+    copia.totales_semanales(YEAR, MONTH)
+    ingresos.totales_semanales(YEAR, MONTH)
+    return ingresos, copia, meses
+
+# Rutas que modifican los libros -> preparación (fuera del tiempo medido) que da libros nuevos a cada ejecución
+PREPARACIONES: dict[str, Callable[[Any, Any, int], tuple[Any, Any, int]]] = {
+    "rerun_alta_gasto": copia_gastos,
+}
+
+# Ruta -> (función, horizontes en los que aplica)
+RUTAS: dict[str, tuple[Callable[[Any, Any, int], None], tuple[str, ...]]] = {
+    "calcular_gasto_semanal": (gasto_semanal, ("mes",)),
+    "inicializar_distribucion": (distribuciones, ("mes",)),
+    "cascada": (cascada, ("mes",)),
+    "rerun_alta_gasto": (rerun_alta, ("mes",)),
+    "simulador": (simulador, tuple(HORIZONTES)),
+    "flujo_diario": (flujo_diario, tuple(HORIZONTES)),
+    "amortizacion": (amortizacion, tuple(HORIZONTES)),
+}
+
+def medir(funcion: Callable[..., None], preparar: Callable[[], tuple]) -> tuple[float, float]:
+    """Mejor tiempo (s) y memoria pico (MB) de una ruta, después de un calentamiento.
+
+    `preparar` da los argumentos de cada ejecución y no entra en la medición.
+    """
+    funcion(*preparar())  # Llena los cachés de calendario y eje, como en un rerun
+    tiempos = []
+    for _ in range(REPETICIONES):
+        argumentos = preparar()
+        inicio = time.perf_counter()
+        funcion(*argumentos)
+        tiempos.append(time.perf_counter() - inicio)
+        if tiempos[-1] > TIEMPO_MAXIMO:
+            break
+    argumentos = preparar()
+    tracemalloc.start()
+    funcion(*argumentos)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return min(tiempos), pico / 2**20
+
+def ejecutar(tamanos: list[int], rutas: list[str]) -> list[dict[str, Any]]:
+    """Resultados de cada ruta, tamaño y horizonte"""
+    resultados = []
+    for n in tamanos:
+        ingresos, gastos = ingresos_sinteticos(n), gastos_sinteticos(n)
+        for ruta in rutas:
+            funcion, horizontes = RUTAS[ruta]
+            for horizonte in horizontes:
+                meses = HORIZONTES[horizonte]
+                preparacion = PREPARACIONES.get(ruta)
+                segundos, memoria = medir(
+                    funcion,
+                    lambda: preparacion(ingresos, gastos, meses) if preparacion else (ingresos, gastos, meses),
+                )
+                resultados.append({"ruta": ruta, "items": n, "horizonte": horizonte,
+                                   "segundos": segundos, "memoria_pico_mb": memoria})
+                print(f"{ruta:>26} {n:>8} {horizonte:>8} {segundos * 1000:>11.2f} ms {memoria:>9.2f} MB", flush=True)
+    return resultados
+
+def regresiones(resultados: list[dict[str, Any]], base: list[dict[str, Any]], tolerancia: float) -> list[str]:
+    """Rutas que tardan más de (1 + tolerancia) veces lo que tardaban en la base"""
+    anteriores = {(r["ruta"], r["items"], r["horizonte"]): r["segundos"] for r in base}
+    lentas = []
+    for r in resultados:
+        anterior = anteriores.get((r["ruta"], r["items"], r["horizonte"]))
+        if anterior is not None and r["segundos"] > anterior * (1 + tolerancia) and r["segundos"] - anterior > PISO_REGRESION:
+            lentas.append(f"{r['ruta']} ({r['items']} items, {r['horizonte']}): "
+                          f"{anterior * 1000:.2f} ms -> {r['segundos'] * 1000:.2f} ms")
+    return lentas
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--items", type=int, nargs="+", default=TAMANOS)
+    parser.add_argument("--rutas", nargs="+", choices=list(RUTAS), default=list(RUTAS))
+    parser.add_argument("--salida", default="resultados_benchmark.json")
+    parser.add_argument("--comparar", help="Archivo de resultados anterior contra el cual buscar regresiones")
+    parser.add_argument("--tolerancia", type=float, default=0.25)
+    args = parser.parse_args()
+
+    print(f"{'ruta':>26} {'items':>8} {'horiz.':>8} {'tiempo':>14} {'memoria':>12}")
+    resultados = ejecutar(args.items, args.rutas)
+    Path(args.salida).write_text(json.dumps({
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "plataforma": platform.platform(),
+        "resultados": resultados,
+    }, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        base = json.loads(Path(args.comparar).read_text(encoding="utf-8"))["resultados"]
+        lentas = regresiones(resultados, base, args.tolerancia)
+        for linea in lentas:
+            print(f"REGRESIÓN {linea}")
+        return 1 if lentas else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
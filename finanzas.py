@@ -1,12 +1,61 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import calendar
-from calendar import monthrange
 import datetime
-from datetime import date, timedelta
+import os
 from plotly import graph_objects as go
 
+# Toda la lógica de cálculo vive en el paquete motor_financiero; este script es solo la interfaz
+from motor_financiero import (
+    CAMPOS_EDITABLES,
+    CAMPOS_IMPORTACION,
+    CAMPOS_OBLIGATORIOS,
+    DIRECTORIO_PERFILES,
+    FORMATOS_EXPORTACION,
+    FRECUENCIAS,
+    MAX_PUNTOS_LINEA,
+    MAX_SEMANAS_MES,
+    calcular_flujo_diario,
+    calcular_proyeccion,
+    OBJETIVOS_ESTRATEGIA,
+    actualizar_registros,
+    agregar_periodos,
+    agregar_semanas,
+    aplicar_edicion,
+    ajustar_distribucion,
+    calendario_mes,
+    cargar_libro,
+    columnas_archivo,
+    comparar_estrategias,
+    agrupar_por_semana,
+    detalle_agrupado,
+    distribucion_por_defecto,
+    distribuciones_reprogramadas,
+    etapas_cascada,
+    exportar_tablas,
+    guardar_registros,
+    importar_archivo,
+    indices_reduccion,
+    inicializar_distribucion,
+    matriz_mes,
+    periodo_grafica,
+    plan_amortizacion,
+    preparar_edicion,
+    problema_deudas,
+    repartir_resto,
+    reprogramar_gastos,
+    semanas_permitidas,
+    resumen_flujo_mensual,
+    ruta_usuario,
+    simular_montecarlo,
+    solo_lectura,
+    tabla_deudas,
+    tabla_editable,
+    tabla_detalle_movimientos,
+    tabla_flujo,
+)
+
 st.set_page_config(
     page_title="Mi Plan Financiero", 
     layout="wide",  # Cambia a "wide" para usar todo el ancho disponible
@@ -67,247 +116,266 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-def manejar_redistribucion():
-    """Maneja la redistribución de montos entre semanas cuando se envía el formulario"""
-    gasto_frec = st.session_state.gasto_frec
-    gasto_monto = st.session_state.gasto_monto
-    
-    if gasto_frec == "Quincenal":
-        # Redistribuir entre semanas 1 y 3
-        total_esperado = gasto_monto * 2
-        suma_actual = st.session_state.semana_1_monto + st.session_state.semana_3_monto
-        
-        if abs(suma_actual - total_esperado) > 0.01:
-            # Ajustar para que sumen correctamente
-            if st.session_state.semana_1_monto > 0 and st.session_state.semana_3_monto == 0:
-                # Si solo semana 1 tiene valor, poner todo en semana 1
-                st.session_state.semana_1_monto = total_esperado
-            elif st.session_state.semana_3_monto > 0 and st.session_state.semana_1_monto == 0:
-                # Si solo semana 3 tiene valor, poner todo en semana 3
-                st.session_state.semana_3_monto = total_esperado
-            else:
-                # Ajustar proporcionalmente
-                factor = total_esperado / suma_actual
-                st.session_state.semana_1_monto *= factor
-                st.session_state.semana_3_monto *= factor
-    else:
-        # Para otras frecuencias, distribuir entre las 4 semanas
-        if gasto_frec == "Mensual":
-            total_esperado = gasto_monto
-        elif gasto_frec == "Semanal":
-            total_esperado = gasto_monto * 4
-        elif gasto_frec == "Diario":
-            total_esperado = gasto_monto * 7 * 4
-        
-        suma_actual = sum(st.session_state.get(f"semana_{i}_monto", 0.0) for i in range(1, 5))
-        
-        if abs(suma_actual - total_esperado) > 0.01:
-            # Ajustar proporcional o equitativamente
-            valores_no_cero = [i for i in range(1, 5) if st.session_state.get(f"semana_{i}_monto", 0) > 0]
-            
-            if len(valores_no_cero) > 0:
-                # Ajuste proporcional para valores no cero
-                factor = total_esperado / suma_actual
-                for i in valores_no_cero:
-                    st.session_state[f"semana_{i}_monto"] *= factor
-            else:
-                # Distribución equitativa si todo es cero
-                valor_por_semana = total_esperado / 4
-                for i in range(1, 5):
-                    st.session_state[f"semana_{i}_monto"] = valor_por_semana
-                    
-def get_month_calendar(year, month):
-    """Obtiene las semanas del mes especificado"""
-    # Obtener el primer día del mes
-    first_day = date(year, month, 1)
-    
-    # Encontrar el primer día de la semana (domingo)
-    if first_day.weekday() != 6:  # si no es domingo
-        first_day = first_day - timedelta(days=(first_day.weekday() + 1) % 7)
-    
-    # Último día real del mes
-    real_last_day = date(year, month, calendar.monthrange(year, month)[1])
-
-    # Calcular el sábado de la última semana que contiene al último día del mes
-    last_day = real_last_day + timedelta(days=(5 - real_last_day.weekday()) % 7)
-    
-    # Crear semanas (lista de pares de fechas)
-    weeks = []
-    current = first_day
-    while current <= last_day:
-        week_end = current + timedelta(days=6)
-        weeks.append((current, week_end))
-        current = week_end + timedelta(days=1)
-    
-    return weeks
-
-def format_date_range(start_date, end_date):
-    """Formatea un rango de fechas como 'DD al DD de Mes'"""
-    if start_date.month == end_date.month:
-        return f"{start_date.day} al {end_date.day} de {calendar.month_name[start_date.month]}"
-    else:
-        return f"{start_date.day} de {calendar.month_name[start_date.month]} al {end_date.day} de {calendar.month_name[end_date.month]}"
+def distribucion_formulario():
+    """Montos de las semanas del mes seleccionado en el formulario, el total esperado y las semanas permitidas"""
+    year, month = st.session_state.year, st.session_state.month
+    gasto_frec = st.session_state.get("gasto_frec", "Semanal")
+    num_semanas = len(calendario_mes(year, month).semanas)
+    valores = np.array([st.session_state.get(f"semana_{i}_monto", 0.0) for i in range(1, num_semanas + 1)])
+    total = distribucion_por_defecto(st.session_state.get("gasto_monto", 0.0), gasto_frec, year, month).sum()
+    return valores, total, semanas_permitidas(gasto_frec, year, month)
 
-# ---------- NUEVAS FUNCIONES DE CÁLCULO ----------
-def calcular_ingreso_inicial_mensual(ingresos_df, year, month):
-    """Calcula el total de ingresos al inicio del mes según la nueva lógica"""
-    total_ingresos = 0
-    
-    for _, ingreso in ingresos_df.iterrows():
-        monto = ingreso["Monto"]
-        frecuencia = ingreso["Frecuencia"]
-        
-        if frecuencia == "Diario":
-            # Obtener el número de días en el mes
-            _, dias_en_mes = calendar.monthrange(year, month)
-            total_ingresos += monto * dias_en_mes
-        elif frecuencia == "Semanal":
-            # Aproximadamente 4 semanas en un mes
-            total_ingresos += monto * 4
-        elif frecuencia == "Quincenal":
-            # 2 quincenas en un mes
-            total_ingresos += monto * 2
-        elif frecuencia == "Mensual":
-            total_ingresos += monto
-    
-    return total_ingresos
+def guardar_distribucion_formulario(valores):
+    for i, monto in enumerate(valores.tolist(), start=1):
+        st.session_state[f"semana_{i}_monto"] = monto
 
-def calcular_ingreso_semanal(ingresos_df, numero_semana, semanas, dias_en_semana=7):
-    """Calcula los ingresos para una semana específica según fechas específicas"""
-    ingresos_semana = 0
-    semana_actual = semanas[numero_semana - 1]  # Obtener la tupla (inicio, fin) de esta semana
-    inicio_semana, fin_semana = semana_actual
-    
-    for _, ingreso in ingresos_df.iterrows():
-        monto = ingreso["Monto"]
-        frecuencia = ingreso["Frecuencia"]
-        
-        if frecuencia == "Diario":
-            # Calcular días en esta semana (pueden ser menos de 7 al inicio/fin de mes)
-            dias_en_semana = (fin_semana - inicio_semana).days + 1
-            ingresos_semana += monto * dias_en_semana
-        elif frecuencia == "Semanal":
-            # Verificar si hay algún sábado en esta semana
-            current_date = inicio_semana
-            while current_date <= fin_semana:
-                if current_date.weekday() == 5:  # 5 es sábado
-                    ingresos_semana += monto
-                    break
-                current_date += timedelta(days=1)
-        elif frecuencia == "Quincenal":
-            # Verificar específicamente si el día 15 cae en esta semana
-            año = inicio_semana.year
-            mes = inicio_semana.month
-            dia_15 = date(año, mes, 15)
-            if inicio_semana <= dia_15 <= fin_semana:
-                ingresos_semana += monto
-        elif frecuencia == "Mensual":
-            # Verificar específicamente si el último día del mes cae en esta semana
-            ultimo_dia = date(inicio_semana.year, inicio_semana.month, 
-                             calendar.monthrange(inicio_semana.year, inicio_semana.month)[1])
-            if inicio_semana <= ultimo_dia <= fin_semana:
-                ingresos_semana += monto
-    
-    return ingresos_semana
+def manejar_redistribucion():
+    """Ajusta los montos de las semanas para que sumen el total esperado del mes"""
+    valores, total, permitidas = distribucion_formulario()
+    guardar_distribucion_formulario(ajustar_distribucion(valores, total, permitidas))
 
-def calcular_gasto_semanal(gastos_df, numero_semana, semanas, semanas_totales=4):
-    """Calcula los gastos para una semana específica según fechas específicas"""
-    gastos_semana = 0
-    semana_actual = semanas[numero_semana - 1]  # Obtener la tupla (inicio, fin) de esta semana
-    inicio_semana, fin_semana = semana_actual
-    
-    for _, gasto in gastos_df.iterrows():
-        monto = gasto["Monto"]
-        frecuencia = gasto["Frecuencia"]
-        distribucion_personalizada = gasto.get("Distribucion personalizada", False)
-        
-        if distribucion_personalizada:
-            # Usar la distribución personalizada si existe
-            distribucion_semanas = gasto.get("Distribucion semanas", {})
-            semana_key = f"Semana {numero_semana}"
-            if semana_key in distribucion_semanas:
-                gastos_semana += distribucion_semanas[semana_key]
-        else:
-            # Usar la lógica por fechas específicas
-            if frecuencia == "Diario":
-                # Calcular días en esta semana (pueden ser menos de 7 al inicio/fin de mes)
-                dias_en_semana = (fin_semana - inicio_semana).days + 1
-                gastos_semana += monto * dias_en_semana
-            elif frecuencia == "Semanal":
-                # Verificar si hay algún sábado en esta semana
-                current_date = inicio_semana
-                while current_date <= fin_semana:
-                    if current_date.weekday() == 5:  # 5 es sábado
-                        gastos_semana += monto
-                        break
-                    current_date += timedelta(days=1)
-            elif frecuencia == "Quincenal":
-                # Verificar específicamente si el día 15 cae en esta semana
-                año = inicio_semana.year
-                mes = inicio_semana.month
-                dia_15 = date(año, mes, 15)
-                if inicio_semana <= dia_15 <= fin_semana:
-                    gastos_semana += monto
-            elif frecuencia == "Mensual":
-                # Verificar específicamente si el último día del mes cae en esta semana
-                ultimo_dia = date(inicio_semana.year, inicio_semana.month, 
-                                calendar.monthrange(inicio_semana.year, inicio_semana.month)[1])
-                if inicio_semana <= ultimo_dia <= fin_semana:
-                    gastos_semana += monto
-    
-    return gastos_semana
-
-def normalizar_monto_semanal(monto, frecuencia):
-    """Normaliza un monto a valor semanal según su frecuencia"""
-    if frecuencia == "Diario":
-        return monto * 7  # 7 días en una semana
-    elif frecuencia == "Semanal":
-        return monto
-    elif frecuencia == "Quincenal":
-        return monto / 2  # Una quincena tiene 2 semanas aproximadamente
-    elif frecuencia == "Mensual":
-        return monto / 4.33  # Un mes tiene aproximadamente 4.33 semanas
-    return monto
-
-# Reemplaza la función redistribuir_resto con esta versión mejorada
 def redistribuir_resto(semana_cambiada):
-    gasto_frec = st.session_state.get("gasto_frec")
-    gasto_monto = st.session_state.get("gasto_monto", 0.0)
-
-    if gasto_frec == "Quincenal":
-        total = gasto_monto * 2
-        if semana_cambiada == 1:
-            restante = total - st.session_state.get("semana_1_monto", 0.0)
-            st.session_state["semana_3_monto"] = max(restante, 0.0)
-        elif semana_cambiada == 3:
-            restante = total - st.session_state.get("semana_3_monto", 0.0)
-            st.session_state["semana_1_monto"] = max(restante, 0.0)
+    """Conserva la semana cambiada (1-indexada) y reparte el resto del total entre las demás semanas"""
+    valores, total, permitidas = distribucion_formulario()
+    guardar_distribucion_formulario(repartir_resto(valores, total, semana_cambiada - 1, permitidas))
+
+# ---------- TABLAS PAGINADAS ----------
+# Solo se dibuja la página visible: el costo de cada rerun depende del tamaño de página, no del libro
+TAMANOS_PAGINA = [25, 50, 100, 250]
+
+def pagina_tabla(total, clave):
+    """Controles de paginación (solo si hay más de una página posible); devuelve el rango (inicio, fin) visible"""
+    if total <= TAMANOS_PAGINA[0]:
+        return 0, total
+    col_tamano, col_pagina, col_filas = st.columns([1, 1, 2])
+    with col_tamano:
+        tamano = st.selectbox("Filas por página", TAMANOS_PAGINA, key=f"{clave}_tamano_pagina")
+    paginas = -(-total // tamano)
+    if st.session_state.get(f"{clave}_pagina", 1) > paginas:
+        st.session_state[f"{clave}_pagina"] = paginas  # El libro se achicó: quedarse en la última página
+    with col_pagina:
+        pagina = st.number_input("Página", min_value=1, max_value=paginas, step=1, key=f"{clave}_pagina")
+    inicio = (pagina - 1) * tamano
+    fin = min(inicio + tamano, total)
+    with col_filas:
+        st.caption(f"Filas {inicio + 1}–{fin} de {total}")
+    return inicio, fin
+
+# Formato de las columnas numéricas en las tablas editables
+FORMATO_COLUMNAS = {
+    "Monto": st.column_config.NumberColumn("Monto", min_value=0.0, format="$%.2f"),
+    "Frecuencia": st.column_config.SelectboxColumn("Frecuencia", options=FRECUENCIAS, required=True),
+    "Día de pago": st.column_config.NumberColumn("Día de pago", min_value=1, max_value=31, step=1, format="%d"),
+    "Deuda total": st.column_config.NumberColumn("Deuda total", format="$%.2f"),
+    "Tasa anual (%)": st.column_config.NumberColumn("Tasa anual (%)", format="%.2f%%"),
+    "Plazo (meses)": st.column_config.NumberColumn("Plazo (meses)", format="%d"),
+    "Pagos realizados": st.column_config.NumberColumn("Pagos realizados", format="%d"),
+    **{f"Semana {i}": st.column_config.NumberColumn(f"Semana {i}", min_value=0.0, format="$%.2f")
+       for i in range(1, MAX_SEMANAS_MES + 1)},
+}
+
+def editor_registros(tabla, etiqueta):
+    """Página del libro como tabla editable; los cambios y eliminaciones se guardan juntos al enviar el formulario"""
+    libro = st.session_state[tabla]
+    inicio, fin = pagina_tabla(len(libro), tabla)
+    # La versión cambia con cada edición guardada, así los cambios ya aplicados no se vuelven a leer
+    clave = f"{tabla}_editor_{st.session_state.get(f'{tabla}_version', 0)}_{inicio}_{fin}"
+    editables = ["Eliminar", *CAMPOS_EDITABLES[tabla]]
+    with st.form(f"form_editor_{tabla}", border=False):
+        datos = tabla_editable(libro, inicio, fin)
+        st.data_editor(datos, key=clave, hide_index=True, width="stretch", column_config=FORMATO_COLUMNAS,
+                       disabled=[columna for columna in datos.columns if columna not in editables])
+        st.form_submit_button(f"💾 Guardar cambios en {etiqueta}", on_click=guardar_edicion,
+                              args=(tabla, clave, libro.ids[inicio:fin].tolist()))
+    errores = st.session_state.pop(f"{tabla}_errores_edicion", None)
+    if errores:
+        st.error("No se guardó ningún cambio:\n\n" + "\n".join(f"- {error}" for error in errores))
+    resumen = st.session_state.pop(f"{tabla}_edicion_aplicada", None)
+    if resumen:
+        st.success(f"Cambios guardados: {resumen[0]} editados y {resumen[1]} eliminados.")
+
+# ---------- CACHÉ DE RESULTADOS ----------
+# Los resultados se guardan con st.cache_resource (sin copiar ni serializar) y se comparten
+# entre reruns y sesiones: la clave es la huella de cada libro más los parámetros del cálculo
+# y los argumentos con guion bajo no participan en ella. Los arreglos son de solo lectura.
+# Con varios usuarios el número de entradas acota la memoria de los resultados de todo el proceso.
+MAX_RESULTADOS_CACHE = int(os.environ.get("FINANZAS_MAX_RESULTADOS", 64))
+
+@st.cache_resource(max_entries=MAX_RESULTADOS_CACHE, show_spinner=False)
+def flujo_mensual_en_cache(huella_ingresos, huella_gastos, year, month, _ingresos, _gastos):
+    """Resumen semanal, matrices items × semanas, movimientos agrupados por semana y tabla de movimientos del mes"""
+    resumen = resumen_flujo_mensual(_ingresos, _gastos, year, month)
+    flujo = dict(
+        resumen,
+        flujo=solo_lectura(resumen["flujo"]),
+        saldo=solo_lectura(resumen["saldo"]),
+        matriz_ingresos=solo_lectura(matriz_mes(_ingresos, year, month)),
+        matriz_gastos=solo_lectura(matriz_mes(_gastos, year, month)),
+    )
+    flujo["detalle"] = tabla_detalle_movimientos(flujo, _ingresos, _gastos)
+    flujo["por_semana"] = {
+        "ingresos": agrupar_por_semana(flujo["matriz_ingresos"]),
+        "gastos": agrupar_por_semana(flujo["matriz_gastos"]),
+    }
+    return flujo
+
+@st.cache_resource(max_entries=MAX_RESULTADOS_CACHE, show_spinner=False)
+def proyeccion_en_cache(huella_ingresos, huella_gastos, year, month, meses, _ingresos, _gastos):
+    """Proyección de `meses` meses desde el mes indicado"""
+    proyeccion = calcular_proyeccion(_ingresos, _gastos, year, month, meses)
+    return {clave: solo_lectura(valor) if isinstance(valor, np.ndarray) else valor
+            for clave, valor in proyeccion.items()}
+
+@st.cache_resource(max_entries=MAX_RESULTADOS_CACHE, show_spinner=False)
+def montecarlo_en_cache(huella_ingresos, huella_gastos, year, month, meses, escenarios,
+                        variabilidad_ingresos, variabilidad_gastos, _ingresos, _gastos):
+    """Bandas de percentiles y probabilidad de saldo negativo (semilla fija: mismo resultado en cada rerun)"""
+    simulacion = simular_montecarlo(_ingresos, _gastos, year, month, meses, escenarios,
+                                    variabilidad_ingresos, variabilidad_gastos, semilla=0)
+    return {clave: solo_lectura(valor) if isinstance(valor, np.ndarray) else valor
+            for clave, valor in simulacion.items()}
+
+@st.cache_resource(max_entries=MAX_RESULTADOS_CACHE, show_spinner=False)
+def deudas_en_cache(huella_gastos, year, month, _gastos):
+    """Tabla de amortización de las deudas hasta su liquidación o el fin de su plazo"""
+    plan = plan_amortizacion(_gastos, year, month)
+    return tabla_deudas(_gastos, plan["estado"], plan["amortizacion"], plan["meses"][0])
+
+@st.cache_resource(max_entries=MAX_RESULTADOS_CACHE, show_spinner=False)
+def estrategias_en_cache(huella_ingresos, huella_gastos, year, month, meses, extra_maximo, objetivo,
+                         orden_personalizado, _ingresos, _gastos):
+    """Comparación de estrategias de pago de deudas y sus pagos mes a mes"""
+    problema = problema_deudas(_ingresos, _gastos, year, month, meses, extra_maximo)
+    return problema, comparar_estrategias(problema, objetivo, orden_personalizado)
+
+@st.cache_resource(max_entries=MAX_RESULTADOS_CACHE, show_spinner=False)
+def flujo_diario_en_cache(huella_ingresos, huella_gastos, year, month, meses, _ingresos, _gastos):
+    """Saldo día a día de `meses` meses desde el mes indicado"""
+    diario = calcular_flujo_diario(_ingresos, _gastos, year, month, meses)
+    return {clave: solo_lectura(valor) if isinstance(valor, np.ndarray) else valor
+            for clave, valor in diario.items()}
+
+def obtener_flujo_mensual(ingresos, gastos, year, month):
+    """Flujo del mes desde la caché compartida"""
+    return flujo_mensual_en_cache(ingresos.huella, gastos.huella, year, month, ingresos, gastos)
+
+def obtener_proyeccion(ingresos, gastos, year, month, meses):
+    """Proyección desde la caché compartida (copia superficial: el diccionario sí puede modificarse)"""
+    return dict(proyeccion_en_cache(ingresos.huella, gastos.huella, year, month, meses, ingresos, gastos))
+
+def obtener_montecarlo(ingresos, gastos, year, month, meses, escenarios, variabilidad_ingresos, variabilidad_gastos):
+    """Simulación Monte Carlo desde la caché compartida"""
+    return montecarlo_en_cache(ingresos.huella, gastos.huella, year, month, meses, escenarios,
+                               variabilidad_ingresos, variabilidad_gastos, ingresos, gastos)
+
+def obtener_flujo_diario(ingresos, gastos, year, month, meses):
+    """Flujo diario desde la caché compartida"""
+    return flujo_diario_en_cache(ingresos.huella, gastos.huella, year, month, meses, ingresos, gastos)
+
+def mostrar_saldo_diario(diario, periodo):
+    """Avisa el día con el saldo más bajo del periodo y grafica el saldo día a día"""
+    fecha = diario["dia_minimo"].astype(object)
+    texto = (f"📉 Día con el saldo más bajo {periodo}: {fecha.day} de {calendar.month_name[fecha.month]} "
+             f"{fecha.year} (${diario['saldo_minimo']:,.2f})")
+    if diario["saldo_minimo"] < 0:
+        st.warning(texto + ". Ese día el saldo acumulado queda en negativo aunque la semana no lo muestre.")
     else:
-        if gasto_frec == "Mensual":
-            total = gasto_monto
-        elif gasto_frec == "Semanal":
-            total = gasto_monto * 4
-        elif gasto_frec == "Diario":
-            total = gasto_monto * 7 * 4
-
-        semanas = [1, 2, 3, 4]
-        otras = [s for s in semanas if s != semana_cambiada]
-        monto_cambiado = st.session_state.get(f"semana_{semana_cambiada}_monto", 0.0)
-        restante = total - monto_cambiado
-
-        if restante < 0:
-            for s in otras:
-                st.session_state[f"semana_{s}_monto"] = 0.0
+        st.info(texto)
+    with st.expander("Saldo día a día"):
+        puntos = indices_reduccion(diario["saldo"])  # Acotado en horizontes largos, conservando los mínimos
+        fig = go.Figure(go.Scattergl(x=diario["dias"][puntos], y=diario["saldo"][puntos], mode="lines",
+                                     line_shape="hv", name="Saldo"))
+        fig.add_hline(y=0, line_dash="dot", line_color="red")
+        fig.update_layout(yaxis_title="Saldo ($)", showlegend=False)
+        st.plotly_chart(fig, width="stretch")
+
+# Ancho de las barras de cada periodo en el eje de fechas de Plotly
+PERIODO_PLOTLY = {"Semana": 7 * 24 * 60 * 60 * 1000, "Mes": "M1", "Trimestre": "M3", "Año": "M12"}
+
+def figura_periodos(serie, fines, saldo, titulo):
+    """Ingresos y gastos por periodo en barras más la línea WebGL del saldo acumulado semanal.
+
+    El periodo lo elige periodo_grafica según el horizonte y la línea se reduce a
+    MAX_PUNTOS_LINEA puntos, así que lo que se envía al navegador tiene tamaño acotado.
+    """
+    periodo = {"xperiod": PERIODO_PLOTLY[serie["periodo"]], "xperiodalignment": "start"}
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=serie["inicios"], y=serie["ingresos"], name="Ingresos", marker_color="rgb(46, 204, 113)",
+                         customdata=serie["etiquetas"], hovertemplate="%{customdata}: $%{y:,.2f}", **periodo))
+    fig.add_trace(go.Bar(x=serie["inicios"], y=-serie["gastos"], name="Gastos", marker_color="rgb(231, 76, 60)",
+                         customdata=serie["etiquetas"], hovertemplate="%{customdata}: $%{y:,.2f}", **periodo))
+    puntos = indices_reduccion(saldo)
+    fig.add_trace(go.Scattergl(x=fines[puntos], y=saldo[puntos], mode="lines", name="Saldo acumulado",
+                               line={"color": "rgb(71, 161, 255)", "width": 2}))
+    fig.add_hline(y=0, line_dash="dot", line_color="gray")
+    fig.update_layout(title=titulo, barmode="relative", yaxis_title="Monto ($)", xaxis_title=serie["periodo"],
+                      hovermode="x unified")
+    return fig
+
+# ---------- EXPORTACIÓN ----------
+def boton_exportacion(label, tablas, nombre_archivo, formato):
+    """Botón de descarga que genera el archivo solo al hacer clic y sin volver a ejecutar la página"""
+    extension, mime = FORMATOS_EXPORTACION[formato]
+    st.download_button(
+        label=label,
+        data=lambda: exportar_tablas(tablas, formato),
+        file_name=nombre_archivo + extension,
+        mime=mime,
+        on_click="ignore",
+    )
+
+# ---------- USUARIO ----------
+# Con FINANZAS_PERFILES definido la app atiende a varias personas: cada una tiene su propia
+# base de datos en ese directorio y su libro en su sesión. Los calendarios, las programaciones
+# y los resultados en caché (por huella de libro) son del proceso y se comparten entre todas.
+# El usuario es la cuenta con la que se inicia sesión (st.login, configurado en [auth] de
+# secrets.toml). Escribir el usuario a mano solo se permite con FINANZAS_SIN_AUTENTICACION=1,
+# para pruebas o equipos de confianza: así cualquiera puede abrir el libro de otro.
+MAX_REGISTROS_USUARIO = int(os.environ.get("FINANZAS_MAX_REGISTROS", 20_000))
+SIN_AUTENTICACION = os.environ.get("FINANZAS_SIN_AUTENTICACION") == "1"
+
+def cambiar_usuario():
+    """Olvida el usuario y sus libros y cierra la sesión; la siguiente ejecución vuelve a pedirlo"""
+    for clave in list(st.session_state):
+        del st.session_state[clave]
+    if getattr(st.user, "is_logged_in", False):
+        st.logout()
+
+if DIRECTORIO_PERFILES:
+    autenticado = getattr(st.user, "is_logged_in", False)
+    if autenticado and st.session_state.get("usuario_activo") not in (None, st.user.email):
+        cambiar_usuario()  # Otra cuenta inició sesión en este navegador
+    if "ruta_bd" not in st.session_state:
+        if autenticado:
+            usuario = st.user.email
+        elif SIN_AUTENTICACION:
+            st.warning("⚠ Modo sin autenticación: cualquiera que escriba un usuario puede abrir y editar su plan.")
+            usuario = st.text_input("Usuario", key="usuario")
+            if not usuario or not usuario.strip():
+                st.info("Escribe tu usuario para abrir tu plan financiero.")
+                st.stop()
         else:
-            por_semana = restante / len(otras)
-            for s in otras:
-                st.session_state[f"semana_{s}_monto"] = por_semana
+            st.info("Inicia sesión para abrir tu plan financiero.")
+            st.button("Iniciar sesión", on_click=st.login)
+            st.stop()
+        st.session_state.usuario_activo = usuario.strip()
+        st.session_state.ruta_bd = ruta_usuario(usuario)
+    col_usuario, col_cambiar = st.columns([4, 1])
+    col_usuario.caption(f"👤 {st.session_state.usuario_activo}")
+    col_cambiar.button("Cerrar sesión" if autenticado else "Cambiar de usuario", on_click=cambiar_usuario)
+
+def cupo_registros():
+    """Registros que el usuario aún puede agregar (None sin límite, con una sola base de datos)"""
+    if not DIRECTORIO_PERFILES:
+        return None
+    return MAX_REGISTROS_USUARIO - len(st.session_state.ingresos) - len(st.session_state.gastos)
 
 # ---------- SESIÓN ----------
+# Los registros se leen de la base de datos una sola vez por sesión, a un libro por columnas
 if "ingresos" not in st.session_state:
-    st.session_state.ingresos = []
+    st.session_state.ingresos = cargar_libro("ingresos", st.session_state.get("ruta_bd"))
 if "gastos" not in st.session_state:
-    st.session_state.gastos = []
+    st.session_state.gastos = cargar_libro("gastos", st.session_state.get("ruta_bd"))
 if "es_deuda" not in st.session_state:
     st.session_state.es_deuda = False
 if "year" not in st.session_state:
@@ -319,13 +387,14 @@ if "distribucion_personalizada" not in st.session_state:
 
 # Funciones para agregar registros y limpiar campos
 def agregar_ingreso():
-    st.session_state.ingresos.append({
+    ingreso = {
         "Nombre": st.session_state.ingreso_nombre,
         "Monto": st.session_state.ingreso_monto,
         "Tipo": st.session_state.ingreso_tipo,
         "Frecuencia": st.session_state.ingreso_frec,
         "Día de pago": st.session_state.ingreso_dia_pago if st.session_state.ingreso_frec == "Mensual" else None
-    })
+    }
+    st.session_state.ingresos.agregar(guardar_registros("ingresos", [ingreso], st.session_state.get("ruta_bd")))
     # Limpiar campos después de agregar
     st.session_state.ingreso_nombre = ""
     st.session_state.ingreso_monto = 0.0
@@ -333,95 +402,31 @@ def agregar_ingreso():
     st.session_state.ingreso_tipo = "Fijo"
     st.session_state.ingreso_dia_pago = 1
 
-def inicializar_distribucion(gasto_monto, gasto_frec, semanas):
-    """Inicializa las distribuciones de pago según la frecuencia y las fechas reales del mes"""
-    distribucion = {}
-    
-    # Inicializar todas las semanas a cero
-    for i in range(1, len(semanas) + 1):
-        distribucion[f"Semana {i}"] = 0.0
-    
-    if gasto_frec == "Mensual":
-        # Buscar cuál semana contiene el último día del mes
-        ultimo_dia_mes = None
-        for i, (inicio, fin) in enumerate(semanas):
-            ultimo_dia = date(inicio.year, inicio.month, 
-                             calendar.monthrange(inicio.year, inicio.month)[1])
-            if inicio <= ultimo_dia <= fin:
-                ultimo_dia_mes = i + 1  # Convertir a número de semana (1-indexed)
-                break
-        
-        if ultimo_dia_mes:
-            distribucion[f"Semana {ultimo_dia_mes}"] = gasto_monto
-        else:
-            # Si no encontramos el último día (poco probable), distribuir equitativamente
-            monto_semanal = gasto_monto / len(semanas)
-            for i in range(1, len(semanas) + 1):
-                distribucion[f"Semana {i}"] = monto_semanal
-    
-    elif gasto_frec == "Quincenal":
-        # Buscar la semana que contiene el día 15
-        dia_15_semana = None
-        for i, (inicio, fin) in enumerate(semanas):
-            dia_15 = date(inicio.year, inicio.month, 15)
-            if inicio <= dia_15 <= fin:
-                dia_15_semana = i + 1  # Convertir a número de semana (1-indexed)
-                break
-        
-        if dia_15_semana:
-            distribucion[f"Semana {dia_15_semana}"] = gasto_monto
-            
-            # Para la otra quincena, usar la primera semana o última según corresponda
-            if dia_15_semana <= 2:  # Si el día 15 está en la primera mitad del mes
-                # La otra quincena estaría en la segunda mitad
-                distribucion[f"Semana {len(semanas)}"] = gasto_monto
-            else:
-                # La otra quincena estaría al inicio del mes
-                distribucion["Semana 1"] = gasto_monto
-        else:
-            # Si no encontramos el día 15 (poco probable), distribuir en semanas 1 y 3
-            distribucion["Semana 1"] = gasto_monto
-            if len(semanas) >= 3:
-                distribucion["Semana 3"] = gasto_monto
-    
-    elif gasto_frec == "Semanal":
-        # Mismo monto cada semana
-        for i in range(1, len(semanas) + 1):
-            distribucion[f"Semana {i}"] = gasto_monto
-    
-    elif gasto_frec == "Diario":
-        # Calcular días en cada semana
-        for i, (inicio, fin) in enumerate(semanas):
-            dias_en_semana = (fin - inicio).days + 1
-            distribucion[f"Semana {i+1}"] = gasto_monto * dias_en_semana
-    
-    return distribucion
-
 def agregar_gasto():
     """Función para agregar un gasto a la lista de gastos"""
     # Obtener los valores del formulario
     nombre = st.session_state.gasto_nombre
     monto = st.session_state.gasto_monto
     frecuencia = st.session_state.gasto_frec
-    dia_pago = st.session_state.get("gasto_dia_pago", 1)
+    # Solo un día de pago fijado a propósito se guarda; sin él, el gasto se puede reprogramar
+    dia_pago = st.session_state.get("gasto_dia_pago") if st.session_state.get("gasto_fijar_dia") else None
     es_deuda = st.session_state.es_deuda
     deuda_total = st.session_state.get("deuda_total", 0.0) if es_deuda else None
     plazo = st.session_state.get("plazo", 1) if es_deuda else None
     pagos_realizados = st.session_state.get("pagos_realizados", 0) if es_deuda else None
+    tasa_anual = st.session_state.get("tasa_anual", 0.0) if es_deuda else None
     
     usar_distribucion_personalizada = st.session_state.distribucion_personalizada
 
-    distribucion_semanas = {}
     if usar_distribucion_personalizada:
-        for i in range(1, 5):
-            key = f"semana_{i}_monto"
-            distribucion_semanas[f"Semana {i}"] = st.session_state.get(key, 0.0)
+        # Una posición por cada semana real del mes seleccionado (4, 5 o 6)
+        valores, _, _ = distribucion_formulario()
+        distribucion_semanas = {f"Semana {i}": monto for i, monto in enumerate(valores.tolist(), start=1)}
     else:
-        # Obtener las semanas actuales para el mes seleccionado
-        semanas = get_month_calendar(st.session_state.year, st.session_state.month)
-        distribucion_semanas = inicializar_distribucion(monto, frecuencia, semanas)
+        # Distribución según las semanas reales del mes seleccionado
+        distribucion_semanas = inicializar_distribucion(monto, frecuencia, st.session_state.year, st.session_state.month, dia_pago)
 
-    st.session_state.gastos.append({
+    gasto = {
         "Nombre": nombre,
         "Monto": monto,
         "Frecuencia": frecuencia,
@@ -430,15 +435,31 @@ def agregar_gasto():
         "Deuda total": deuda_total if es_deuda else None,
         "Plazo (meses)": plazo if es_deuda else None,
         "Pagos realizados": pagos_realizados if es_deuda else None,
+        "Tasa anual (%)": tasa_anual if es_deuda else None,
         "Distribucion personalizada": usar_distribucion_personalizada,
         "Distribucion semanas": distribucion_semanas
-    })
-
-def eliminar_ingreso(index):
-    del st.session_state.ingresos[index]
-
-def eliminar_gasto(index):
-    del st.session_state.gastos[index]
+    }
+    st.session_state.gastos.agregar(guardar_registros("gastos", [gasto], st.session_state.get("ruta_bd")))
+
+def guardar_edicion(tabla, clave, ids):
+    """Valida todos los cambios de la tabla editable y los aplica juntos: una transacción y un solo recálculo"""
+    cambios = st.session_state[clave]["edited_rows"]
+    if not cambios:
+        return
+    edicion = preparar_edicion(st.session_state[tabla], ids, cambios, st.session_state.year, st.session_state.month)
+    if edicion["errores"]:
+        st.session_state[f"{tabla}_errores_edicion"] = edicion["errores"]
+        return
+    aplicar_edicion(st.session_state[tabla], edicion, st.session_state.get("ruta_bd"))
+    st.session_state[f"{tabla}_version"] = st.session_state.get(f"{tabla}_version", 0) + 1
+    st.session_state[f"{tabla}_edicion_aplicada"] = (len(edicion["ids_actualizados"]), len(edicion["ids_eliminados"]))
+
+def aplicar_reprogramacion(ids, distribuciones):
+    """Guarda la reprogramación como distribución personalizada de cada gasto movido"""
+    campos = {"Distribucion personalizada": [True] * len(ids), "Distribucion semanas": distribuciones}
+    actualizar_registros("gastos", ids, campos, st.session_state.get("ruta_bd"))
+    st.session_state.gastos.actualizar(ids, campos)
+    st.session_state.reprogramacion_aplicada = len(ids)
 
 ## INTEN   
 def reset_form():
@@ -446,14 +467,14 @@ def reset_form():
     st.session_state.reset_gasto = True  # 🔁 Bandera de limpieza
 
     for key in [
-        "gasto_nombre", "gasto_monto", "gasto_frec", "gasto_dia_pago",
-        "es_deuda", "deuda_total", "plazo", "pagos_realizados",
+        "gasto_nombre", "gasto_monto", "gasto_frec", "gasto_fijar_dia", "gasto_dia_pago",
+        "es_deuda", "deuda_total", "plazo", "pagos_realizados", "tasa_anual",
         "distribucion_personalizada"
     ]:
         if key in st.session_state:
             del st.session_state[key]
 
-    for i in range(1, 5):
+    for i in range(1, MAX_SEMANAS_MES + 1):
         st.session_state.pop(f"semana_{i}_monto", None)
 
     st.session_state.pop("campos_distribucion_inicializados", None)
@@ -482,9 +503,16 @@ with col2:
 st.session_state.month = month
 st.session_state.year = year
 
-# Obtener las semanas del mes
-semanas = get_month_calendar(year, month)
-nombres_semanas = [format_date_range(start, end) for start, end in semanas]
+# Obtener las semanas del mes desde el calendario precalculado
+calendario_seleccionado = calendario_mes(year, month)
+semanas = calendario_seleccionado.semanas
+nombres_semanas = calendario_seleccionado.nombres
+
+# Límite de registros por usuario: acota la memoria de cada sesión en modo multiusuario
+cupo = cupo_registros()
+sin_cupo = cupo is not None and cupo <= 0
+if sin_cupo:
+    st.warning(f"⚠ Llegaste al límite de {MAX_REGISTROS_USUARIO:,} registros. Elimina algunos para agregar más.")
 
 # ---------- INGRESOS ----------
 st.subheader("🟢 Registrar Ingreso")
@@ -500,13 +528,12 @@ with st.form("form_ingreso", clear_on_submit=True):
     
     # Mostrar selector de día de pago solo para pagos mensuales
     if st.session_state.get("ingreso_frec") == "Mensual":
-        _, ultimo_dia = calendar.monthrange(year, month)
-        st.number_input("Día de pago en el mes", min_value=1, max_value=ultimo_dia, step=1, key="ingreso_dia_pago")
+        st.number_input("Día de pago en el mes", min_value=1, max_value=calendario_seleccionado.dias_en_mes, step=1, key="ingreso_dia_pago")
     else:
         if "ingreso_dia_pago" not in st.session_state:
             st.session_state.ingreso_dia_pago = 1
 
-    submitted_ingreso = st.form_submit_button("Agregar ingreso", on_click=agregar_ingreso)
+    submitted_ingreso = st.form_submit_button("Agregar ingreso", on_click=agregar_ingreso, disabled=sin_cupo)
     if submitted_ingreso:
         st.success("✅ Ingreso registrado")
 
@@ -528,6 +555,15 @@ st.number_input("Monto del gasto ($)", min_value=0.0, step=100.0, key="gasto_mon
 st.selectbox("Frecuencia", ["Diario", "Semanal", "Quincenal", "Mensual"], key="gasto_frec", 
              index=["Diario", "Semanal", "Quincenal", "Mensual"].index(frec_default))
 
+# Mostrar selector de día de pago solo para pagos mensuales que lo fijan (sin fijarlo, el último día del mes)
+if st.session_state.get("gasto_frec") == "Mensual":
+    st.checkbox("¿Tiene un día de pago fijo?", key="gasto_fijar_dia",
+                help="Sin día fijo, el pago cae el último día del mes y puede reprogramarse a otra semana.")
+    if st.session_state.gasto_fijar_dia:
+        st.number_input("Día de pago en el mes", min_value=1, max_value=31, step=1, key="gasto_dia_pago",
+                        value=calendario_seleccionado.dias_en_mes,
+                        help="Si el mes tiene menos días, el pago se registra el último día del mes.")
+
 # Checkbox de deuda y distribución personalizada
 st.checkbox("¿Es una deuda?", key="es_deuda")
 st.checkbox("¿Quieres personalizar la distribución del pago?", key="distribucion_personalizada")
@@ -537,33 +573,24 @@ if st.session_state.es_deuda:
     st.number_input("Monto total de la deuda", min_value=0.0, step=100.0, key="deuda_total")
     st.number_input("Plazo (meses)", min_value=1, step=1, key="plazo")
     st.number_input("Pagos realizados", min_value=0, step=1, key="pagos_realizados")
+    st.number_input("Tasa de interés anual (%)", min_value=0.0, max_value=100.0, step=0.5, key="tasa_anual",
+                    help="Con el monto total, permite calcular el saldo, los intereses y la fecha de liquidación.")
 
 # Si se activa distribución personalizada
 guardar = True  # Por defecto se puede guardar
 if st.session_state.distribucion_personalizada:
     st.markdown("### Personaliza la distribución del gasto por semanas")
 
-    gasto_monto = st.session_state.get("gasto_monto", 0.0)
-    gasto_frec = st.session_state.get("gasto_frec", "Semanal")
-
-    if gasto_frec == "Quincenal":
-        total_esperado = gasto_monto * 2
-    elif gasto_frec == "Mensual":
-        total_esperado = gasto_monto
-    elif gasto_frec == "Semanal":
-        total_esperado = gasto_monto * 4
-    elif gasto_frec == "Diario":
-        total_esperado = gasto_monto * 7 * 4
-    else:
-        total_esperado = gasto_monto
-
-    semanas_activas = [1, 2, 3, 4]
+    valores, total_esperado, permitidas = distribucion_formulario()
     st.write(f"Total a distribuir: ${total_esperado:,.2f}")
 
-    for i in semanas_activas:
-        st.number_input(f"Semana {i}", min_value=0.0, step=100.0, key=f"semana_{i}_monto")
+    # Una casilla por semana real del mes; al cambiar una, el resto del total se reparte entre las demás
+    for i, nombre_semana in enumerate(nombres_semanas, start=1):
+        st.number_input(f"Semana {i} ({nombre_semana})", min_value=0.0, step=100.0, key=f"semana_{i}_monto",
+                        disabled=not permitidas[i - 1], on_change=redistribuir_resto, args=(i,))
+    st.button("Ajustar al total", on_click=manejar_redistribucion)
 
-    suma = sum(st.session_state.get(f"semana_{i}_monto", 0.0) for i in semanas_activas)
+    suma = sum(st.session_state.get(f"semana_{i}_monto", 0.0) for i in range(1, len(nombres_semanas) + 1))
     if abs(suma - total_esperado) > 0.01:
         st.warning("⚠ La suma no coincide con el total esperado.")
         guardar = False
@@ -571,7 +598,7 @@ if st.session_state.distribucion_personalizada:
         st.success("✅ Distribución válida.")
 
 # Botón para agregar gasto
-if st.button("Agregar gasto"):
+if st.button("Agregar gasto", disabled=sin_cupo):
     if st.session_state.gasto_monto <= 0 or st.session_state.gasto_nombre.strip() == "":
         st.error("Completa todos los campos obligatorios.")
     elif st.session_state.distribucion_personalizada and not guardar:
@@ -586,159 +613,158 @@ if st.button("Agregar gasto"):
 # Apagar la bandera después del rerun
 if st.session_state.reset_gasto:
     st.session_state.reset_gasto = False
+
+# ---------- IMPORTAR ARCHIVO ----------
+with st.expander("📥 Importar ingresos o gastos desde CSV/Excel"):
+    tabla_importacion = st.radio("Registrar como", ["ingresos", "gastos"], format_func=str.capitalize,
+                                 horizontal=True, key="tabla_importacion")
+    archivo_importacion = st.file_uploader("Archivo", type=["csv", "gz", "xlsx", "xlsm"], key="archivo_importacion")
+    if archivo_importacion is not None:
+        encabezados = columnas_archivo(archivo_importacion, archivo_importacion.name)
+        opciones = [None] + encabezados
+        mapeo = {}
+        columnas_mapeo = st.columns(len(CAMPOS_IMPORTACION[tabla_importacion]))
+        for col, campo in zip(columnas_mapeo, CAMPOS_IMPORTACION[tabla_importacion]):
+            # Proponer la columna con el mismo nombre que el campo, si existe
+            sugerida = next((e for e in encabezados if e.strip().lower() == campo.lower()), None)
+            with col:
+                mapeo[campo] = st.selectbox(
+                    campo + (" *" if campo in CAMPOS_OBLIGATORIOS else ""), opciones,
+                    index=opciones.index(sugerida), format_func=lambda opcion: opcion or "—",
+                    key=f"mapeo_{tabla_importacion}_{campo}"
+                )
+        if st.button("Importar"):
+            try:
+                ids, columnas, descartadas = importar_archivo(archivo_importacion, archivo_importacion.name,
+                                                              tabla_importacion, mapeo, st.session_state.get("ruta_bd"),
+                                                              max_filas=cupo)
+                # Un solo lote al libro: las tablas de abajo ya lo muestran en esta misma ejecución
+                st.session_state[tabla_importacion].agregar_columnas(ids, columnas)
+                st.success(f"✅ Se importaron {len(ids):,} {tabla_importacion}.")
+                if descartadas:
+                    st.warning(f"⚠ Se descartaron {descartadas:,} filas sin nombre, con monto no positivo, "
+                               "frecuencia desconocida o día de pago fuera de 1 a 31.")
+            except ValueError as e:
+                st.error(str(e))
     
 # ---------- INGRESOS REGISTRADOS ----------
 st.subheader("💰 Ingresos registrados")
 
 if st.session_state.ingresos:
-    df_ingresos = pd.DataFrame(st.session_state.ingresos)
-
-    # Crear copia para mostrar
-    df_ingresos_display = df_ingresos.copy()
-    df_ingresos_display["Monto"] = df_ingresos_display["Monto"].apply(lambda x: f"${x:,.2f}")
-
-    # Formatear columna "Día de pago" si aplica
-    if "Día de pago" in df_ingresos_display.columns:
-        df_ingresos_display["Día de pago"] = df_ingresos_display["Día de pago"].fillna("—")
-
-    # Mostrar tabla
-    st.dataframe(df_ingresos_display, use_container_width=True)
-
+    # Página visible editable; marca "Eliminar" o cambia celdas y guarda todo junto
+    editor_registros("ingresos", "ingresos")
 else:
     st.info("Aún no has registrado ingresos.")
 
-st.markdown("### Eliminar ingreso")
-for i, ingreso in enumerate(st.session_state.ingresos):
-    st.write(f"{i+1}. {ingreso['Nombre']} - ${ingreso['Monto']:,.2f}")
-    if st.button(f"Eliminar ingreso {i+1}", key=f"eliminar_ingreso_{i}"):
-        eliminar_ingreso(i)
-        st.rerun()
-    
 # ---------- GASTOS REGISTRADOS ----------
 st.subheader("💸 Gastos registrados")
 if st.session_state.gastos:
-    df_gastos = pd.DataFrame(st.session_state.gastos)
-    # Crear una copia del DataFrame para evitar modificar los valores originales
-    df_gastos_display = df_gastos.copy()
-    df_gastos_display["Monto"] = df_gastos_display["Monto"].apply(lambda x: f"${x:,.2f}")
-    if "Deuda total" in df_gastos_display.columns:
-        df_gastos_display["Deuda total"] = df_gastos_display["Deuda total"].apply(lambda x: f"${x:,.2f}" if pd.notnull(x) else "")
-    
-    # Ocultar columnas técnicas de distribución para una mejor visualización
-    columnas_mostrar = [col for col in df_gastos_display.columns if col != "Distribucion semanas"]
+    gastos_libro = st.session_state.gastos
+    editor_registros("gastos", "gastos")
     
-    st.dataframe(df_gastos_display[columnas_mostrar])
-    
-    # Mostrar detalles de la distribución personalizada de gastos
+    # Mostrar detalles de la distribución personalizada de gastos: una fila por gasto, solo la página visible
     st.subheader("📊 Detalle de distribución de gastos por semana")
-    gastos_con_distribucion = df_gastos[df_gastos["Distribucion personalizada"] == True]
+    personalizados = np.flatnonzero(gastos_libro.personalizada)
     
-    if not gastos_con_distribucion.empty:
-        for _, gasto in gastos_con_distribucion.iterrows():
-            st.write(f"**{gasto['Nombre']} (${gasto['Monto']:,.2f}):**")
-            distribucion = gasto.get("Distribucion semanas", {})
-            for semana, monto in distribucion.items():
-                if isinstance(monto, (int, float)) and monto > 0:
-                    st.write(f"- {semana}: ${monto:,.2f}")
+    if personalizados.size:
+        inicio, fin = pagina_tabla(personalizados.size, "distribuciones")
+        pagina = personalizados[inicio:fin]
+        semanas_df = pd.DataFrame(gastos_libro.distribucion[pagina],
+                                  columns=[f"Semana {i}" for i in range(1, MAX_SEMANAS_MES + 1)])
+        semanas_df.insert(0, "Nombre", gastos_libro.nombres[pagina])
+        semanas_df.insert(1, "Monto", gastos_libro.montos[pagina])
+        st.dataframe(semanas_df.mask(semanas_df == 0).style.format("${:,.2f}", subset=semanas_df.columns[1:], na_rep="—"),
+                     width="stretch", hide_index=True)
     else:
         st.info("No hay gastos con distribución personalizada.")
+
+    # Amortización de las deudas: los pagos se detienen al liquidarlas o al terminar su plazo
+    deudas_df = deudas_en_cache(gastos_libro.huella, st.session_state.year, st.session_state.month, gastos_libro)
+    if len(deudas_df):
+        st.subheader("💳 Amortización de deudas")
+        st.dataframe(
+            deudas_df.style
+            .format({"Saldo actual": "${:,.2f}", "Total por pagar": "${:,.2f}", "Intereses por pagar": "${:,.2f}",
+                     "Saldo al terminar el plazo": "${:,.2f}"}, na_rep="—")
+            .format({"Tasa anual (%)": "{:.2f}%", "Fecha de liquidación": "{:%b %Y}"}, na_rep="—")
+        )
+
+        with st.expander("🧮 Estrategias de pago de deudas"):
+            st.caption("Cada mes se pagan los cargos de todas las deudas y lo que sobra del presupuesto para deudas "
+                       "(más el pago extra) se destina a la primera deuda pendiente del orden. El pago extra nunca "
+                       "deja en negativo el saldo acumulado de ninguna semana de la proyección.")
+            objetivo_estrategia = st.radio("Minimizar", OBJETIVOS_ESTRATEGIA, horizontal=True, key="objetivo_estrategia",
+                                           format_func={"Intereses": "Intereses pagados", "Tiempo": "Tiempo hasta quedar sin deudas"}.get)
+            extra_mensual = st.number_input("Pago extra mensual máximo", min_value=0.0, step=100.0, key="extra_mensual")
+            meses_estrategia = st.selectbox("Horizonte (meses)", [12, 24, 36, 60, 120], index=3, key="meses_estrategia")
+            orden_propio = st.multiselect("Orden propio (prioridad de pago)", list(deudas_df["Nombre"]), key="orden_propio")
+
+            problema, estrategias = estrategias_en_cache(
+                st.session_state.ingresos.huella, gastos_libro.huella, st.session_state.year, st.session_state.month,
+                meses_estrategia, extra_mensual, objetivo_estrategia, tuple(orden_propio),
+                st.session_state.ingresos, gastos_libro,
+            )
+            if estrategias:
+                estrategias_df = pd.DataFrame({
+                    "Estrategia": ["Solo cargos programados"] + [e["estrategia"] for e in estrategias],
+                    "Orden": [""] + [" → ".join(e["orden"]) for e in estrategias],
+                    "Intereses": [problema.intereses_minimos] + [e["intereses"] for e in estrategias],
+                    "Meses sin deudas": [problema.meses_minimos] + [e["meses_libre"] for e in estrategias],
+                    "Saldo pendiente": [np.nan] + [e["saldo_pendiente"] for e in estrategias],
+                })
+                estrategias_df["Meses sin deudas"] = estrategias_df["Meses sin deudas"].where(estrategias_df["Meses sin deudas"] >= 0)
+                st.dataframe(estrategias_df.style.format(
+                    {"Intereses": "${:,.2f}", "Saldo pendiente": "${:,.2f}", "Meses sin deudas": "{:.0f}"},
+                    na_rep="—"))
+
+                mejor = estrategias[-1]
+                if mejor["meses_libre"] >= 0:
+                    st.success(f"{mejor['estrategia']}: sin deudas en {mejor['meses_libre']} meses, con "
+                               f"${problema.intereses_minimos - mejor['intereses']:,.2f} menos de intereses que "
+                               f"pagando solo los cargos programados.")
+                else:
+                    st.warning(f"Ninguna estrategia liquida todas las deudas en {meses_estrategia} meses; "
+                               f"con la mejor quedan ${mejor['saldo_pendiente']:,.2f} pendientes.")
+                meses_pago = np.datetime64(f"{st.session_state.year:04d}-{st.session_state.month:02d}", "M") + np.arange(meses_estrategia)
+                pagos_df = pd.DataFrame(mejor["pagos"].T, columns=problema.nombres,
+                                        index=pd.Index(meses_pago.astype("datetime64[ns]"), name="Mes"))
+                st.dataframe(pagos_df.loc[pagos_df.sum(axis=1) > 0].style.format("${:,.2f}").format_index("{:%b %Y}"))
+            else:
+                st.info("Registra el monto total de tus deudas para comparar estrategias de pago.")
 else:
     st.info("Aún no has registrado gastos")
 
-st.markdown("### Eliminar gasto")
-for i, gasto in enumerate(st.session_state.gastos):
-    st.write(f"{i+1}. {gasto['Nombre']} - ${gasto['Monto']:,.2f}")
-    if st.button(f"Eliminar gasto {i+1}", key=f"eliminar_gasto_{i}"):
-        eliminar_gasto(i)
-        st.rerun()
-
 # ---------- FLUJO MENSUAL POR SEMANAS ----------
 st.subheader("📊 Flujo Financiero Mensual (Cascada)")
 
+if st.session_state.pop("reprogramacion_aplicada", None):
+    st.success("✅ Se aplicó la reprogramación: los gastos movidos ahora tienen distribución personalizada.")
+
+# Formato de los archivos de descarga de esta sección y del simulador
+formato_descarga = st.selectbox("Formato de descarga", list(FORMATOS_EXPORTACION), key="formato_descarga")
+
 # Campo para ingreso manual del saldo inicial
 #ingreso_inicial = st.number_input("Introduce el saldo inicial ($):", min_value=0.0, step=100.0)
 
-if st.button("Calcular flujo mensual en cascada"): 
+# Una vez calculada, la cascada sigue visible en los reruns (al abrir el detalle de una semana,
+# al editar registros...) y se recalcula desde la caché solo si cambian los libros
+if st.button("Calcular flujo mensual en cascada"):
+    st.session_state.cascada_calculada = True
+
+if st.session_state.get("cascada_calculada"):
     if not st.session_state.ingresos or not st.session_state.gastos:
         st.warning("Necesitas registrar al menos un ingreso y un gasto para calcular el flujo.")
     else:
         try:
-            df_ing = pd.DataFrame(st.session_state.ingresos)
-            df_gas = pd.DataFrame(st.session_state.gastos)
-
-            # Aseguramos que los montos sean numéricos
-            df_ing["Monto"] = pd.to_numeric(df_ing["Monto"])
-            df_gas["Monto"] = pd.to_numeric(df_gas["Monto"])
-
-            # Determinar inicio y fin del mes real
-            primer_dia_mes = date(st.session_state.year, st.session_state.month, 1)
-            ultimo_dia_mes = date(st.session_state.year, st.session_state.month, monthrange(st.session_state.year, st.session_state.month)[1])
+            # Los libros ya tienen columnas tipadas: se leen directamente, sin copiar
+            ingresos = st.session_state.ingresos
+            gastos = st.session_state.gastos
 
-            nombres_etapas = []
-            valores = []
-            medidas = [] # Primera barra es absoluta
+            # Resumen y detalle del mes, reutilizados mientras no cambie el contenido de los libros
+            flujo = obtener_flujo_mensual(ingresos, gastos, st.session_state.year, st.session_state.month)
+            saldo_acumulado = flujo["saldo"][-1]
 
-            semanas = get_month_calendar(st.session_state.year, st.session_state.month)
-            num_semanas = len(semanas)
-            
-            # Inicializar el saldo acumulado con el ingreso inicial
-            saldo_acumulado = 0
-            
-            # Lista para almacenar el flujo por semana (para tabla y análisis)
-            flujo_por_semana = []
-
-            # Procesar semana por semana para el acumulado correcto
-            for i, (inicio, fin) in enumerate(semanas):
-                semana_num = i + 1
-                nombre_semana = format_date_range(inicio, fin)
-                
-                # Calcular ingresos semanales para esta semana
-                ingresos_semana = 0
-                for _, ingreso in df_ing.iterrows():
-                    monto = ingreso["Monto"]
-                    frecuencia = ingreso["Frecuencia"]
-                    
-                    # Ingresos diarios
-                    if frecuencia == "Diario":
-                        ingresos_semana += monto * 7  # 7 días por semana
-                    
-                    # Ingresos semanales
-                    elif frecuencia == "Semanal":
-                        ingresos_semana += monto
-                    
-                    # Ingresos quincenales (semanas 1 y 3)
-                    elif frecuencia == "Quincenal" and semana_num in [1, 3]:
-                        ingresos_semana += monto
-                    
-                    # Ingresos mensuales (solo semana 1)
-                    elif frecuencia == "Mensual" and semana_num == 1:
-                        ingresos_semana += monto
-                
-                # Calcular gastos semanales para esta semana
-                gastos_semana = calcular_gasto_semanal(df_gas, semana_num, semanas, num_semanas)
-                
-                # Actualizar el saldo acumulado
-                saldo_acumulado = saldo_acumulado + ingresos_semana - gastos_semana
-                
-                # Guardar datos para la tabla de análisis
-                flujo_por_semana.append({
-                    "Semana": nombre_semana,
-                    "Ingresos": ingresos_semana,
-                    "Gastos": gastos_semana,
-                    "Flujo": ingresos_semana - gastos_semana,
-                    "Saldo Acumulado": saldo_acumulado
-                })
-                
-                # Agregar etapas para el gráfico de cascada
-                if ingresos_semana > 0:
-                    nombres_etapas.append(f"+ Ingresos {nombre_semana}")
-                    valores.append(ingresos_semana)
-                    medidas.append("relative")
-                
-                if gastos_semana > 0:
-                    nombres_etapas.append(f"- Gastos {nombre_semana}")
-                    valores.append(-gastos_semana)
-                    medidas.append("relative")
+            nombres_etapas, valores, medidas = etapas_cascada(flujo)
 
             # Valor final para el gráfico
             nombres_etapas.append("Saldo final")
@@ -764,19 +790,23 @@ if st.button("Calcular flujo mensual en cascada"):
                 showlegend=False
             )
 
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, width="stretch")
             
-            # Crear DataFrame para análisis
-            flujo_df = pd.DataFrame(flujo_por_semana)
+            # Crear DataFrame para análisis, con el saldo más bajo de cada semana según el flujo día a día
+            diario = obtener_flujo_diario(ingresos, gastos, st.session_state.year, st.session_state.month, 1)
+            flujo_df = tabla_flujo(flujo)
+            flujo_df["Saldo Mínimo"] = agregar_semanas(diario["saldo"], np.min)
             
             # Análisis del flujo mensual
-            flujo_total = flujo_df["Flujo"].sum()
             semanas_negativas = flujo_df[flujo_df["Saldo Acumulado"] < 0]
             
             if saldo_acumulado < 0:
                 st.error(f"❌ Tu saldo final del mes es negativo: ${saldo_acumulado:,.2f}")
             else:
                 st.success(f"✅ Tu saldo final del mes es positivo: ${saldo_acumulado:,.2f}")
+
+            # Cada movimiento en su fecha real: sobregiros dentro de la semana
+            mostrar_saldo_diario(diario, "del mes")
             
             if not semanas_negativas.empty:
                 st.warning(f"⚠ Tienes {len(semanas_negativas)} semana(s) con saldo acumulado negativo. Considera reorganizar tus pagos.")
@@ -784,219 +814,102 @@ if st.button("Calcular flujo mensual en cascada"):
                 # Sugerencias para mejorar el flujo
                 st.subheader("🔄 Sugerencias para mejorar el flujo")
                 
-                # Buscar semanas con flujo positivo alto que pueden ayudar a semanas negativas
-                semanas_positivas = flujo_df[flujo_df["Flujo"] > 0].sort_values(by="Flujo", ascending=False)
-                semanas_negativas = semanas_negativas.sort_values(by="Saldo Acumulado")
-                
-                if not semanas_positivas.empty:
-                    st.write("Puedes considerar estas reorganizaciones:")
-                    
-                    # Buscar gastos que puedan moverse basados en si tienen distribución personalizada
-                    gastos_movibles = df_gas[
-                        (df_gas["Monto"] > 0)
-                    ].sort_values(by="Monto", ascending=False)
-                    
-                    if not gastos_movibles.empty:
-                        for _, gasto in gastos_movibles.iterrows():
-                            # Para gastos sin distribución personalizada, sugerir activarla
-                            if not gasto.get("Distribucion personalizada", False):
-                                st.write(f"- El gasto '{gasto['Nombre']}' (${gasto['Monto']:,.2f}) podría distribuirse de manera personalizada entre semanas")
-                            # Para gastos con distribución personalizada, sugerir redistribuir
-                            else:
-                                st.write(f"- Podrías ajustar la distribución actual del gasto '{gasto['Nombre']}' para aliviar semanas con saldo negativo")
-                    else:
-                        st.write("No se encontraron gastos que puedan moverse entre semanas.")
+                # Posponer partes de los gastos movibles (sin deudas ni día de pago fijo) con el mínimo de movimientos
+                reprogramacion = reprogramar_gastos(flujo, gastos)
+                movimientos = reprogramacion["movimientos"]
+
+                if movimientos:
+                    st.write(f"Con estos {len(movimientos)} movimiento(s) el saldo acumulado queda así:")
+                    gastos_movibles = pd.DataFrame({
+                        "Gasto": gastos.nombres[[m.posicion for m in movimientos]],
+                        "Mover de": [flujo["nombres"][m.desde] for m in movimientos],
+                        "A": [flujo["nombres"][m.hacia] for m in movimientos],
+                        "Monto": [m.monto for m in movimientos],
+                    })
+                    st.dataframe(gastos_movibles.style.format({"Monto": "${:,.2f}"}), hide_index=True)
+                    st.dataframe(
+                        pd.DataFrame({"Semana": flujo["nombres"], "Saldo Acumulado": flujo["saldo"],
+                                      "Saldo reprogramado": reprogramacion["saldo"]})
+                        .style.format({"Saldo Acumulado": "${:,.2f}", "Saldo reprogramado": "${:,.2f}"}),
+                        hide_index=True,
+                    )
+                    if reprogramacion["deficit"] > 0:
+                        st.write(f"Aun así faltan ${reprogramacion['deficit']:,.2f} para cerrar el mes sin saldo negativo: "
+                                 "mover gastos dentro del mes no cambia el saldo final.")
+
+                    posiciones, distribuciones = distribuciones_reprogramadas(reprogramacion)
+                    st.button("Aplicar reprogramación", on_click=aplicar_reprogramacion,
+                              args=(gastos.ids[posiciones].tolist(), distribuciones))
                 else:
-                    st.write("No hay semanas con flujo positivo suficiente para compensar las semanas negativas.")
+                    st.write("No se encontraron gastos que puedan moverse entre semanas.")
             
             # Mostrar análisis detallado por semana
             st.subheader("📊 Análisis detallado por semana")
             
-            for i, (semana_inicio, semana_fin) in enumerate(semanas):
-                semana_num = i + 1
-                nombre_semana = nombres_semanas[i]
-                
-                st.write(f"### Semana {semana_num}: {nombre_semana}")
-                
-                # Calcular ingresos detallados para esta semana
-                ingresos_detalle = []
-                for _, ingreso in df_ing.iterrows():
-                    monto = ingreso["Monto"]
-                    frecuencia = ingreso["Frecuencia"]
-                    nombre = ingreso["Nombre"]
-                    
-                    # Determinar si el ingreso aplica para esta semana
-                    ingreso_aplica = False
-                    monto_aplicado = 0
-                    
-                    if frecuencia == "Diario":
-                        ingreso_aplica = True
-                        monto_aplicado = monto * 7  # 7 días por semana
-                    elif frecuencia == "Semanal":
-                        ingreso_aplica = True
-                        monto_aplicado = monto
-                    elif frecuencia == "Quincenal" and semana_num in [1, 3]:
-                        ingreso_aplica = True
-                        monto_aplicado = monto
-                    elif frecuencia == "Mensual" and semana_num == 1:
-                        ingreso_aplica = True
-                        monto_aplicado = monto
-                    
-                    if ingreso_aplica:
-                        ingresos_detalle.append({
-                            "Nombre": nombre,
-                            "Monto": monto_aplicado,
-                            "Frecuencia": frecuencia
-                        })
-                
-                # Calcular gastos detallados para esta semana
-                gastos_detalle = []
-                for _, gasto in df_gas.iterrows():
-                    monto = gasto["Monto"]
-                    frecuencia = gasto["Frecuencia"]
-                    nombre = gasto["Nombre"]
-                    distribucion_personalizada = gasto.get("Distribucion personalizada", False)
-                    
-                    # Determinar monto aplicado según si es distribución personalizada o no
-                    monto_aplicado = 0
-                    
-                    if distribucion_personalizada:
-                        # Usar la distribución personalizada si existe
-                        distribucion_semanas = gasto.get("Distribucion semanas", {})
-                        semana_key = f"Semana {semana_num}"
-                        if semana_key in distribucion_semanas:
-                            monto_aplicado = distribucion_semanas[semana_key]
-                    else:
-                        # Verificar fechas específicas para esta semana
-                        if frecuencia == "Diario":
-                            monto_aplicado = monto * (fin - semana_inicio).days + 1  # días en esta semana
-                        elif frecuencia == "Semanal":
-                            # Verificar si hay algún sábado en esta semana
-                            current_date = semana_inicio
-                            while current_date <= semana_fin:
-                                if current_date.weekday() == 5:  # 5 es sábado
-                                    monto_aplicado = monto
-                                    break
-                                current_date += timedelta(days=1)
-                        elif frecuencia == "Quincenal":
-                            # Verificar si el día 15 cae en esta semana
-                            dia_15 = date(semana_inicio.year, semana_inicio.month, 15)
-                            if semana_inicio <= dia_15 <= semana_fin:
-                                monto_aplicado = monto
-                        elif frecuencia == "Mensual":
-                            # Verificar si el último día del mes cae en esta semana
-                            ultimo_dia = date(semana_inicio.year, semana_inicio.month, 
-                                        calendar.monthrange(semana_inicio.year, semana_inicio.month)[1])
-                            if semana_inicio <= ultimo_dia <= semana_fin:
-                                monto_aplicado = monto
-                    
-                    if monto_aplicado > 0:
-                        gastos_detalle.append({
-                            "Nombre": nombre,
-                            "Monto": monto_aplicado,
-                            "Frecuencia": frecuencia,
-                            "Distribución": "Personalizada" if distribucion_personalizada else "Por defecto"
-                        })
-                
-                # Mostrar tablas de ingresos y gastos para esta semana
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    st.write("#### Ingresos")
-                    if ingresos_detalle:
-                        df_ing_semana = pd.DataFrame(ingresos_detalle)
-                        df_ing_semana["Monto"] = df_ing_semana["Monto"].apply(lambda x: f"${x:,.2f}")
-                        st.dataframe(df_ing_semana, hide_index=True)
-                        total_ingresos_semana = sum(ingreso["Monto"] for ingreso in ingresos_detalle)
-                        st.write(f"**Total ingresos:** ${total_ingresos_semana:,.2f}")
-                    else:
-                        st.info("No hay ingresos para esta semana")
-                
-                with col2:
-                    st.write("#### Gastos")
-                    if gastos_detalle:
-                        df_gas_semana = pd.DataFrame(gastos_detalle)
-                        df_gas_semana["Monto"] = df_gas_semana["Monto"].apply(lambda x: f"${x:,.2f}")
-                        st.dataframe(df_gas_semana, hide_index=True)
-                        total_gastos_semana = sum(gasto["Monto"] for gasto in gastos_detalle)
-                        st.write(f"**Total gastos:** ${total_gastos_semana:,.2f}")
-                    else:
-                        st.info("No hay gastos para esta semana")
-                
-                # Obtener el flujo y saldo acumulado de esta semana desde el DataFrame
-                semana_info = flujo_df[flujo_df["Semana"] == nombre_semana].iloc[0]
-                flujo_semana = semana_info["Flujo"]
-                saldo_acumulado_semana = semana_info["Saldo Acumulado"]
-                
-                # Mostrar flujo y saldo acumulado con estilo según si el saldo acumulado es negativo
-                if saldo_acumulado_semana < 0:
-                    st.error(f"❌ Flujo de la semana: ${flujo_semana:,.2f}")
-                    st.error(f"❌ Saldo acumulado: ${saldo_acumulado_semana:,.2f}")
-                else:
-                    st.success(f"✅ Flujo de la semana: ${flujo_semana:,.2f}")
-                    st.success(f"✅ Saldo acumulado: ${saldo_acumulado_semana:,.2f}")
-                
-                st.markdown("---")
-                
-            # Tabla detallada de movimientos por semana
-            tabla_detalle = []
-            for i, (inicio, fin) in enumerate(semanas):
-                semana_num = i + 1
-                nombre_semana = format_date_range(inicio, fin)
-
-                # Ingresos
-                for _, ingreso in df_ing.iterrows():
-                    monto = ingreso["Monto"]
-                    frecuencia = ingreso["Frecuencia"]
-                    aplica = (
-                        (frecuencia == "Diario") or
-                        (frecuencia == "Semanal") or
-                        (frecuencia == "Quincenal" and semana_num in [1, 3]) or
-                        (frecuencia == "Mensual" and semana_num == 1)
+            # Un panel por semana con su resumen en el título; el detalle solo se arma al abrirlo,
+            # leyendo el grupo de la semana ya calculado en la caché
+            for i, nombre_semana in enumerate(flujo["nombres"]):
+                flujo_semana = flujo["flujo"][i]
+                saldo_acumulado_semana = flujo["saldo"][i]
+                saldo_minimo_semana = flujo_df["Saldo Mínimo"][i]
+                icono = "❌" if saldo_acumulado_semana < 0 else "⚠️" if saldo_minimo_semana < 0 else "✅"
+                panel = st.expander(
+                    f"{icono} Semana {i + 1}: {nombre_semana} — flujo ${flujo_semana:,.2f}, saldo ${saldo_acumulado_semana:,.2f}",
+                    key=f"panel_semana_{i}", on_change="rerun",
+                )
+                if not panel.open:
+                    continue
+
+                with panel:
+                    # Ingresos y gastos que aplican en esta semana
+                    df_ing_semana = detalle_agrupado(flujo["por_semana"]["ingresos"], ingresos, i, ["Nombre", "Frecuencia"])
+                    df_gas_semana = detalle_agrupado(flujo["por_semana"]["gastos"], gastos, i, ["Nombre", "Frecuencia"])
+                    filas_gastos = flujo["por_semana"]["gastos"]
+                    df_gas_semana["Distribución"] = np.where(
+                        gastos.personalizada[filas_gastos.filas[filas_gastos.inicios[i]:filas_gastos.inicios[i + 1]]],
+                        "Personalizada", "Por defecto"
                     )
-                    if aplica:
-                        cantidad = monto * 7 if frecuencia == "Diario" else monto
-                        tabla_detalle.append({
-                            "Semana": nombre_semana,
-                            "Orden Semana": semana_num,
-                            "Tipo": "Ingreso",
-                            "Concepto": ingreso["Nombre"],
-                            "Monto": cantidad
-                        })
-
-                # Gastos
-                for _, gasto in df_gas.iterrows():
-                    monto = gasto["Monto"]
-                    frecuencia = gasto["Frecuencia"]
-                    aplica = (
-                        (frecuencia == "Diario") or
-                        (frecuencia == "Semanal") or
-                        (frecuencia == "Quincenal" and semana_num in [1, 3]) or
-                        (frecuencia == "Mensual" and semana_num == 1)
-                    )
-                    if aplica:
-                        cantidad = monto * 7 if frecuencia == "Diario" else monto
-                        tabla_detalle.append({
-                            "Semana": nombre_semana,
-                            "Orden Semana": semana_num,
-                            "Tipo": "Gasto",
-                            "Concepto": gasto["Nombre"],
-                            "Monto": cantidad
-                        })
-
-            # Mostrar tabla detallada ordenada por número real de semana
-            df_detalle = pd.DataFrame(tabla_detalle)
-            df_detalle = df_detalle.sort_values(by=["Orden Semana", "Tipo"], ascending=[True, True])
-            df_detalle = df_detalle.drop(columns=["Orden Semana"])  # Ocultar columna auxiliar
+
+                    # Mostrar tablas de ingresos y gastos para esta semana
+                    col1, col2 = st.columns(2)
+
+                    with col1:
+                        st.write("#### Ingresos")
+                        if not df_ing_semana.empty:
+                            st.dataframe(df_ing_semana.style.format({"Monto": "${:,.2f}"}), hide_index=True)
+                            st.write(f"**Total ingresos:** ${flujo['ingresos'][i]:,.2f}")
+                        else:
+                            st.info("No hay ingresos para esta semana")
+
+                    with col2:
+                        st.write("#### Gastos")
+                        if not df_gas_semana.empty:
+                            st.dataframe(df_gas_semana.style.format({"Monto": "${:,.2f}"}), hide_index=True)
+                            st.write(f"**Total gastos:** ${flujo['gastos'][i]:,.2f}")
+                        else:
+                            st.info("No hay gastos para esta semana")
+
+                    # Flujo y saldo acumulado con estilo según si el saldo acumulado es negativo
+                    if saldo_acumulado_semana < 0:
+                        st.error(f"❌ Flujo de la semana: ${flujo_semana:,.2f}")
+                        st.error(f"❌ Saldo acumulado: ${saldo_acumulado_semana:,.2f}")
+                    else:
+                        st.success(f"✅ Flujo de la semana: ${flujo_semana:,.2f}")
+                        st.success(f"✅ Saldo acumulado: ${saldo_acumulado_semana:,.2f}")
+                    if saldo_minimo_semana < min(saldo_acumulado_semana, 0):
+                        st.warning(f"⚠ Dentro de la semana el saldo baja hasta ${saldo_minimo_semana:,.2f}.")
+
+            # Tabla detallada de movimientos por semana, ordenada por número real de semana
+            df_detalle = flujo["detalle"]
 
             st.subheader("📋 Detalle de movimientos semanales")
-            st.dataframe(df_detalle, use_container_width=True)
+            st.dataframe(df_detalle, width="stretch")
             
-            st.download_button(
-                label="⬇ Descargar movimientos mensuales",
-                data = df_detalle.to_csv(index=False),
-                file_name="Flujo_financiero_mensual.csv",
-                mime="text/csv"
+            boton_exportacion(
+                "⬇ Descargar movimientos mensuales",
+                {"Resumen semanal": flujo_df, "Detalle": df_detalle} if formato_descarga == "Excel" else {"Detalle": df_detalle},
+                "Flujo_financiero_mensual",
+                formato_descarga
             )
             
         except Exception as e:
@@ -1005,143 +918,133 @@ if st.button("Calcular flujo mensual en cascada"):
 
 # ---------- SIMULADOR DE ESCENARIOS ----------
 st.subheader("🔮 Simulador de comportamiento financiero")
+HORIZONTES_MESES = [2, 12, 36, 120]
+horizonte_meses = st.selectbox(
+    "Horizonte de proyección",
+    options=HORIZONTES_MESES,
+    format_func=lambda meses: f"{meses} meses" if meses < 12 else f"{meses // 12} año(s)",
+    key="horizonte_meses"
+)
+st.checkbox("Simular la incertidumbre de los ingresos variables (Monte Carlo)", key="montecarlo")
+if st.session_state.montecarlo:
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.number_input("Escenarios", min_value=1000, max_value=50000, value=10000, step=1000, key="mc_escenarios")
+    with col2:
+        st.slider("Variabilidad de ingresos variables (%)", 0, 100, 30, key="mc_variabilidad_ingresos",
+                  help="Coeficiente de variación del ingreso variable de cada semana")
+    with col3:
+        st.slider("Variabilidad de gastos (%)", 0, 100, 0, key="mc_variabilidad_gastos")
+
+# Como la cascada, la simulación sigue visible en los reruns; se guardan los parámetros con los
+# que se pidió (los controles de Monte Carlo desaparecen al desmarcar la casilla)
 if st.button("Calcular comportamiento financiero proyectado"):
+    st.session_state.simulacion = {
+        "meses": horizonte_meses,
+        "montecarlo": st.session_state.montecarlo,
+        "escenarios": st.session_state.get("mc_escenarios", 10000),
+        "variabilidad_ingresos": st.session_state.get("mc_variabilidad_ingresos", 30) / 100,
+        "variabilidad_gastos": st.session_state.get("mc_variabilidad_gastos", 0) / 100,
+    }
+
+if "simulacion" in st.session_state:
+    parametros = st.session_state.simulacion
+    horizonte_simulado = parametros["meses"]
     if not st.session_state.ingresos or not st.session_state.gastos:
         st.warning("Necesitas registrar al menos un ingreso y un gasto para calcular el flujo.")
     else:
         try:
-            df_ing = pd.DataFrame(st.session_state.ingresos)
-            df_gas = pd.DataFrame(st.session_state.gastos)
-
-            df_ing["Monto"] = pd.to_numeric(df_ing["Monto"])
-            df_gas["Monto"] = pd.to_numeric(df_gas["Monto"])
-
-            nombres_etapas = []
-            valores = []
-            medidas = []
-
-            semanas_actual = get_month_calendar(st.session_state.year, st.session_state.month)
-            saldo_acumulado = 0
-            flujo_por_semana = []
-
-            # MES ACTUAL
-            for i, (inicio, fin) in enumerate(semanas_actual):
-                semana_num = i + 1
-                nombre_semana = format_date_range(inicio, fin)
-
-                ingresos_semana = 0
-                for _, ingreso in df_ing.iterrows():
-                    monto = ingreso["Monto"]
-                    frecuencia = ingreso["Frecuencia"]
-                    if frecuencia == "Diario":
-                        ingresos_semana += monto * 7
-                    elif frecuencia == "Semanal":
-                        ingresos_semana += monto
-                    elif frecuencia == "Quincenal" and semana_num in [1, 3]:
-                        ingresos_semana += monto
-                    elif frecuencia == "Mensual" and semana_num == 1:
-                        ingresos_semana += monto
-
-                gastos_semana = calcular_gasto_semanal(df_gas, semana_num, semanas_actual, len(semanas_actual))
-                saldo_acumulado += ingresos_semana - gastos_semana
-
-                flujo_por_semana.append({
-                    "Semana": nombre_semana,
-                    "Ingresos": ingresos_semana,
-                    "Gastos": gastos_semana,
-                    "Flujo": ingresos_semana - gastos_semana,
-                    "Saldo Acumulado": saldo_acumulado
-                })
-
-                if ingresos_semana > 0:
-                    nombres_etapas.append(f"+ Ingresos {nombre_semana}")
-                    valores.append(ingresos_semana)
-                    medidas.append("relative")
-                if gastos_semana > 0:
-                    nombres_etapas.append(f"- Gastos {nombre_semana}")
-                    valores.append(-gastos_semana)
-                    medidas.append("relative")
-
-            # MES SIGUIENTE
-            if st.session_state.month == 12:
-                next_month = 1
-                next_year = st.session_state.year + 1
-            else:
-                next_month = st.session_state.month + 1
-                next_year = st.session_state.year
-
-            semanas_siguiente = get_month_calendar(next_year, next_month)
-
-            for i, (inicio, fin) in enumerate(semanas_siguiente):
-                semana_num = i + 1
-                nombre_semana = format_date_range(inicio, fin)
-
-                ingresos_semana = 0
-                for _, ingreso in df_ing.iterrows():
-                    monto = ingreso["Monto"]
-                    frecuencia = ingreso["Frecuencia"]
-                    if frecuencia == "Diario":
-                        ingresos_semana += monto * 7
-                    elif frecuencia == "Semanal":
-                        ingresos_semana += monto
-                    elif frecuencia == "Quincenal" and semana_num in [1, 3]:
-                        ingresos_semana += monto
-                    elif frecuencia == "Mensual" and semana_num == 1:
-                        ingresos_semana += monto
-
-                gastos_semana = calcular_gasto_semanal(df_gas, semana_num, semanas_siguiente, len(semanas_siguiente))
-                saldo_acumulado += ingresos_semana - gastos_semana
-
-                flujo_por_semana.append({
-                    "Semana": nombre_semana + " (simulado)",
-                    "Ingresos": ingresos_semana,
-                    "Gastos": gastos_semana,
-                    "Flujo": ingresos_semana - gastos_semana,
-                    "Saldo Acumulado": saldo_acumulado
-                })
-
-                if ingresos_semana > 0:
-                    nombres_etapas.append(f"+ Ingresos {nombre_semana} (simulado)")
-                    valores.append(ingresos_semana)
-                    medidas.append("relative")
-                if gastos_semana > 0:
-                    nombres_etapas.append(f"- Gastos {nombre_semana} (simulado)")
-                    valores.append(-gastos_semana)
-                    medidas.append("relative")
-
-            # Saldo final
-            nombres_etapas.append("Saldo final proyectado")
-            medidas.append("total")
-            valores.append(0)
-
-            fig = go.Figure(go.Waterfall(
-                name="Proyección",
-                orientation="v",
-                measure=medidas,
-                x=nombres_etapas,
-                text=[f"${v:,.2f}" if i < len(valores)-1 else "" for i, v in enumerate(valores)],
-                textposition="outside",
-                y=valores,
-                connector={"line": {"color": "gray"}}
-            ))
-
-            fig.update_layout(
-                title="Flujo financiero proyectado (2 meses)",
-                waterfallgap=0.3,
-                yaxis_title="Saldo ($)",
-                showlegend=False
+            proyeccion = obtener_proyeccion(st.session_state.ingresos, st.session_state.gastos,
+                                            st.session_state.year, st.session_state.month, horizonte_simulado)
+
+            # Las semanas que empiezan después del mes seleccionado son simuladas
+            ultimo_dia_mes = calendario_mes(st.session_state.year, st.session_state.month).ultimo_dia
+            proyeccion["nombres"] = [
+                nombre + " (simulado)" if inicio > ultimo_dia_mes else nombre
+                for nombre, inicio in zip(proyeccion["nombres"], proyeccion["inicios"])
+            ]
+
+            # Barras por semana, mes, trimestre o año según el horizonte; el saldo semanal como línea
+            serie = agregar_periodos(proyeccion, periodo_grafica(proyeccion["fines"]))
+            fig = figura_periodos(
+                serie, proyeccion["fines"], proyeccion["saldo"],
+                f"Flujo financiero proyectado ({horizonte_simulado} meses, por {serie['periodo'].lower()}) — "
+                f"saldo final ${proyeccion['saldo'][-1]:,.2f}",
             )
-
-            st.plotly_chart(fig, use_container_width=True)
-
-            flujo_df = pd.DataFrame(flujo_por_semana)
-            st.dataframe(flujo_df, use_container_width=True)
+            st.plotly_chart(fig, width="stretch")
+            if (serie["saldo_minimo"] < 0).any():
+                primer_negativo = int(np.argmax(serie["saldo_minimo"] < 0))
+                st.warning(f"⚠ El saldo acumulado queda en negativo desde {serie['etiquetas'][primer_negativo]} "
+                           f"(mínimo ${serie['saldo_minimo'].min():,.2f}).")
+
+            mostrar_saldo_diario(obtener_flujo_diario(st.session_state.ingresos, st.session_state.gastos,
+                                                      st.session_state.year, st.session_state.month, horizonte_simulado),
+                                 "de la proyección")
+
+            flujo_df = tabla_flujo(proyeccion)
+            st.dataframe(flujo_df, width="stretch")
             
-            st.download_button(
-                label="⬇ Descargar movimientos bimestrales",
-                data = flujo_df.to_csv(index=False),
-                file_name="Flujo_financiero_bimestral.csv",
-                mime="text/csv"
+            boton_exportacion(
+                "⬇ Descargar movimientos proyectados",
+                {"Proyección": flujo_df},
+                f"Flujo_financiero_proyectado_{horizonte_simulado}_meses",
+                formato_descarga
+            )
+
+            reporte = {"Proyección": flujo_df}
+
+            if parametros["montecarlo"]:
+                st.subheader("🎲 Escenarios de ingresos variables (Monte Carlo)")
+                simulacion = obtener_montecarlo(
+                    st.session_state.ingresos, st.session_state.gastos, st.session_state.year,
+                    st.session_state.month, horizonte_simulado, parametros["escenarios"],
+                    parametros["variabilidad_ingresos"], parametros["variabilidad_gastos"]
+                )
+                if not (st.session_state.ingresos.columna("Tipo") == "Variable").any():
+                    st.info("No hay ingresos de tipo Variable: solo varían los gastos, si indicaste variabilidad.")
+
+                # Bandas de percentiles del saldo acumulado: 5-95 y 25-75 sombreadas, mediana como línea,
+                # en WebGL y con los mismos puntos reducidos para todas las bandas
+                bandas = dict(zip(simulacion["percentiles"], simulacion["bandas"]))
+                puntos = np.union1d(indices_reduccion(bandas[5], MAX_PUNTOS_LINEA // 2),
+                                    indices_reduccion(bandas[95], MAX_PUNTOS_LINEA // 2))
+                x_mc = proyeccion["fines"][puntos]
+                fig_mc = go.Figure()
+                for bajo, alto, opacidad in ((5, 95, 0.15), (25, 75, 0.3)):
+                    fig_mc.add_trace(go.Scattergl(x=x_mc, y=bandas[bajo][puntos], mode="lines", line={"width": 0},
+                                                  showlegend=False, hoverinfo="skip"))
+                    fig_mc.add_trace(go.Scattergl(x=x_mc, y=bandas[alto][puntos], mode="lines", line={"width": 0},
+                                                  fill="tonexty", fillcolor=f"rgba(71, 161, 255, {opacidad})",
+                                                  name=f"Percentil {bajo}-{alto}"))
+                fig_mc.add_trace(go.Scattergl(x=x_mc, y=bandas[50][puntos], mode="lines", name="Mediana",
+                                              line={"color": "rgb(71, 161, 255)"}))
+                fig_mc.update_layout(title=f"Saldo acumulado en {simulacion['escenarios']:,} escenarios",
+                                     yaxis_title="Saldo ($)")
+                st.plotly_chart(fig_mc, width="stretch")
+
+                montecarlo_df = pd.DataFrame({"Semana": proyeccion["nombres"]})
+                for percentil, banda in bandas.items():
+                    montecarlo_df[f"Saldo P{percentil}"] = banda
+                montecarlo_df["Prob. saldo negativo"] = simulacion["prob_saldo_negativo"]
+                st.dataframe(montecarlo_df.style.format({"Prob. saldo negativo": "{:.1%}"}), width="stretch")
+
+                prob_maxima = simulacion["prob_saldo_negativo"].max()
+                if prob_maxima > 0:
+                    semana_critica = proyeccion["nombres"][int(simulacion["prob_saldo_negativo"].argmax())]
+                    st.warning(f"⚠ Hasta {prob_maxima:.1%} de probabilidad de saldo acumulado negativo "
+                               f"(semana {semana_critica}).")
+                else:
+                    st.success("✅ El saldo acumulado se mantiene positivo en todos los escenarios.")
+                reporte["Monte Carlo"] = montecarlo_df
+
+            # Reporte con el mes seleccionado (desde la caché) y la proyección
+            flujo_mes = obtener_flujo_mensual(st.session_state.ingresos, st.session_state.gastos,
+                                              st.session_state.year, st.session_state.month)
+            boton_exportacion(
+                "⬇ Descargar reporte completo",
+                {"Resumen semanal": tabla_flujo(flujo_mes), "Detalle": flujo_mes["detalle"], **reporte},
+                f"Reporte_financiero_{horizonte_simulado}_meses",
+                formato_descarga
             )
 
         except Exception as e:
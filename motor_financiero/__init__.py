@@ -0,0 +1,103 @@
+"""Motor de cálculo del planificador financiero, sin dependencias de Streamlit.
+
+Funciones puras sobre libros de ingresos y gastos: calendario de los meses, flujo
+semanal en cascada, flujo día a día, proyección de varios meses, amortización de deudas y estrategias de pago, edición en bloque, almacenamiento en SQLite e
+importación/exportación de archivos. La aplicación (finanzas.py) es una capa de
+interfaz sobre este paquete y puede usarse igual desde scripts o procesos por lotes.
+"""
+from .almacenamiento import (
+    DIRECTORIO_PERFILES,
+    RUTA_BD,
+    actualizar_registros,
+    aplicar_cambios,
+    cargar_registros,
+    conectar_bd,
+    eliminar_registros,
+    guardar_registros,
+    insertar_columnas,
+    ruta_usuario,
+)
+from .calendario import CalendarioMes, Semana, calendario_mes, format_date_range, get_month_calendar, solo_lectura
+from .deudas import Amortizacion, EstadoDeudas, amortizar, estado_deudas, tabla_deudas
+from .diario import FlujoDiario, agregar_semanas, calcular_flujo_diario, montos_diarios
+from .edicion import CAMPOS_EDITABLES, Edicion, aplicar_edicion, preparar_edicion, tabla_editable
+from .estrategias import (
+    OBJETIVOS_ESTRATEGIA,
+    ProblemaDeudas,
+    ResultadoEstrategia,
+    comparar_estrategias,
+    problema_deudas,
+)
+from .exportacion import FORMATOS_EXPORTACION, exportar_tablas
+from .flujo import (
+    FRECUENCIAS,
+    MAX_SEMANAS_MES,
+    DetalleSemanas,
+    FlujoSemanal,
+    ResumenFlujo,
+    agrupar_por_semana,
+    ajustar_distribucion,
+    calcular_flujo_semanal,
+    calcular_gasto_semanal,
+    calcular_ingreso_inicial_mensual,
+    calcular_ingreso_semanal,
+    detalle_agrupado,
+    distribucion_por_defecto,
+    etapas_cascada,
+    inicializar_distribucion,
+    matriz_gastos,
+    matriz_ingresos,
+    matriz_mes,
+    normalizar_monto_semanal,
+    plegar_distribucion,
+    programacion_mes,
+    repartir_resto,
+    resumen_flujo_mensual,
+    semanas_permitidas,
+    tabla_detalle_movimientos,
+    tabla_flujo,
+)
+from .graficas import (
+    MAX_PERIODOS_GRAFICA,
+    MAX_PUNTOS_LINEA,
+    PERIODOS_GRAFICA,
+    SeriePeriodos,
+    agregar_periodos,
+    indices_reduccion,
+    periodo_grafica,
+)
+from .importacion import CAMPOS_IMPORTACION, CAMPOS_OBLIGATORIOS, columnas_archivo, importar_archivo, validar_bloque
+from .libro import Libro, cargar_libro
+from .montecarlo import PERCENTILES_MONTECARLO, SimulacionMonteCarlo, simular_montecarlo
+from .proyeccion import PlanAmortizacion, Proyeccion, calcular_proyeccion, eje_proyeccion, plan_amortizacion
+from .reprogramacion import (
+    Movimiento,
+    Reprogramacion,
+    distribuciones_reprogramadas,
+    gastos_movibles,
+    reprogramar_gastos,
+)
+
+__all__ = [
+    "DIRECTORIO_PERFILES", "RUTA_BD", "actualizar_registros", "aplicar_cambios", "cargar_registros", "conectar_bd",
+    "eliminar_registros", "guardar_registros", "insertar_columnas", "ruta_usuario",
+    "CalendarioMes", "Semana", "calendario_mes", "format_date_range", "get_month_calendar", "solo_lectura",
+    "Amortizacion", "EstadoDeudas", "amortizar", "estado_deudas", "tabla_deudas",
+    "FlujoDiario", "agregar_semanas", "calcular_flujo_diario", "montos_diarios",
+    "CAMPOS_EDITABLES", "Edicion", "aplicar_edicion", "preparar_edicion", "tabla_editable",
+    "OBJETIVOS_ESTRATEGIA", "ProblemaDeudas", "ResultadoEstrategia", "comparar_estrategias", "problema_deudas",
+    "FORMATOS_EXPORTACION", "exportar_tablas",
+    "FRECUENCIAS", "MAX_SEMANAS_MES", "DetalleSemanas", "FlujoSemanal", "ResumenFlujo", "agrupar_por_semana",
+    "ajustar_distribucion", "calcular_flujo_semanal", "calcular_gasto_semanal", "calcular_ingreso_inicial_mensual",
+    "calcular_ingreso_semanal", "detalle_agrupado",
+    "distribucion_por_defecto", "etapas_cascada", "inicializar_distribucion", "matriz_gastos", "matriz_ingresos",
+    "matriz_mes", "normalizar_monto_semanal", "plegar_distribucion", "programacion_mes", "repartir_resto",
+    "resumen_flujo_mensual", "semanas_permitidas", "tabla_detalle_movimientos", "tabla_flujo",
+    "MAX_PERIODOS_GRAFICA", "MAX_PUNTOS_LINEA", "PERIODOS_GRAFICA", "SeriePeriodos", "agregar_periodos",
+    "indices_reduccion", "periodo_grafica",
+    "CAMPOS_IMPORTACION", "CAMPOS_OBLIGATORIOS", "columnas_archivo", "importar_archivo", "validar_bloque",
+    "Libro", "cargar_libro",
+    "PERCENTILES_MONTECARLO", "SimulacionMonteCarlo", "simular_montecarlo",
+    "PlanAmortizacion", "Proyeccion", "calcular_proyeccion", "eje_proyeccion", "plan_amortizacion",
+    "Movimiento", "Reprogramacion", "distribuciones_reprogramadas", "gastos_movibles", "reprogramar_gastos",
+]
@@ -0,0 +1,223 @@
+"""Almacenamiento de ingresos y gastos en SQLite."""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+from functools import lru_cache
+from typing import Any, Iterable, Mapping, Sequence
+
+import numpy as np
+
+RUTA_BD = os.environ.get("FINANZAS_BD", "finanzas.db")
+
+# Modo multiusuario: con este directorio definido, cada usuario tiene su propia base de datos en él
+DIRECTORIO_PERFILES = os.environ.get("FINANZAS_PERFILES")
+
+# Columna de la tabla para cada campo de los registros, por tabla
+COLUMNAS_BD = {
+    "ingresos": {
+        "Nombre": "nombre",
+        "Monto": "monto",
+        "Tipo": "tipo",
+        "Frecuencia": "frecuencia",
+        "Día de pago": "dia_pago",
+    },
+    "gastos": {
+        "Nombre": "nombre",
+        "Monto": "monto",
+        "Frecuencia": "frecuencia",
+        "Día de pago": "dia_pago",
+        "Es deuda": "es_deuda",
+        "Deuda total": "deuda_total",
+        "Plazo (meses)": "plazo",
+        "Pagos realizados": "pagos_realizados",
+        "Tasa anual (%)": "tasa_anual",
+        "Distribucion personalizada": "distribucion_personalizada",
+        "Distribucion semanas": "distribucion_semanas",
+    },
+}
+
+CAMPOS_BOOLEANOS = {"Es deuda", "Distribucion personalizada"}
+
+CAMPOS_JSON = {"Distribucion semanas"}
+
+ESQUEMA_BD = """
+CREATE TABLE IF NOT EXISTS ingresos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    monto REAL NOT NULL,
+    tipo TEXT,
+    frecuencia TEXT NOT NULL,
+    dia_pago INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_ingresos_frecuencia ON ingresos (frecuencia);
+
+CREATE TABLE IF NOT EXISTS gastos (
+    id INTEGER PRIMARY KEY,
+    nombre TEXT NOT NULL,
+    monto REAL NOT NULL,
+    frecuencia TEXT NOT NULL,
+    dia_pago INTEGER,
+    es_deuda INTEGER NOT NULL DEFAULT 0,
+    deuda_total REAL,
+    plazo INTEGER,
+    pagos_realizados INTEGER,
+    tasa_anual REAL,
+    distribucion_personalizada INTEGER NOT NULL DEFAULT 0,
+    distribucion_semanas TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_gastos_frecuencia ON gastos (frecuencia);
+CREATE INDEX IF NOT EXISTS idx_gastos_es_deuda ON gastos (es_deuda);
+"""
+
+# Columnas agregadas después de la primera versión del esquema, para completar bases existentes
+COLUMNAS_AGREGADAS_BD = {
+    "gastos": {"tasa_anual": "REAL"},
+}
+
+@lru_cache(maxsize=None)
+def _inicializar_bd(ruta: str) -> None:
+    """Crea las tablas e índices (o agrega las columnas que falten) una sola vez por proceso"""
+    with sqlite3.connect(ruta) as conexion:
+        conexion.execute("PRAGMA journal_mode=WAL")  # Lecturas concurrentes mientras otra sesión escribe
+        conexion.executescript(ESQUEMA_BD)
+        for tabla, columnas in COLUMNAS_AGREGADAS_BD.items():
+            existentes = {fila[1] for fila in conexion.execute(f"PRAGMA table_info({tabla})")}
+            for columna, tipo in columnas.items():
+                if columna not in existentes:
+                    conexion.execute(f"ALTER TABLE {tabla} ADD COLUMN {columna} {tipo}")
+
+def ruta_usuario(usuario: str, directorio: str | None = None) -> str:
+    """Base de datos de un usuario en el directorio de perfiles (un archivo .db por persona, como en lotes).
+
+    El nombre del archivo lleva el usuario normalizado más un hash corto, así dos
+    usuarios que se normalizan igual no comparten archivo y ningún nombre sale del directorio.
+    """
+    directorio = directorio or DIRECTORIO_PERFILES
+    usuario = usuario.strip().lower()
+    limpio = re.sub(r"[^a-z0-9_-]+", "_", usuario)[:40] or "usuario"
+    os.makedirs(directorio, exist_ok=True)
+    return os.path.join(directorio, f"{limpio}-{hashlib.sha256(usuario.encode()).hexdigest()[:8]}.db")
+
+def conectar_bd(ruta: str | None = None) -> sqlite3.Connection:
+    """Abre una conexión a la base de datos, creando el esquema si hace falta"""
+    ruta = ruta or RUTA_BD
+    _inicializar_bd(ruta)
+    return sqlite3.connect(ruta)
+
+def _valor_bd(campo: str, valor: Any) -> Any:
+    """Convierte un valor de un registro al tipo que se guarda en SQLite"""
+    if campo in CAMPOS_JSON:
+        return json.dumps(valor or {})
+    if campo in CAMPOS_BOOLEANOS:
+        return int(bool(valor))
+    if valor is None or (isinstance(valor, float) and np.isnan(valor)):
+        return None
+    return valor.item() if isinstance(valor, np.generic) else valor
+
+def guardar_registros(tabla: str, registros: list[dict], ruta: str | None = None) -> list[dict]:
+    """Inserta los registros en una sola transacción y les asigna su "id" """
+    campos = list(COLUMNAS_BD[tabla])
+    columnas = ", ".join(COLUMNAS_BD[tabla].values())
+    marcadores = ", ".join("?" * len(campos))
+    conexion = conectar_bd(ruta)
+    try:
+        with conexion:
+            siguiente_id = conexion.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabla}").fetchone()[0]
+            for desplazamiento, registro in enumerate(registros):
+                registro["id"] = siguiente_id + desplazamiento
+            conexion.executemany(
+                f"INSERT INTO {tabla} (id, {columnas}) VALUES (?, {marcadores})",
+                ([registro["id"]] + [_valor_bd(campo, registro.get(campo)) for campo in campos] for registro in registros),
+            )
+    finally:
+        conexion.close()
+    return registros
+
+def insertar_columnas(conexion: sqlite3.Connection, tabla: str, ids: np.ndarray,
+                      columnas: Mapping[str, np.ndarray]) -> None:
+    """Inserta filas dadas por columnas ({campo: arreglo}) dentro de la transacción abierta en `conexion`.
+
+    Los campos que no vienen en `columnas` toman el valor por defecto de la tabla.
+    """
+    campos = [campo for campo in COLUMNAS_BD[tabla] if campo in columnas]
+    valores = []
+    for campo in campos:
+        columna = np.asarray(columnas[campo])
+        if columna.dtype.kind == "f":
+            columna = np.where(np.isnan(columna), None, columna)  # NaN se guarda como NULL
+        elif columna.dtype.kind == "b":
+            columna = columna.astype(int)
+        valores.append(columna.tolist())
+    nombres_sql = ", ".join(COLUMNAS_BD[tabla][campo] for campo in campos)
+    conexion.executemany(
+        f"INSERT INTO {tabla} (id, {nombres_sql}) VALUES (?, {', '.join('?' * len(campos))})",
+        zip(np.asarray(ids).tolist(), *valores),
+    )
+
+def _actualizar(conexion: sqlite3.Connection, tabla: str, ids: Sequence[int],
+                campos: Mapping[str, Sequence[Any]]) -> None:
+    """UPDATE de los campos indicados dentro de la transacción abierta en `conexion`"""
+    nombres = list(campos)
+    if not nombres:
+        return
+    asignaciones = ", ".join(f"{COLUMNAS_BD[tabla][campo]} = ?" for campo in nombres)
+    conexion.executemany(
+        f"UPDATE {tabla} SET {asignaciones} WHERE id = ?",
+        ([_valor_bd(campo, campos[campo][fila]) for campo in nombres] + [int(id_)]
+         for fila, id_ in enumerate(ids)),
+    )
+
+def actualizar_registros(tabla: str, ids: Sequence[int], campos: Mapping[str, Sequence[Any]],
+                         ruta: str | None = None) -> None:
+    """Actualiza los campos indicados ({campo: valores}) de los registros con esos ids en una sola transacción"""
+    aplicar_cambios(tabla, ids, campos, [], ruta)
+
+def eliminar_registros(tabla: str, ids: Iterable[int], ruta: str | None = None) -> None:
+    """Elimina los registros con los ids indicados en una sola transacción"""
+    aplicar_cambios(tabla, [], {}, ids, ruta)
+
+def aplicar_cambios(tabla: str, ids_actualizados: Sequence[int], campos: Mapping[str, Sequence[Any]],
+                    ids_eliminados: Iterable[int], ruta: str | None = None) -> None:
+    """Actualiza unos registros y elimina otros en una sola transacción: o se aplican todos los cambios o ninguno"""
+    conexion = conectar_bd(ruta)
+    try:
+        with conexion:
+            _actualizar(conexion, tabla, ids_actualizados, campos)
+            conexion.executemany(f"DELETE FROM {tabla} WHERE id = ?", ((int(id_),) for id_ in ids_eliminados))
+    finally:
+        conexion.close()
+
+def cargar_registros(tabla: str, ruta: str | None = None, **filtros: Any) -> list[dict]:
+    """Lee los registros de una tabla como lista de diccionarios.
+
+    `filtros` usa los campos de los registros ("Frecuencia", "Es deuda", ...) y se
+    resuelve con los índices de la tabla.
+    """
+    campos = list(COLUMNAS_BD[tabla])
+    columnas = COLUMNAS_BD[tabla]
+    condiciones = " AND ".join(f"{columnas[campo]} = ?" for campo in filtros)
+    consulta = f"SELECT id, {', '.join(columnas.values())} FROM {tabla}"
+    if condiciones:
+        consulta += f" WHERE {condiciones}"
+    consulta += " ORDER BY id"
+
+    conexion = conectar_bd(ruta)
+    try:
+        filas = conexion.execute(consulta, [_valor_bd(campo, valor) for campo, valor in filtros.items()]).fetchall()
+    finally:
+        conexion.close()
+
+    registros = [dict(zip(["id"] + campos, fila)) for fila in filas]
+    for campo in CAMPOS_BOOLEANOS.intersection(campos):
+        for registro in registros:
+            registro[campo] = bool(registro[campo])
+    for campo in CAMPOS_JSON.intersection(campos):
+        # Un solo json.loads para toda la columna en lugar de uno por fila
+        valores = json.loads("[" + ",".join(registro[campo] or "{}" for registro in registros) + "]")
+        for registro, valor in zip(registros, valores):
+            registro[campo] = valor
+    return registros
@@ -0,0 +1,106 @@
+"""Calendario de los meses: semanas de domingo a sábado, etiquetas y fechas clave."""
+from __future__ import annotations
+
+import calendar
+from datetime import date, timedelta
+from functools import lru_cache
+from typing import NamedTuple, Sequence
+
+import numpy as np
+
+Semana = tuple[date, date]
+
+class CalendarioMes(NamedTuple):
+    """Índice precalculado de un mes: semanas, etiquetas y posiciones de las fechas clave"""
+    semanas: tuple[Semana, ...]  # Pares (inicio, fin) de domingo a sábado
+    nombres: tuple[str, ...]     # Etiquetas de format_date_range
+    inicios: np.ndarray       # Inicios de semana como datetime64[D]
+    fines: np.ndarray         # Fines de semana como datetime64[D]
+    primer_dia: np.datetime64
+    ultimo_dia: np.datetime64
+    dias_en_mes: int
+    semana_dia_15: int        # Índice (0-indexado) de la semana que contiene el día 15
+    semana_ultimo_dia: int    # Índice de la semana que contiene el último día del mes
+    sabados: np.ndarray       # Sábado de cada semana
+    sabado_en_mes: np.ndarray # Si el sábado de cada semana cae dentro del mes
+
+def _semanas_mes(year: int, month: int) -> list[Semana]:
+    """Calcula las semanas del mes especificado"""
+    # Obtener el primer día del mes
+    first_day = date(year, month, 1)
+    
+    # Encontrar el primer día de la semana (domingo)
+    if first_day.weekday() != 6:  # si no es domingo
+        first_day = first_day - timedelta(days=(first_day.weekday() + 1) % 7)
+    
+    # Último día real del mes
+    real_last_day = date(year, month, calendar.monthrange(year, month)[1])
+
+    # Calcular el sábado de la última semana que contiene al último día del mes
+    last_day = real_last_day + timedelta(days=(5 - real_last_day.weekday()) % 7)
+    
+    # Crear semanas (lista de pares de fechas)
+    weeks = []
+    current = first_day
+    while current <= last_day:
+        week_end = current + timedelta(days=6)
+        weeks.append((current, week_end))
+        current = week_end + timedelta(days=1)
+    
+    return weeks
+
+def solo_lectura(arreglo: np.ndarray) -> np.ndarray:
+    """Marca un arreglo como inmutable para poder compartirlo desde la caché"""
+    arreglo.setflags(write=False)
+    return arreglo
+
+def limites_semanas(semanas: Sequence[Semana]) -> tuple[np.ndarray, np.ndarray]:
+    """Devuelve los inicios y fines de las semanas como arreglos datetime64[D]"""
+    inicios = np.array([inicio for inicio, _ in semanas], dtype="datetime64[D]")
+    fines = np.array([fin for _, fin in semanas], dtype="datetime64[D]")
+    return inicios, fines
+
+def dia_semana(fechas: np.ndarray) -> np.ndarray:
+    """Día de la semana de un arreglo datetime64[D] (0 = lunes, como date.weekday)"""
+    # El 1970-01-01 fue jueves (weekday 3)
+    return (fechas.astype(np.int64) + 3) % 7
+
+def limites_mes(year: int, month: int) -> tuple[np.datetime64, np.datetime64]:
+    """Primer y último día del mes como datetime64[D]"""
+    mes = np.datetime64(f"{year:04d}-{month:02d}", "M")
+    return mes.astype("datetime64[D]"), (mes + 1).astype("datetime64[D]") - 1
+
+@lru_cache(maxsize=1200)
+def calendario_mes(year: int, month: int) -> CalendarioMes:
+    """Índice del calendario de un mes, calculado una sola vez por (año, mes)"""
+    semanas = tuple(_semanas_mes(year, month))
+    inicios, fines = limites_semanas(semanas)
+    primer_dia, ultimo_dia = limites_mes(year, month)
+    dia_15 = primer_dia + 14
+    sabados = inicios + (5 - dia_semana(inicios)) % 7
+
+    return CalendarioMes(
+        semanas=semanas,
+        nombres=tuple(format_date_range(inicio, fin) for inicio, fin in semanas),
+        inicios=solo_lectura(inicios),
+        fines=solo_lectura(fines),
+        primer_dia=primer_dia,
+        ultimo_dia=ultimo_dia,
+        dias_en_mes=int((ultimo_dia - primer_dia).astype(np.int64)) + 1,
+        semana_dia_15=int(np.searchsorted(fines, dia_15)),
+        semana_ultimo_dia=len(semanas) - 1,  # La última semana siempre contiene el último día
+        sabados=solo_lectura(sabados),
+        sabado_en_mes=solo_lectura((sabados >= primer_dia) & (sabados <= ultimo_dia)),
+    )
+
+def get_month_calendar(year: int, month: int) -> list[Semana]:
+    """Obtiene las semanas del mes especificado"""
+    return list(calendario_mes(year, month).semanas)
+
+@lru_cache(maxsize=4096)
+def format_date_range(start_date: date, end_date: date) -> str:
+    """Formatea un rango de fechas como 'DD al DD de Mes'"""
+    if start_date.month == end_date.month:
+        return f"{start_date.day} al {end_date.day} de {calendar.month_name[start_date.month]}"
+    else:
+        return f"{start_date.day} de {calendar.month_name[start_date.month]} al {end_date.day} de {calendar.month_name[end_date.month]}"
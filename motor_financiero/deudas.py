@@ -0,0 +1,115 @@
+"""Amortización de deudas: saldo, intereses y fecha de liquidación, vectorizada en deudas × meses."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, NamedTuple, TypedDict
+
+import numpy as np
+import pandas as pd
+
+if TYPE_CHECKING:
+    from .libro import Libro
+
+# Pagos por mes de cada frecuencia (Diario, Semanal, Quincenal, Mensual, desconocida) para estimar
+# el saldo tras los pagos ya realizados; dos quincenas al mes (día 15 y último día), como en la regla de fechas
+PAGOS_POR_MES = np.array([365.25 / 12, 365.25 / 12 / 7, 2.0, 1.0, 0.0])
+
+MAX_MESES_AMORTIZACION = 600  # Horizonte máximo para buscar la fecha de liquidación (50 años)
+
+TOLERANCIA_SALDO = 1e-6  # Saldos menores se consideran liquidados
+
+class EstadoDeudas(NamedTuple):
+    """Situación al inicio del horizonte de los gastos que son deudas con plazo o monto total"""
+    posiciones: np.ndarray      # Filas del libro de gastos
+    saldo: np.ndarray           # Saldo pendiente (NaN si no se registró el monto total de la deuda)
+    tasa_mensual: np.ndarray
+    pagos_restantes: np.ndarray  # Meses de plazo que quedan (inf si no se registró el plazo)
+
+class Amortizacion(TypedDict):
+    """Resultado de amortizar: una fila por deuda y una columna por mes del horizonte"""
+    saldos: np.ndarray           # deudas × (meses + 1): saldo al inicio de cada mes y al final del horizonte
+    pagos: np.ndarray            # Lo que realmente se paga cada mes
+    intereses: np.ndarray
+    factor: np.ndarray           # Fracción del cargo programado que se paga cada mes (0 al terminar)
+    mes_liquidacion: np.ndarray  # Mes (0-indexado) del último pago; -1 si no termina dentro del horizonte
+
+def estado_deudas(gastos: Libro) -> EstadoDeudas:
+    """Saldo, tasa y pagos restantes de cada deuda, descontando los "Pagos realizados".
+
+    El saldo parte de "Deuda total" y se le aplican los pagos ya hechos con el pago
+    mensual equivalente del gasto y la tasa de interés, en forma cerrada.
+    """
+    total = gastos.columna("Deuda total")
+    plazo = gastos.columna("Plazo (meses)")
+    posiciones = np.flatnonzero(gastos.columna("Es deuda") & (~np.isnan(plazo) | (total > 0)))
+
+    total, plazo = total[posiciones], plazo[posiciones]
+    realizados = np.maximum(np.nan_to_num(gastos.columna("Pagos realizados")[posiciones]), 0.0)
+    tasa = np.maximum(np.nan_to_num(gastos.columna("Tasa anual (%)")[posiciones]), 0.0) / 1200
+
+    pago_mensual = gastos.montos[posiciones] * PAGOS_POR_MES[gastos.codigos[posiciones]]
+    personalizados = gastos.personalizada[posiciones]
+    pago_mensual[personalizados] = gastos.distribucion[posiciones[personalizados]].sum(axis=1)
+
+    # Saldo tras k pagos: P·(1+i)^k - pago·((1+i)^k - 1)/i, o P - pago·k sin interés
+    crecimiento = (1 + tasa) ** realizados
+    acumulado = np.divide(crecimiento - 1, tasa, out=realizados.copy(), where=tasa > 0)
+    saldo = np.where(total > 0, np.maximum(total * crecimiento - pago_mensual * acumulado, 0.0), np.nan)
+
+    restantes = np.where(np.isnan(plazo), np.inf, np.maximum(plazo - realizados, 0.0))
+    return EstadoDeudas(posiciones, saldo, tasa, restantes)
+
+def amortizar(estado: EstadoDeudas, cargos: np.ndarray) -> Amortizacion:
+    """Amortiza todas las deudas a la vez dado el cargo programado de cada una en cada mes (deudas × meses).
+
+    Los pagos se detienen al agotar el plazo o al liquidar el saldo; el mes de la
+    liquidación solo se paga lo que queda. El saldo sale en forma cerrada,
+    S_m = (1+i)^m · (S_0 - Σ_{j<m} pago_j / (1+i)^(j+1)), con una suma acumulada por
+    fila en lugar de un ciclo por mes.
+    """
+    num_deudas, meses = cargos.shape
+    activo = np.arange(meses) < estado.pagos_restantes[:, None]
+    cargos_activos = np.where(activo, cargos, 0.0)
+
+    crecimiento = 1 + estado.tasa_mensual[:, None]
+    potencias = crecimiento ** np.arange(meses + 1)
+    pagado = np.zeros((num_deudas, meses + 1))
+    np.cumsum(cargos_activos / potencias[:, 1:], axis=1, out=pagado[:, 1:])
+    saldos = potencias * (estado.saldo[:, None] - pagado)
+
+    # Sin monto total registrado no hay saldo que seguir: se paga el cargo hasta agotar el plazo
+    con_saldo = ~np.isnan(estado.saldo)[:, None]
+    liquidada = saldos[:, 1:] <= TOLERANCIA_SALDO
+    pagos = np.where(liquidada & con_saldo, np.maximum(saldos[:, :-1] * crecimiento, 0.0), cargos_activos)
+    saldos = np.where(con_saldo, np.maximum(saldos, 0.0), np.nan)
+    intereses = np.where(activo & con_saldo, saldos[:, :-1] * estado.tasa_mensual[:, None], 0.0)
+
+    ultimo = np.where(con_saldo, liquidada & (saldos[:, :-1] > TOLERANCIA_SALDO), False)
+    restantes = np.minimum(estado.pagos_restantes, meses + 1)
+    ultimo[~con_saldo[:, 0], :] = np.arange(meses) == (restantes[~con_saldo[:, 0], None] - 1)
+    mes_liquidacion = np.where(ultimo.any(axis=1), ultimo.argmax(axis=1), -1)
+
+    return {
+        "saldos": saldos,
+        "pagos": pagos,
+        "intereses": intereses,
+        "factor": np.divide(pagos, cargos, out=np.zeros_like(pagos), where=cargos > 0),
+        "mes_liquidacion": mes_liquidacion,
+    }
+
+def tabla_deudas(gastos: Libro, estado: EstadoDeudas, amortizacion: Amortizacion,
+                 primer_mes: np.datetime64) -> pd.DataFrame:
+    """Una fila por deuda con su saldo, los pagos que quedan, la fecha de liquidación y los intereses"""
+    meses = amortizacion["pagos"].shape[1]
+    mes = amortizacion["mes_liquidacion"]
+    filas = np.arange(len(mes))
+    fin_plazo = np.minimum(estado.pagos_restantes, meses).astype(np.intp)
+    return pd.DataFrame({
+        "Nombre": gastos.nombres[estado.posiciones],
+        "Saldo actual": estado.saldo,
+        "Tasa anual (%)": estado.tasa_mensual * 1200,
+        "Pagos restantes": (amortizacion["pagos"] > 0).sum(axis=1),
+        "Fecha de liquidación": np.where(mes >= 0, primer_mes + mes, np.datetime64("NaT")).astype("datetime64[ns]"),
+        "Total por pagar": amortizacion["pagos"].sum(axis=1),
+        "Intereses por pagar": amortizacion["intereses"].sum(axis=1),
+        "Saldo al terminar el plazo": amortizacion["saldos"][filas, fin_plazo],
+    })
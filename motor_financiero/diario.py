@@ -0,0 +1,133 @@
+"""Flujo día a día: cada item en su fecha real y el saldo acumulado sobre un arreglo denso de días."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, TypedDict
+
+import numpy as np
+
+from .deudas import amortizar
+from .flujo import FRECUENCIAS, dias_de_pago, estado_deudas_mes, factores_gasto
+from .proyeccion import cargos_deudas_mes_semana, distribucion_mes_semana, eje_proyeccion
+
+if TYPE_CHECKING:
+    from .libro import Libro
+
+SABADO = 6  # Posición del sábado en semanas de domingo a sábado
+
+class FlujoDiario(TypedDict):
+    """Resultado de calcular_flujo_diario: una posición por día de las semanas del horizonte"""
+    dias: np.ndarray  # datetime64[D], desde el domingo de la primera semana hasta el sábado de la última
+    ingresos: np.ndarray
+    gastos: np.ndarray
+    flujo: np.ndarray
+    saldo: np.ndarray
+    dia_minimo: np.datetime64  # Día con el saldo acumulado más bajo (el primero si hay empate)
+    saldo_minimo: float
+
+def _dias_horizonte(eje: dict[str, Any]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Posición en el arreglo de días, mes (0-indexado) y día del mes de cada día que pertenece a un mes del horizonte"""
+    meses, ms = eje["meses"], eje["mes_semana"]
+    dia_1 = ms["semana_eje"][meses["primera_semana"]] * 7 + meses["desfase"]  # Posición del día 1 de cada mes
+    mes = np.repeat(np.arange(len(dia_1)), meses["dias_en_mes"])
+    dia_del_mes = np.arange(mes.size) - np.repeat(np.cumsum(meses["dias_en_mes"]) - meses["dias_en_mes"], meses["dias_en_mes"]) + 1
+    return dia_1[mes] + dia_del_mes - 1, mes, dia_del_mes
+
+def montos_diarios(libro: Libro, eje: dict[str, Any]) -> np.ndarray:
+    """Monto total del libro en cada día del eje, según la fecha real de cada pago.
+
+    Misma regla de fechas que la vista mensual (matriz_programada): los diarios cada día del
+    mes, los semanales cada sábado del mes, los quincenales el día 15 y el último día y
+    los mensuales el último día o su día de pago (el último día si el mes es más corto). Las
+    distribuciones personalizadas fijan el monto de cada semana pero no el día, así que se
+    reparten en partes iguales entre los días de la semana que pertenecen al mes; las
+    deudas se escalan mes a mes por su amortización. Los montos se agregan por
+    frecuencia y por mes, sin matrices items × días.
+    """
+    meses = eje["meses"]
+    num_meses = len(meses["dias_en_mes"])
+    num_dias = 7 * len(eje["inicios"])
+    codigos, montos = libro.codigos, libro.montos
+    dias = dias_de_pago(libro)
+
+    # Peso de cada item en cada mes: su monto, salvo las deudas, que pagan solo la fracción amortizada
+    primer_mes = eje["mes_semana"]["primer_dia"][0].astype(object)
+    deudas = estado_deudas_mes(libro, primer_mes.year, primer_mes.month) if libro.tabla == "gastos" else None
+    normales = np.ones(len(libro), dtype=bool)
+    personalizados = libro.personalizada if libro.tabla == "gastos" else np.zeros(len(libro), dtype=bool)
+    por_frecuencia = np.zeros((len(FRECUENCIAS) + 1, num_meses))
+    por_dia_pago = np.zeros((num_meses, 32))
+    semanal_ms = np.zeros(len(eje["mes_semana"]["semana_eje"]))
+
+    if deudas is not None and deudas.posiciones.size:
+        normales[deudas.posiciones] = False
+        ms = eje["mes_semana"]
+        factores = factores_gasto(ms["inicios"], ms["fines"], ms["primer_dia"], ms["ultimo_dia"])
+        cargos = cargos_deudas_mes_semana(libro, deudas.posiciones, eje, factores)
+        factor = amortizar(deudas, np.add.reduceat(cargos, meses["primera_semana"], axis=1))["factor"]
+        pesos = montos[deudas.posiciones, None] * factor  # deudas × meses
+        pers = personalizados[deudas.posiciones]
+        con_dia = (dias[deudas.posiciones] > 0) & ~pers
+        libres = ~pers & ~con_dia
+        np.add.at(por_frecuencia, codigos[deudas.posiciones[libres]], pesos[libres])
+        np.add.at(por_dia_pago.T, dias[deudas.posiciones[con_dia]], pesos[con_dia])
+        if pers.any():
+            semanal_ms += (cargos[pers] * factor[pers][:, ms["mes"]]).sum(axis=0)
+
+    pers_normales = normales & personalizados
+    con_dia = normales & ~personalizados & (dias > 0)
+    libres = normales & ~personalizados & (dias == 0)
+    por_frecuencia += np.bincount(codigos[libres], weights=montos[libres], minlength=len(FRECUENCIAS) + 1)[:, None]
+    por_dia_pago += np.bincount(dias[con_dia], weights=montos[con_dia], minlength=32)
+    if pers_normales.any():
+        semanal_ms += distribucion_mes_semana(libro.distribucion[pers_normales].sum(axis=0), eje)
+
+    posicion, mes, dia_del_mes = _dias_horizonte(eje)
+    diario = np.zeros(num_dias)
+    diario[posicion] = por_frecuencia[0, mes]
+    diario[posicion] += np.where(posicion % 7 == SABADO, por_frecuencia[1, mes], 0.0)
+    ultimo = dia_del_mes == meses["dias_en_mes"][mes]
+    diario[posicion] += np.where((dia_del_mes == 15) | ultimo, por_frecuencia[2, mes], 0.0)
+    diario[posicion] += np.where(ultimo, por_frecuencia[3, mes], 0.0)
+
+    # Días de pago: el 31 cae el último día en los meses más cortos
+    dia_1 = posicion[dia_del_mes == 1]
+    pagos = dia_1[:, None] + np.minimum(np.arange(1, 32), meses["dias_en_mes"][:, None]) - 1
+    diario += np.bincount(pagos.ravel(), weights=por_dia_pago[:, 1:].ravel(), minlength=num_dias)
+
+    # Distribuciones personalizadas: el monto de cada semana, repartido entre sus días del mes
+    ms = eje["mes_semana"]
+    dias_semana = (np.minimum(ms["fines"], ms["ultimo_dia"]) - np.maximum(ms["inicios"], ms["primer_dia"])).astype(np.int64) + 1
+    semana_ms = meses["primera_semana"][mes] + (dia_del_mes - 1 + meses["desfase"][mes]) // 7
+    diario[posicion] += (semanal_ms / dias_semana)[semana_ms]
+    return diario
+
+def calcular_flujo_diario(ingresos: Libro, gastos: Libro, year: int, month: int, meses: int = 1) -> FlujoDiario:
+    """Ingresos, gastos y saldo acumulado día a día durante `meses` meses desde el mes indicado.
+
+    El saldo es una sola suma acumulada sobre el arreglo denso de días, así que los
+    sobregiros dentro de una semana (la renta el día 1 y el sueldo el 15) quedan a la vista.
+    """
+    eje = eje_proyeccion(year, month, meses)
+    ingresos_dia = montos_diarios(ingresos, eje)
+    gastos_dia = montos_diarios(gastos, eje)
+    flujo = ingresos_dia - gastos_dia
+    saldo = np.cumsum(flujo)
+    dias = eje["inicios"][0] + np.arange(saldo.size)
+    minimo = int(np.argmin(saldo))
+    return {
+        "dias": dias,
+        "ingresos": ingresos_dia,
+        "gastos": gastos_dia,
+        "flujo": flujo,
+        "saldo": saldo,
+        "dia_minimo": dias[minimo],
+        "saldo_minimo": float(saldo[minimo]),
+    }
+
+def agregar_semanas(valores_diarios: np.ndarray, funcion: Callable[..., np.ndarray] = np.sum) -> np.ndarray:
+    """Agrega un arreglo diario a las semanas del eje (suma por defecto; np.min para el saldo más bajo de cada semana).
+
+    Con un horizonte de un mes, las sumas de ingresos y gastos son las de la cascada
+    semanal del mes: los días fuera del mes no tienen montos.
+    """
+    return funcion(valores_diarios.reshape(-1, 7), axis=1)
@@ -0,0 +1,116 @@
+"""Edición en bloque de registros: tabla editable, validación de los cambios y aplicación en una sola transacción."""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Mapping, Sequence, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from .almacenamiento import aplicar_cambios
+from .flujo import FRECUENCIAS, MAX_SEMANAS_MES, inicializar_distribucion
+
+if TYPE_CHECKING:
+    from .libro import Libro
+
+COLUMNAS_SEMANAS = [f"Semana {i}" for i in range(1, MAX_SEMANAS_MES + 1)]
+
+# Columnas que se pueden cambiar desde la tabla editable de cada libro (además de "Eliminar")
+CAMPOS_EDITABLES = {
+    "ingresos": ["Monto", "Frecuencia", "Día de pago"],
+    "gastos": ["Monto", "Frecuencia", "Día de pago", "Distribucion personalizada", *COLUMNAS_SEMANAS],
+}
+
+class Edicion(TypedDict):
+    """Cambios validados de una tabla editable, listos para aplicar_edicion"""
+    ids_actualizados: list[int]
+    campos: dict[str, list[Any]]  # {campo: valores} de los registros actualizados, en su orden
+    ids_eliminados: list[int]
+    errores: list[str]            # Si no está vacía, no se aplica ningún cambio
+
+def tabla_editable(libro: Libro, inicio: int, fin: int) -> pd.DataFrame:
+    """Filas inicio:fin del libro con una columna "Eliminar" y, en gastos, una columna por semana de su distribución"""
+    tabla = libro.df.iloc[inicio:fin].copy()
+    tabla["Frecuencia"] = tabla["Frecuencia"].astype(object)
+    tabla.insert(0, "Eliminar", False)
+    if libro.tabla == "gastos":
+        semanas = pd.DataFrame(libro.distribucion[inicio:fin], columns=COLUMNAS_SEMANAS, index=tabla.index)
+        tabla = pd.concat([tabla, semanas], axis=1)
+    return tabla.reset_index(drop=True)
+
+def _numero(valor: Any) -> float:
+    """Valor de una celda como float (NaN si se dejó vacía)"""
+    return np.nan if valor is None else float(valor)
+
+def preparar_edicion(libro: Libro, ids: Sequence[int], cambios: Mapping[int, Mapping[str, Any]],
+                     year: int, month: int) -> Edicion:
+    """Valida los cambios de una tabla editable ({fila: {columna: valor}}, filas de `ids`) y arma la edición.
+
+    Las filas marcadas en "Eliminar" se eliminan aunque tengan otros cambios. Las
+    editadas parten de sus valores actuales con los cambios encima y deben tener un
+    monto positivo, una frecuencia conocida, un día de pago vacío o entre 1 y 31 y
+    semanas no negativas (con al menos una semana con monto si la distribución es
+    personalizada). El día de pago solo se conserva en pagos mensuales y los gastos
+    sin distribución personalizada recalculan la suya como al agregarlos.
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    cambios = {int(fila): valores for fila, valores in cambios.items()}
+    eliminadas = sorted(fila for fila, valores in cambios.items() if valores.get("Eliminar"))
+    editadas = sorted(fila for fila, valores in cambios.items()
+                      if not valores.get("Eliminar") and any(campo != "Eliminar" for campo in valores))
+
+    posiciones = libro.posiciones(ids[editadas])
+    codigos = libro.codigos[posiciones]
+    montos = libro.montos[posiciones].copy()
+    frecuencias = np.array([FRECUENCIAS[codigo] if codigo < len(FRECUENCIAS) else "" for codigo in codigos], dtype=object)
+    dias = libro.columna("Día de pago")[posiciones].copy()
+    personalizada = libro.personalizada[posiciones].copy()
+    distribucion = libro.distribucion[posiciones].copy()
+
+    for k, fila in enumerate(editadas):
+        for campo, valor in cambios[fila].items():
+            if campo == "Monto":
+                montos[k] = _numero(valor)
+            elif campo == "Frecuencia":
+                frecuencias[k] = valor or ""
+            elif campo == "Día de pago":
+                dias[k] = _numero(valor)
+            elif campo == "Distribucion personalizada":
+                personalizada[k] = bool(valor)
+            elif campo in COLUMNAS_SEMANAS:
+                distribucion[k, COLUMNAS_SEMANAS.index(campo)] = np.nan_to_num(_numero(valor))
+
+    invalidos = {
+        "el monto debe ser positivo": ~(np.isfinite(montos) & (montos > 0)),
+        "frecuencia desconocida": ~np.isin(frecuencias, FRECUENCIAS),
+        "el día de pago debe estar entre 1 y 31": ~(np.isnan(dias) | ((dias >= 1) & (dias <= 31) & (dias == np.floor(dias)))),
+        "las semanas no pueden ser negativas": (distribucion < 0).any(axis=1),
+        "la distribución personalizada necesita al menos una semana con monto": personalizada & (distribucion.sum(axis=1) <= 0),
+    }
+    nombres = libro.nombres[posiciones]
+    errores = [f"{nombres[k]}: {razon}" for razon, filas in invalidos.items() for k in np.flatnonzero(filas)]
+    dias[frecuencias != "Mensual"] = np.nan
+
+    campos = {"Monto": montos.tolist(), "Frecuencia": frecuencias.tolist(), "Día de pago": dias.tolist()}
+    if libro.tabla == "gastos" and not errores:
+        campos["Distribucion personalizada"] = personalizada.tolist()
+        campos["Distribucion semanas"] = [
+            {semana: float(monto) for semana, monto in zip(COLUMNAS_SEMANAS, fila) if monto}
+            if propia else inicializar_distribucion(monto_item, frecuencia, year, month, None if np.isnan(dia) else int(dia))
+            for fila, propia, monto_item, frecuencia, dia in zip(distribucion, personalizada, montos, frecuencias, dias)
+        ]
+    return {
+        "ids_actualizados": ids[editadas].tolist(),
+        "campos": campos,
+        "ids_eliminados": ids[eliminadas].tolist(),
+        "errores": errores,
+    }
+
+def aplicar_edicion(libro: Libro, edicion: Edicion, ruta: str | None = None) -> None:
+    """Guarda la edición en la base de datos en una transacción y la aplica al libro con un solo ajuste por operación"""
+    if edicion["errores"]:
+        raise ValueError("; ".join(edicion["errores"]))
+    aplicar_cambios(libro.tabla, edicion["ids_actualizados"], edicion["campos"], edicion["ids_eliminados"], ruta)
+    if edicion["ids_actualizados"]:
+        libro.actualizar(edicion["ids_actualizados"], edicion["campos"])
+    if edicion["ids_eliminados"]:
+        libro.eliminar(libro.posiciones(edicion["ids_eliminados"]))
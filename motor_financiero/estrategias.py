@@ -0,0 +1,239 @@
+"""Estrategias de pago de deudas: avalancha, bola de nieve, orden propio y búsqueda del mejor orden.
+
+Cada estrategia es un orden de prioridad: cada mes se pagan los cargos programados
+de todas las deudas y el dinero restante del presupuesto para deudas (los cargos que
+la proyección ya descuenta más un pago extra limitado por el flujo semanal) se
+destina a la primera deuda pendiente del orden. Al liquidarse una deuda, su cargo
+queda libre y se suma al de la siguiente.
+"""
+from __future__ import annotations
+
+from bisect import bisect_left
+from functools import lru_cache
+from itertools import accumulate
+from typing import TYPE_CHECKING, NamedTuple, Sequence, TypedDict
+
+import numpy as np
+
+from .deudas import TOLERANCIA_SALDO
+from .proyeccion import calcular_proyeccion, eje_proyeccion, plan_amortizacion
+
+if TYPE_CHECKING:
+    from .libro import Libro
+
+OBJETIVOS_ESTRATEGIA = ("Intereses", "Tiempo")
+
+MAX_NODOS_BUSQUEDA = 20_000  # Órdenes parciales a explorar antes de quedarse con el mejor encontrado
+
+class ProblemaDeudas(NamedTuple):
+    """Datos del simulador de estrategias, en listas de Python para el ciclo mes a mes"""
+    nombres: tuple[str, ...]
+    saldos: tuple[float, ...]         # Saldo de cada deuda al inicio del horizonte
+    tasas: tuple[float, ...]          # Tasa mensual
+    minimos: tuple[tuple[float, ...], ...]  # deudas × meses: cargo programado mientras dura el plazo
+    presupuesto: tuple[float, ...]    # Dinero para deudas de cada mes (cargos de la proyección + extra)
+    intereses_minimos: float          # Intereses pagando solo los cargos programados
+    meses_minimos: int                # Meses hasta quedar sin deudas pagando solo los cargos (-1 si no alcanza)
+
+class EstadoEstrategia(NamedTuple):
+    """Punto intermedio de una simulación: a mitad del mes `mes`, con `disponible` por repartir"""
+    mes: int
+    saldos: tuple[float, ...]
+    intereses: float
+    disponible: float
+
+class ResultadoEstrategia(TypedDict):
+    """Resultado de una estrategia de pago"""
+    estrategia: str
+    orden: tuple[str, ...]
+    intereses: float
+    meses_libre: int        # Meses hasta quedar sin deudas (-1 si no se logra en el horizonte)
+    saldo_pendiente: float  # Saldo que queda al final del horizonte
+    pagos: np.ndarray       # deudas × meses con lo pagado a cada deuda
+
+def problema_deudas(ingresos: Libro, gastos: Libro, year: int, month: int, meses: int,
+                    extra_maximo: float) -> ProblemaDeudas:
+    """Arma el problema para las deudas con monto total registrado.
+
+    El extra acumulado hasta el mes m nunca supera el saldo acumulado más bajo de la
+    proyección semanal desde ese mes en adelante, así que adelantar pagos no deja
+    ninguna semana en negativo; además cada mes se agrega a lo más `extra_maximo`.
+    """
+    plan = plan_amortizacion(gastos, year, month, meses)
+    estado, amortizacion = plan["estado"], plan["amortizacion"]
+    con_saldo = np.flatnonzero(estado.saldo > TOLERANCIA_SALDO)
+    activo = np.arange(meses) < estado.pagos_restantes[con_saldo, None]
+    minimos = np.where(activo, plan["cargos"][con_saldo], 0.0)
+
+    # Colchón de cada mes: mínimo del saldo acumulado desde su primera semana hasta el final
+    proyeccion = calcular_proyeccion(ingresos, gastos, year, month, meses)
+    eje = eje_proyeccion(year, month, meses)
+    primera_semana = eje["mes_semana"]["semana_eje"][eje["meses"]["primera_semana"]]
+    colchon = np.maximum(np.minimum.accumulate(proyeccion["saldo"][::-1])[::-1][primera_semana], 0.0)
+    extra_acumulado = np.zeros(meses)
+    for mes in range(meses):
+        anterior = extra_acumulado[mes - 1] if mes else 0.0
+        extra_acumulado[mes] = min(anterior + extra_maximo, colchon[mes])
+    extra = np.diff(extra_acumulado, prepend=0.0)
+
+    liquidacion = amortizacion["mes_liquidacion"][con_saldo]
+    return ProblemaDeudas(
+        nombres=tuple(str(nombre) for nombre in gastos.nombres[estado.posiciones[con_saldo]]),
+        saldos=tuple(estado.saldo[con_saldo].tolist()),
+        tasas=tuple(estado.tasa_mensual[con_saldo].tolist()),
+        minimos=tuple(map(tuple, minimos.tolist())),
+        presupuesto=tuple((amortizacion["pagos"][con_saldo].sum(axis=0) + extra).tolist()),
+        intereses_minimos=float(amortizacion["intereses"][con_saldo].sum()),
+        meses_minimos=int(liquidacion.max(initial=-1)) + 1 if (liquidacion >= 0).all() else -1,
+    )
+
+def _inicio_mes(problema: ProblemaDeudas, mes: int, saldos: list[float], pagos: np.ndarray | None) -> tuple[float, float]:
+    """Aplica los intereses y los cargos programados del mes; devuelve (intereses, disponible)"""
+    intereses = 0.0
+    disponible = problema.presupuesto[mes]
+    for deuda, saldo in enumerate(saldos):
+        if saldo <= TOLERANCIA_SALDO:
+            continue
+        interes = saldo * problema.tasas[deuda]
+        minimo = min(problema.minimos[deuda][mes], saldo + interes)
+        saldos[deuda] = saldo + interes - minimo
+        intereses += interes
+        disponible -= minimo
+        if pagos is not None:
+            pagos[deuda, mes] += minimo
+    return intereses, disponible
+
+def estado_inicial(problema: ProblemaDeudas, pagos: np.ndarray | None = None) -> EstadoEstrategia:
+    saldos = list(problema.saldos)
+    intereses, disponible = _inicio_mes(problema, 0, saldos, pagos) if problema.presupuesto else (0.0, 0.0)
+    return EstadoEstrategia(0, tuple(saldos), intereses, disponible)
+
+def avanzar(problema: ProblemaDeudas, estado: EstadoEstrategia, objetivo: int,
+            pagos: np.ndarray | None = None) -> EstadoEstrategia:
+    """Simula, destinando el dinero libre a `objetivo`, hasta liquidarlo o agotar el horizonte.
+
+    Se detiene a mitad del mes de la liquidación: lo que sobre ese mes lo recibe la
+    siguiente deuda del orden, que continúa desde el estado devuelto.
+    """
+    mes, saldos, intereses, disponible = estado.mes, list(estado.saldos), estado.intereses, estado.disponible
+    meses = len(problema.presupuesto)
+    while mes < meses:
+        pago = min(max(disponible, 0.0), saldos[objetivo])
+        saldos[objetivo] -= pago
+        disponible -= pago
+        if pagos is not None:
+            pagos[objetivo, mes] += pago
+        if saldos[objetivo] <= TOLERANCIA_SALDO:
+            saldos[objetivo] = 0.0
+            return EstadoEstrategia(mes, tuple(saldos), intereses, disponible)
+        mes += 1
+        if mes < meses:
+            interes_mes, disponible = _inicio_mes(problema, mes, saldos, pagos)
+            intereses += interes_mes
+    return EstadoEstrategia(meses, tuple(saldos), intereses, 0.0)
+
+def _clave(estado: EstadoEstrategia, objetivo: str) -> tuple[float, float, float]:
+    """Criterio de comparación: primero no dejar saldo pendiente, luego el objetivo elegido"""
+    pendiente = sum(estado.saldos)
+    pendiente = pendiente if pendiente > TOLERANCIA_SALDO else 0.0
+    if objetivo == "Tiempo":
+        return pendiente, estado.mes, estado.intereses
+    return pendiente, estado.intereses, estado.mes
+
+def _resultado(problema: ProblemaDeudas, estrategia: str, orden: Sequence[int]) -> ResultadoEstrategia:
+    """Vuelve a simular un orden registrando los pagos de cada deuda en cada mes"""
+    pagos = np.zeros((len(problema.nombres), len(problema.presupuesto)))
+    estado = estado_inicial(problema, pagos)
+    for deuda in orden:
+        estado = avanzar(problema, estado, deuda, pagos)
+    pendiente = sum(estado.saldos)
+    libre = pendiente <= TOLERANCIA_SALDO
+    return {
+        "estrategia": estrategia,
+        "orden": tuple(problema.nombres[deuda] for deuda in orden),
+        "intereses": estado.intereses,
+        "meses_libre": estado.mes + 1 if libre else -1,
+        "saldo_pendiente": 0.0 if libre else pendiente,
+        "pagos": pagos,
+    }
+
+def comparar_estrategias(problema: ProblemaDeudas, objetivo: str = "Intereses",
+                         orden_personalizado: Sequence[str] | None = None) -> list[ResultadoEstrategia]:
+    """Evalúa avalancha, bola de nieve, el orden propio (si se da) y busca el mejor orden.
+
+    La búsqueda recorre los órdenes en profundidad: el estado al terminar cada prefijo
+    de un orden se memoriza (lo comparten todos los órdenes que empiezan igual), las
+    deudas ya liquidadas por sus cargos no se ramifican y se poda todo prefijo cuyos
+    intereses acumulados, o el primer mes en que el presupuesto restante alcanzaría a
+    cubrir los saldos aun sin intereses, ya igualan al mejor orden completo encontrado.
+    """
+    num_deudas = len(problema.nombres)
+    if num_deudas == 0:
+        return []
+
+    @lru_cache(maxsize=None)
+    def estado_prefijo(prefijo: tuple[int, ...]) -> EstadoEstrategia:
+        if not prefijo:
+            return estado_inicial(problema)
+        return avanzar(problema, estado_prefijo(prefijo[:-1]), prefijo[-1])
+
+    presupuesto_acumulado = list(accumulate(problema.presupuesto))
+
+    def cota(estado: EstadoEstrategia) -> tuple[float, float]:
+        """Cota inferior de (intereses, mes) o (mes, intereses) de cualquier orden que continúe el estado"""
+        falta = sum(estado.saldos) - estado.disponible
+        mes = estado.mes
+        if falta > TOLERANCIA_SALDO:
+            mes = bisect_left(presupuesto_acumulado, presupuesto_acumulado[mes] + falta - TOLERANCIA_SALDO)
+        return (mes, estado.intereses) if objetivo == "Tiempo" else (estado.intereses, mes)
+
+    def pendientes(estado: EstadoEstrategia) -> list[int]:
+        if estado.mes >= len(problema.presupuesto):
+            return []
+        return [deuda for deuda in range(num_deudas) if estado.saldos[deuda] > TOLERANCIA_SALDO]
+
+    avalancha = sorted(range(num_deudas), key=lambda deuda: (-problema.tasas[deuda], problema.saldos[deuda]))
+    bola_de_nieve = sorted(range(num_deudas), key=lambda deuda: (problema.saldos[deuda], -problema.tasas[deuda]))
+    candidatos = {"Avalancha (mayor tasa primero)": avalancha, "Bola de nieve (menor saldo primero)": bola_de_nieve}
+    if orden_personalizado:
+        indices = {nombre: deuda for deuda, nombre in enumerate(problema.nombres)}
+        propio = [indices[nombre] for nombre in orden_personalizado if nombre in indices]
+        candidatos["Orden propio"] = propio + [deuda for deuda in avalancha if deuda not in propio]
+
+    def completar(orden: Sequence[int]) -> tuple[tuple[int, ...], EstadoEstrategia]:
+        """Sigue un orden hasta que no quedan deudas pendientes, saltando las ya liquidadas"""
+        prefijo, estado = (), estado_prefijo(())
+        for deuda in orden:
+            if deuda in pendientes(estado):
+                prefijo += (deuda,)
+                estado = estado_prefijo(prefijo)
+        return prefijo, estado
+
+    mejor_prefijo, mejor_estado = min((completar(orden) for orden in candidatos.values()),
+                                      key=lambda par: _clave(par[1], objetivo))
+    mejor = _clave(mejor_estado, objetivo)
+    nodos = 0
+
+    def explorar(prefijo: tuple[int, ...]) -> None:
+        nonlocal mejor, mejor_prefijo, nodos
+        nodos += 1
+        estado = estado_prefijo(prefijo)
+        restantes = pendientes(estado)
+        if not restantes:
+            clave = _clave(estado, objetivo)
+            if clave < mejor:
+                mejor, mejor_prefijo = clave, prefijo
+            return
+        # Poda: ningún orden que siga este prefijo puede mejorar al mejor sin saldo pendiente
+        if mejor[0] == 0.0 and cota(estado) >= mejor[1:]:
+            return
+        for deuda in sorted(restantes, key=avalancha.index):
+            if nodos >= MAX_NODOS_BUSQUEDA:
+                return
+            explorar(prefijo + (deuda,))
+
+    explorar(())
+    resultados = [_resultado(problema, nombre, completar(orden)[0]) for nombre, orden in candidatos.items()]
+    busqueda = "Mejor orden encontrado" if nodos >= MAX_NODOS_BUSQUEDA else "Orden óptimo"
+    resultados.append(_resultado(problema, busqueda, mejor_prefijo))
+    return resultados
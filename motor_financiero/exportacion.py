@@ -0,0 +1,86 @@
+"""Exportación por bloques de tablas de resultados a CSV, CSV comprimido, Parquet o Excel."""
+from __future__ import annotations
+
+import gzip
+import io
+import tempfile
+from typing import BinaryIO, Iterator, Mapping
+
+import pandas as pd
+
+# Extensión y tipo MIME de cada formato de descarga
+FORMATOS_EXPORTACION = {
+    "CSV": (".csv", "text/csv"),
+    "CSV comprimido": (".csv.gz", "application/gzip"),
+    "Parquet": (".parquet", "application/vnd.apache.parquet"),
+    "Excel": (".xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+FILAS_POR_BLOQUE_EXPORTACION = 50_000
+
+MAX_FILAS_HOJA_EXCEL = 1_048_575  # Límite de Excel sin contar el encabezado
+
+MAX_BYTES_EXPORTACION_EN_MEMORIA = 32 * 1024 * 1024
+
+def _bloques_filas(df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+    """Bloques de a lo más FILAS_POR_BLOQUE_EXPORTACION filas (al menos uno, para escribir el encabezado)"""
+    for inicio in range(0, max(len(df), 1), FILAS_POR_BLOQUE_EXPORTACION):
+        yield df.iloc[inicio:inicio + FILAS_POR_BLOQUE_EXPORTACION]
+
+def _escribir_csv(tabla: pd.DataFrame, salida: BinaryIO, comprimido: bool) -> None:
+    destino = gzip.GzipFile(fileobj=salida, mode="wb") if comprimido else salida
+    texto = io.TextIOWrapper(destino, encoding="utf-8", newline="")
+    for bloque_idx, bloque in enumerate(_bloques_filas(tabla)):
+        bloque.to_csv(texto, header=bloque_idx == 0, index=False)
+    texto.flush()
+    texto.detach()
+    if comprimido:
+        destino.close()  # Escribe el final del gzip sin cerrar `salida`
+
+def _escribir_parquet(tabla: pd.DataFrame, salida: BinaryIO) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    escritor = None
+    for bloque in _bloques_filas(tabla):
+        grupo = pa.Table.from_pandas(bloque, preserve_index=False)
+        if escritor is None:
+            escritor = pq.ParquetWriter(salida, grupo.schema)
+        escritor.write_table(grupo)  # Un grupo de filas por bloque
+    escritor.close()
+
+def _escribir_excel(tablas: Mapping[str, pd.DataFrame], salida: BinaryIO) -> None:
+    from openpyxl import Workbook
+    hoja_calculo = Workbook(write_only=True)
+    for nombre, tabla in tablas.items():
+        # Las tablas que no caben en una hoja continúan en "Nombre (2)", "Nombre (3)", ...
+        for parte, inicio in enumerate(range(0, max(len(tabla), 1), MAX_FILAS_HOJA_EXCEL)):
+            hoja = hoja_calculo.create_sheet((nombre if parte == 0 else f"{nombre} ({parte + 1})")[:31])
+            hoja.append(list(tabla.columns))
+            for bloque in _bloques_filas(tabla.iloc[inicio:inicio + MAX_FILAS_HOJA_EXCEL]):
+                for fila in bloque.itertuples(index=False, name=None):
+                    hoja.append(fila)
+    hoja_calculo.save(salida)
+
+def exportar_tablas(tablas: Mapping[str, pd.DataFrame], formato: str) -> BinaryIO:
+    """Escribe las tablas ({nombre: DataFrame}) en el formato indicado, por bloques de filas.
+
+    Excel guarda una hoja por tabla; CSV y Parquet, si hay más de una tabla, las
+    concatenan con una columna "Tabla" al inicio. El archivo se arma en memoria hasta
+    MAX_BYTES_EXPORTACION_EN_MEMORIA y después en un temporal en disco; se devuelve
+    posicionado al inicio para que st.download_button lo lea por partes.
+    """
+    salida = tempfile.SpooledTemporaryFile(max_size=MAX_BYTES_EXPORTACION_EN_MEMORIA)
+    if formato == "Excel":
+        _escribir_excel(tablas, salida)
+    else:
+        if len(tablas) == 1:
+            tabla = next(iter(tablas.values()))
+        else:
+            tabla = pd.concat([df.assign(Tabla=nombre)[["Tabla", *df.columns]] for nombre, df in tablas.items()],
+                              ignore_index=True)
+        if formato == "Parquet":
+            _escribir_parquet(tabla, salida)
+        else:
+            _escribir_csv(tabla, salida, comprimido=formato == "CSV comprimido")
+    salida.seek(0)
+    return salida
@@ -0,0 +1,370 @@
+"""Motor de flujo semanal del mes: reglas por frecuencia, matrices items × semanas y tablas de resultados."""
+from __future__ import annotations
+
+from datetime import date
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Mapping, NamedTuple, Sequence, TypedDict
+
+import numpy as np
+import pandas as pd
+
+from .calendario import Semana, solo_lectura, calendario_mes, dia_semana
+from .deudas import EstadoDeudas, amortizar, estado_deudas
+
+if TYPE_CHECKING:
+    from .libro import Libro
+
+FRECUENCIAS = ["Diario", "Semanal", "Quincenal", "Mensual"]
+MAX_SEMANAS_MES = 6  # Un mes abarca como máximo 6 semanas de domingo a sábado
+MENSUAL = FRECUENCIAS.index("Mensual")
+
+def factores_gasto(inicios: np.ndarray, fines: np.ndarray, primer_dia: np.datetime64 | np.ndarray,
+                   ultimo_dia: np.datetime64 | np.ndarray) -> np.ndarray:
+    """Matriz frecuencias × semanas con el número de pagos de cada frecuencia por semana.
+
+    Las reglas se evalúan contra el mes al que pertenece cada semana (primer_dia y
+    ultimo_dia pueden ser escalares o un arreglo por semana): los días y sábados fuera
+    del mes no cuentan, las quincenas caen el día 15 y el último día del mes y el pago
+    mensual en el último día.
+    """
+    dia_15 = primer_dia + 14
+
+    # Recortar cada semana a los días que pertenecen al mes
+    desde = np.maximum(inicios, primer_dia)
+    hasta = np.minimum(fines, ultimo_dia)
+    dias_en_mes = np.maximum((hasta - desde).astype(np.int64) + 1, 0)
+
+    # Sábado de cada semana
+    sabados = inicios + (5 - dia_semana(inicios)) % 7
+
+    factores = np.zeros((len(FRECUENCIAS) + 1, len(inicios)))
+    factores[0] = dias_en_mes
+    factores[1] = (sabados <= fines) & (sabados >= primer_dia) & (sabados <= ultimo_dia)
+    factores[3] = (inicios <= ultimo_dia) & (ultimo_dia <= fines)
+    factores[2] = ((inicios <= dia_15) & (dia_15 <= fines)) + factores[3]
+    return factores
+
+class ProgramacionMes(NamedTuple):
+    """Índice de programación de un mes: en qué semanas cae cada frecuencia y cada día de pago"""
+    factores: np.ndarray        # Pagos de cada frecuencia (fila) en cada semana (columna)
+    semana_por_dia: np.ndarray  # Semana (0-indexada) de cada día 1-31; los días que no existen caen en el último día
+
+@lru_cache(maxsize=256)
+def programacion_mes(year: int, month: int) -> ProgramacionMes:
+    """Índice de programación del mes, calculado una sola vez a partir de su calendario"""
+    cal = calendario_mes(year, month)
+    factores = factores_gasto(cal.inicios, cal.fines, cal.primer_dia, cal.ultimo_dia)
+
+    # La semana 1 empieza en domingo, `desfase` días antes del día 1
+    desfase = (int(dia_semana(cal.primer_dia)) + 1) % 7
+    dias = np.clip(np.arange(32), 1, cal.dias_en_mes)
+    semana_por_dia = (dias - 1 + desfase) // 7
+
+    return ProgramacionMes(factores=solo_lectura(factores), semana_por_dia=solo_lectura(semana_por_dia))
+
+def dias_de_pago(libro: Libro) -> np.ndarray:
+    """Día de pago de los items mensuales que lo indican (0 para los demás)"""
+    dias = np.nan_to_num(libro.columna("Día de pago"), nan=0.0).astype(np.intp)
+    dias[libro.codigos != MENSUAL] = 0
+    return np.clip(dias, 0, 31)
+
+def matriz_programada(libro: Libro, year: int, month: int) -> np.ndarray:
+    """Monto de cada item en cada semana según su frecuencia y su día de pago (items × semanas).
+
+    Es la única regla de fechas del motor, para ingresos y gastos: los diarios cada día
+    del mes, los semanales cada sábado del mes, los quincenales el día 15 y el último
+    día y los mensuales el último día o su día de pago.
+    """
+    prog = programacion_mes(year, month)
+    montos = libro.montos
+    matriz = montos[:, None] * prog.factores[libro.codigos]
+
+    # Los pagos mensuales con día de pago caen en la semana de ese día, no en la del último día
+    dias = dias_de_pago(libro)
+    filas = np.flatnonzero(dias)
+    if filas.size:
+        matriz[filas] = 0.0
+        matriz[filas, prog.semana_por_dia[dias[filas]]] = montos[filas]
+    return matriz
+
+def matriz_distribucion(distribuciones: Sequence[Mapping[str, float] | None], num_semanas: int) -> np.ndarray:
+    """Convierte una lista de diccionarios {"Semana i": monto} en una matriz items × semanas"""
+    matriz = np.zeros((len(distribuciones), num_semanas))
+    for fila, distribucion in enumerate(distribuciones):
+        for semana_key, monto in (distribucion or {}).items():
+            semana = int(semana_key.split()[-1]) - 1
+            if 0 <= semana < num_semanas:
+                matriz[fila, semana] = monto
+    return matriz
+
+def matriz_ingresos(ingresos: Libro, year: int, month: int) -> np.ndarray:
+    """Monto de cada ingreso en cada semana (items × semanas), en su fecha real"""
+    return matriz_programada(ingresos, year, month)
+
+def mes_referencia() -> tuple[int, int]:
+    """Mes al que corresponden los "Pagos realizados" de las deudas: el mes en curso"""
+    hoy = date.today()
+    return hoy.year, hoy.month
+
+def matriz_cargos(gastos: Libro, year: int, month: int) -> np.ndarray:
+    """Cargo programado de cada gasto en cada semana (items × semanas): la regla de fechas o su distribución personalizada"""
+    num_semanas = len(calendario_mes(year, month).semanas)
+    matriz = matriz_programada(gastos, year, month)
+
+    personalizados = gastos.personalizada
+    if personalizados.any():
+        matriz[personalizados] = plegar_distribucion(gastos.distribucion[personalizados], num_semanas)
+    return matriz
+
+def estado_deudas_mes(gastos: Libro, year: int, month: int, referencia: tuple[int, int] | None = None) -> EstadoDeudas:
+    """Estado de las deudas al inicio del mes indicado.
+
+    estado_deudas describe las deudas en el mes de `referencia` (por defecto,
+    mes_referencia); para un mes posterior se amortizan antes los meses intermedios con
+    el cargo programado de cada uno. Así la cascada, la proyección y el plan de
+    amortización de cualquier mes parten del mismo saldo. Los meses anteriores a la
+    referencia usan el estado de la referencia.
+    """
+    estado = estado_deudas(gastos)
+    ref_year, ref_month = referencia or mes_referencia()
+    inicio = np.datetime64(f"{ref_year:04d}-{ref_month:02d}", "M")
+    anteriores = inicio + np.arange(max(int(np.datetime64(f"{year:04d}-{month:02d}", "M") - inicio), 0))
+    if not (estado.posiciones.size and anteriores.size):
+        return estado
+    deudas = gastos.subconjunto(estado.posiciones)
+    cargos = np.column_stack([matriz_cargos(deudas, mes.year, mes.month).sum(axis=1) for mes in anteriores.tolist()])
+    return estado._replace(saldo=amortizar(estado, cargos)["saldos"][:, -1],
+                           pagos_restantes=np.maximum(estado.pagos_restantes - anteriores.size, 0.0))
+
+def matriz_gastos(gastos: Libro, year: int, month: int, referencia: tuple[int, int] | None = None) -> np.ndarray:
+    """Monto de cada gasto en cada semana (items × semanas), respetando distribuciones personalizadas y plazos de deudas"""
+    matriz = matriz_cargos(gastos, year, month)
+
+    # Las deudas dejan de cobrarse al agotar el plazo o liquidar el saldo (desde su estado al inicio del mes)
+    deudas = estado_deudas_mes(gastos, year, month, referencia)
+    if deudas.posiciones.size:
+        filas = matriz[deudas.posiciones]
+        factor = amortizar(deudas, filas.sum(axis=1, keepdims=True))["factor"]
+        matriz[deudas.posiciones] = filas * factor
+    return matriz
+
+def matriz_mes(libro: Libro, year: int, month: int) -> np.ndarray:
+    """Matriz items × semanas del mes; los gastos suman a la regla de fechas sus distribuciones y deudas"""
+    if libro.tabla == "ingresos":
+        return matriz_ingresos(libro, year, month)
+    return matriz_gastos(libro, year, month)
+
+def montos_por_frecuencia(codigos: np.ndarray, montos: np.ndarray) -> np.ndarray:
+    """Suma de montos por código de frecuencia (vector de largo len(FRECUENCIAS) + 1)"""
+    return np.bincount(codigos, weights=montos, minlength=len(FRECUENCIAS) + 1)
+
+class ResumenFlujo(TypedDict):
+    """Totales del mes por semana (cada arreglo tiene una posición por semana)"""
+    semanas: tuple[Semana, ...]
+    nombres: tuple[str, ...]
+    ingresos: np.ndarray
+    gastos: np.ndarray
+    flujo: np.ndarray
+    saldo: np.ndarray  # Saldo acumulado al cierre de cada semana
+
+class FlujoSemanal(ResumenFlujo):
+    """Resumen del mes más el monto de cada item en cada semana"""
+    matriz_ingresos: np.ndarray  # items × semanas
+    matriz_gastos: np.ndarray    # items × semanas
+
+def resumen_flujo_mensual(ingresos: Libro, gastos: Libro, year: int, month: int) -> ResumenFlujo:
+    """Ingresos, gastos, flujo y saldo acumulado por semana a partir de los totales materializados de los libros.
+
+    Tras la primera consulta del mes, cada alta o baja en un libro solo ajusta sus
+    totales semanales, así que este resumen cuesta O(semanas) y no O(items × semanas).
+    """
+    cal = calendario_mes(year, month)
+    ingresos_semana = ingresos.totales_semanales(year, month)
+    gastos_semana = gastos.totales_semanales(year, month)
+    flujo = ingresos_semana - gastos_semana
+    return {
+        "semanas": cal.semanas,
+        "nombres": cal.nombres,
+        "ingresos": ingresos_semana,
+        "gastos": gastos_semana,
+        "flujo": flujo,
+        "saldo": np.cumsum(flujo),
+    }
+
+def calcular_flujo_semanal(ingresos: Libro, gastos: Libro, year: int, month: int) -> FlujoSemanal:
+    """Calcula en una sola pasada los ingresos, gastos y saldo acumulado de cada semana del mes"""
+    cal = calendario_mes(year, month)
+    ingresos_matriz = matriz_ingresos(ingresos, year, month)
+    gastos_matriz = matriz_gastos(gastos, year, month)
+
+    ingresos_semana = ingresos_matriz.sum(axis=0)
+    gastos_semana = gastos_matriz.sum(axis=0)
+    flujo = ingresos_semana - gastos_semana
+
+    return {
+        "semanas": cal.semanas,
+        "nombres": cal.nombres,
+        "matriz_ingresos": ingresos_matriz,
+        "matriz_gastos": gastos_matriz,
+        "ingresos": ingresos_semana,
+        "gastos": gastos_semana,
+        "flujo": flujo,
+        "saldo": np.cumsum(flujo),
+    }
+
+def tabla_flujo(flujo: Mapping[str, Any], sufijo: str = "") -> pd.DataFrame:
+    """DataFrame con el resumen semanal (Semana, Ingresos, Gastos, Flujo, Saldo Acumulado)"""
+    return pd.DataFrame({
+        "Semana": [nombre + sufijo for nombre in flujo["nombres"]],
+        "Ingresos": flujo["ingresos"],
+        "Gastos": flujo["gastos"],
+        "Flujo": flujo["flujo"],
+        "Saldo Acumulado": flujo["saldo"],
+    })
+
+def etapas_cascada(flujo: Mapping[str, Any], sufijo: str = "") -> tuple[list[str], list[float], list[str]]:
+    """Nombres, valores y medidas del gráfico de cascada a partir del flujo semanal"""
+    nombres_etapas = []
+    valores = []
+    medidas = []
+    for nombre, ingresos_semana, gastos_semana in zip(flujo["nombres"], flujo["ingresos"], flujo["gastos"]):
+        if ingresos_semana > 0:
+            nombres_etapas.append(f"+ Ingresos {nombre}{sufijo}")
+            valores.append(ingresos_semana)
+            medidas.append("relative")
+        if gastos_semana > 0:
+            nombres_etapas.append(f"- Gastos {nombre}{sufijo}")
+            valores.append(-gastos_semana)
+            medidas.append("relative")
+    return nombres_etapas, valores, medidas
+
+class DetalleSemanas(NamedTuple):
+    """Items con monto en cada semana, agrupados: los de la semana i ocupan [inicios[i], inicios[i + 1])"""
+    filas: np.ndarray    # Posición del item en el libro
+    montos: np.ndarray   # Monto del item en esa semana
+    inicios: np.ndarray  # semanas + 1 límites
+
+def agrupar_por_semana(matriz: np.ndarray) -> DetalleSemanas:
+    """Agrupa una matriz items × semanas por semana en una sola pasada (ordenado por semana y luego por item)"""
+    semanas, filas = np.nonzero(matriz.T > 0)
+    inicios = np.searchsorted(semanas, np.arange(matriz.shape[1] + 1))
+    return DetalleSemanas(solo_lectura(filas), solo_lectura(matriz[filas, semanas]), solo_lectura(inicios))
+
+def detalle_agrupado(detalle: DetalleSemanas, libro: Libro, semana_idx: int, columnas: list[str]) -> pd.DataFrame:
+    """Items con monto en la semana indicada y su monto en ella, leyendo solo el grupo de la semana: O(items de la semana)"""
+    grupo = slice(detalle.inicios[semana_idx], detalle.inicios[semana_idx + 1])
+    filas = detalle.filas[grupo]
+    tabla = libro.df.iloc[filas][columnas].reset_index(drop=True)
+    tabla.insert(1, "Monto", detalle.montos[grupo])
+    return tabla
+
+def tabla_detalle_movimientos(flujo: Mapping[str, Any], ingresos: Libro, gastos: Libro) -> pd.DataFrame:
+    """Tabla de movimientos (Semana, Tipo, Concepto, Monto) ordenada por semana y tipo"""
+    partes = []
+    for tipo, matriz, libro in (("Ingreso", flujo["matriz_ingresos"], ingresos),
+                                ("Gasto", flujo["matriz_gastos"], gastos)):
+        filas, columnas = np.nonzero(matriz)
+        partes.append(pd.DataFrame({
+            "Orden Semana": columnas,
+            "Tipo": tipo,
+            "Concepto": libro.nombres[filas],
+            "Monto": matriz[filas, columnas],
+        }))
+    detalle = pd.concat(partes, ignore_index=True)
+    detalle = detalle.sort_values(by=["Orden Semana", "Tipo"], kind="stable")
+    detalle.insert(0, "Semana", np.asarray(flujo["nombres"], dtype=object)[detalle["Orden Semana"].to_numpy()])
+    return detalle.drop(columns=["Orden Semana"]).reset_index(drop=True)
+
+def calcular_ingreso_inicial_mensual(ingresos: Libro, year: int, month: int) -> float:
+    """Total de ingresos del mes con la misma regla de fechas que las semanas"""
+    # Pagos de cada frecuencia en el mes; un día de pago cae una vez, igual que el último día
+    pagos_por_mes = programacion_mes(year, month).factores.sum(axis=1)
+    return float(montos_por_frecuencia(ingresos.codigos, ingresos.montos) @ pagos_por_mes)
+
+def calcular_ingreso_semanal(ingresos: Libro, numero_semana: int, semanas: Sequence[Semana]) -> float:
+    """Calcula los ingresos para una semana específica según fechas específicas"""
+    fin_primera_semana = semanas[0][1]  # La primera semana siempre termina dentro del mes
+    matriz = matriz_ingresos(ingresos, fin_primera_semana.year, fin_primera_semana.month)
+    return float(matriz[:, numero_semana - 1].sum())
+
+def calcular_gasto_semanal(gastos: Libro, numero_semana: int, semanas: Sequence[Semana]) -> float:
+    """Calcula los gastos para una semana específica según fechas específicas"""
+    fin_primera_semana = semanas[0][1]  # La primera semana siempre termina dentro del mes
+    matriz = matriz_gastos(gastos, fin_primera_semana.year, fin_primera_semana.month)
+    return float(matriz[:, numero_semana - 1].sum())
+
+def normalizar_monto_semanal(monto: float, frecuencia: str) -> float:
+    """Normaliza un monto a valor semanal según su frecuencia"""
+    if frecuencia == "Diario":
+        return monto * 7  # 7 días en una semana
+    elif frecuencia == "Semanal":
+        return monto
+    elif frecuencia == "Quincenal":
+        return monto / 2  # Una quincena tiene 2 semanas aproximadamente
+    elif frecuencia == "Mensual":
+        return monto / 4.33  # Un mes tiene aproximadamente 4.33 semanas
+    return monto
+
+def distribucion_por_defecto(gasto_monto: float, gasto_frec: str, year: int, month: int,
+                             dia_pago: int | None = None) -> np.ndarray:
+    """Monto del gasto en cada semana del mes (una posición por semana), con la regla de matriz_programada.
+
+    Así el total de una distribución personalizada parte del mismo monto mensual que
+    se cobra sin personalizarla.
+    """
+    prog = programacion_mes(year, month)
+    codigo = FRECUENCIAS.index(gasto_frec) if gasto_frec in FRECUENCIAS else len(FRECUENCIAS)
+    distribucion = gasto_monto * prog.factores[codigo]
+    if codigo == MENSUAL and dia_pago:
+        # Semana que contiene el día de pago en lugar de la del último día
+        distribucion = np.zeros_like(distribucion)
+        distribucion[prog.semana_por_dia[min(int(dia_pago), 31)]] = gasto_monto
+    return distribucion
+
+def inicializar_distribucion(gasto_monto: float, gasto_frec: str, year: int, month: int,
+                             dia_pago: int | None = None) -> dict[str, float]:
+    """Inicializa las distribuciones de pago según la frecuencia y las fechas reales del mes"""
+    distribucion = distribucion_por_defecto(gasto_monto, gasto_frec, year, month, dia_pago)
+    return {f"Semana {i}": float(monto) for i, monto in enumerate(distribucion, start=1)}
+
+def semanas_permitidas(gasto_frec: str, year: int, month: int) -> np.ndarray:
+    """Semanas del mes en las que puede caer el gasto: las dos quincenas o, para las demás frecuencias, todas"""
+    if gasto_frec == "Quincenal":
+        return distribucion_por_defecto(1.0, gasto_frec, year, month) > 0
+    return np.ones(len(calendario_mes(year, month).semanas), dtype=bool)
+
+def ajustar_distribucion(distribucion: np.ndarray, total: float | np.ndarray,
+                         permitidas: np.ndarray | None = None) -> np.ndarray:
+    """Ajusta cada distribución (última dimensión: semanas) para que sume `total`.
+
+    Escala proporcionalmente las semanas con monto o, si todas están en cero, reparte
+    en partes iguales entre las semanas permitidas. Funciona con cualquier número de
+    semanas y con una o muchas distribuciones a la vez (items × semanas).
+    """
+    distribucion = np.asarray(distribucion, dtype=np.float64)
+    total = np.asarray(total, dtype=np.float64)[..., None]
+    permitidas = np.broadcast_to(True if permitidas is None else permitidas, distribucion.shape)
+    suma = distribucion.sum(axis=-1, keepdims=True)
+    escalada = distribucion * np.divide(total, suma, out=np.zeros_like(suma), where=suma > 0)
+    pareja = np.where(permitidas, total / np.maximum(permitidas.sum(axis=-1, keepdims=True), 1), 0.0)
+    ajustada = np.where(suma > 0, escalada, pareja)
+    return np.where(np.abs(suma - total) > 0.01, ajustada, distribucion)
+
+def repartir_resto(distribucion: np.ndarray, total: float | np.ndarray, semana: int,
+                   permitidas: np.ndarray | None = None) -> np.ndarray:
+    """Conserva el monto de `semana` (0-indexada) y reparte lo que falta para `total` entre las demás semanas permitidas"""
+    distribucion = np.asarray(distribucion, dtype=np.float64)
+    semanas = np.arange(distribucion.shape[-1])
+    otras = (semanas != semana) & np.broadcast_to(True if permitidas is None else permitidas, distribucion.shape)
+    restante = np.maximum(np.asarray(total, dtype=np.float64) - distribucion[..., semana], 0.0)[..., None]
+    return np.where(otras, restante / np.maximum(otras.sum(axis=-1, keepdims=True), 1), distribucion)
+
+def plegar_distribucion(distribucion: np.ndarray, num_semanas: int) -> np.ndarray:
+    """Recorta distribuciones (items × semanas) a `num_semanas`, sumando las semanas sobrantes a la última.
+
+    Así una distribución guardada para un mes de 5 o 6 semanas se reutiliza en uno más
+    corto sin perder montos.
+    """
+    plegada = distribucion[..., :num_semanas].copy()
+    plegada[..., -1] += distribucion[..., num_semanas:].sum(axis=-1)
+    return plegada
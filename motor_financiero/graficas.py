@@ -0,0 +1,93 @@
+"""Series para las gráficas: agregación por periodo y reducción de puntos, con tamaño acotado sea cual sea el horizonte."""
+from __future__ import annotations
+
+import calendar
+from typing import Any, Mapping, TypedDict
+
+import numpy as np
+
+PERIODOS_GRAFICA = ("Semana", "Mes", "Trimestre", "Año")
+MESES_POR_PERIODO = {"Mes": 1, "Trimestre": 3, "Año": 12}
+
+MAX_PERIODOS_GRAFICA = 60  # Barras por serie: se elige el periodo más fino que no las supere
+MAX_PUNTOS_LINEA = 1000    # Puntos por línea (saldo acumulado, bandas de percentiles)
+
+class SeriePeriodos(TypedDict):
+    """Resultado de agregar_periodos: una posición por periodo"""
+    periodo: str
+    inicios: np.ndarray  # datetime64[D]: inicio de la semana o primer día del mes, trimestre o año
+    etiquetas: tuple[str, ...]
+    ingresos: np.ndarray
+    gastos: np.ndarray
+    flujo: np.ndarray
+    saldo: np.ndarray         # Saldo acumulado al cierre del periodo
+    saldo_minimo: np.ndarray  # Saldo acumulado más bajo entre las semanas del periodo
+
+def _claves_periodo(fines: np.ndarray, periodo: str) -> np.ndarray:
+    """Periodo de cada semana (por el mes de su sábado, como el año en los nombres de las semanas)"""
+    if periodo == "Semana":
+        return np.arange(len(fines))
+    return fines.astype("datetime64[M]").astype(np.int64) // MESES_POR_PERIODO[periodo]
+
+def periodo_grafica(fines: np.ndarray, max_periodos: int = MAX_PERIODOS_GRAFICA) -> str:
+    """Periodo más fino (semana, mes, trimestre o año) con el que el horizonte cabe en `max_periodos` barras"""
+    for periodo in PERIODOS_GRAFICA:
+        claves = _claves_periodo(fines, periodo)
+        if claves[-1] - claves[0] + 1 <= max_periodos:
+            return periodo
+    return PERIODOS_GRAFICA[-1]
+
+def _etiqueta(clave: int, periodo: str) -> str:
+    year, mes = divmod(clave * MESES_POR_PERIODO[periodo], 12)
+    year += 1970
+    if periodo == "Mes":
+        return f"{calendar.month_name[mes + 1]} {year}"
+    if periodo == "Trimestre":
+        return f"T{mes // 3 + 1} {year}"
+    return str(year)
+
+def agregar_periodos(serie: Mapping[str, Any], periodo: str) -> SeriePeriodos:
+    """Agrega una serie semanal (proyección o flujo del mes) por periodo con una suma por tramos.
+
+    Ingresos, gastos y flujo se suman; el saldo se toma al cierre de cada periodo y
+    también su mínimo semanal, para que agregar no esconda las semanas en negativo.
+    """
+    claves = _claves_periodo(np.asarray(serie["fines"]), periodo)
+    limites = np.flatnonzero(np.diff(claves, prepend=claves[0] - 1))  # Primera semana de cada periodo
+    ultimas = np.append(limites[1:], len(claves)) - 1
+    saldo = np.asarray(serie["saldo"])
+
+    if periodo == "Semana":
+        inicios = np.asarray(serie["inicios"])
+        etiquetas = tuple(serie["nombres"])
+    else:
+        meses = claves[limites] * MESES_POR_PERIODO[periodo]
+        inicios = meses.astype("datetime64[M]").astype("datetime64[D]")
+        etiquetas = tuple(_etiqueta(int(clave), periodo) for clave in claves[limites])
+
+    return {
+        "periodo": periodo,
+        "inicios": inicios,
+        "etiquetas": etiquetas,
+        "ingresos": np.add.reduceat(serie["ingresos"], limites),
+        "gastos": np.add.reduceat(serie["gastos"], limites),
+        "flujo": np.add.reduceat(serie["flujo"], limites),
+        "saldo": saldo[ultimas],
+        "saldo_minimo": np.minimum.reduceat(saldo, limites),
+    }
+
+def indices_reduccion(valores: np.ndarray, max_puntos: int = MAX_PUNTOS_LINEA) -> np.ndarray:
+    """Índices de a lo más `max_puntos` puntos de una serie que conservan sus extremos.
+
+    Parte la serie en tramos iguales y guarda el mínimo y el máximo de cada uno más el
+    primer y el último punto, así un saldo negativo breve sigue viéndose en la línea.
+    """
+    n = len(valores)
+    if n <= max_puntos:
+        return np.arange(n)
+    tramos = max((max_puntos - 2) // 2, 1)
+    ancho = -(-n // tramos)
+    matriz = np.pad(np.asarray(valores, dtype=np.float64), (0, tramos * ancho - n), mode="edge").reshape(tramos, ancho)
+    desplazamiento = np.arange(tramos) * ancho
+    extremos = np.concatenate([[0, n - 1], desplazamiento + matriz.argmin(axis=1), desplazamiento + matriz.argmax(axis=1)])
+    return np.unique(np.minimum(extremos, n - 1))
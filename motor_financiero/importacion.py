@@ -0,0 +1,146 @@
+"""Importación por bloques de ingresos y gastos desde archivos CSV o XLSX."""
+from __future__ import annotations
+
+import itertools
+from typing import BinaryIO, Iterator, Mapping
+
+import numpy as np
+import pandas as pd
+
+from .almacenamiento import conectar_bd, insertar_columnas
+from .flujo import FRECUENCIAS
+
+# Campos del esquema que se pueden leer de un archivo, por tabla (los tres primeros son obligatorios)
+CAMPOS_IMPORTACION = {
+    "ingresos": ["Nombre", "Monto", "Frecuencia", "Tipo", "Día de pago"],
+    "gastos": ["Nombre", "Monto", "Frecuencia", "Día de pago"],
+}
+
+CAMPOS_OBLIGATORIOS = ["Nombre", "Monto", "Frecuencia"]
+
+TIPOS_INGRESO = ["Fijo", "Variable"]
+
+TAMANO_BLOQUE_IMPORTACION = 100_000
+
+def _es_excel(nombre_archivo: str) -> bool:
+    return nombre_archivo.lower().endswith((".xlsx", ".xlsm"))
+
+def columnas_archivo(archivo: BinaryIO, nombre_archivo: str) -> list[str]:
+    """Encabezados de un CSV o XLSX, sin leer sus filas"""
+    if _es_excel(nombre_archivo):
+        from openpyxl import load_workbook
+        hoja_calculo = load_workbook(archivo, read_only=True, data_only=True)
+        try:
+            encabezados = next(hoja_calculo.active.iter_rows(max_row=1, values_only=True), ())
+        finally:
+            hoja_calculo.close()
+    else:
+        encabezados = pd.read_csv(archivo, nrows=0, compression="gzip" if nombre_archivo.endswith(".gz") else None).columns
+    archivo.seek(0)
+    return [str(encabezado) for encabezado in encabezados if encabezado is not None]
+
+def leer_bloques(archivo: BinaryIO, nombre_archivo: str, columnas: list[str],
+                 tamano_bloque: int = TAMANO_BLOQUE_IMPORTACION) -> Iterator[pd.DataFrame]:
+    """Lee solo las columnas indicadas de un CSV o XLSX en DataFrames de a lo más `tamano_bloque` filas"""
+    if not _es_excel(nombre_archivo):
+        yield from pd.read_csv(archivo, usecols=columnas, dtype=str, chunksize=tamano_bloque,
+                               compression="gzip" if nombre_archivo.endswith(".gz") else None)
+        return
+
+    from openpyxl import load_workbook
+    hoja_calculo = load_workbook(archivo, read_only=True, data_only=True)
+    try:
+        filas = hoja_calculo.active.iter_rows(values_only=True)
+        encabezados = [str(encabezado) for encabezado in next(filas, ())]
+        posiciones = [encabezados.index(columna) for columna in columnas]
+        while True:
+            bloque = [[fila[p] if p < len(fila) else None for p in posiciones]
+                      for fila in itertools.islice(filas, tamano_bloque)]
+            if not bloque:
+                break
+            yield pd.DataFrame(bloque, columns=columnas, dtype=object)
+    finally:
+        hoja_calculo.close()
+
+def _numeros(serie: pd.Series) -> np.ndarray:
+    """Convierte una columna leída de un archivo a float (acepta "$1,234.50"); lo no numérico queda en NaN"""
+    if not pd.api.types.is_numeric_dtype(serie):  # object o, con pandas 3, el tipo str
+        serie = serie.astype(str).str.replace(r"[$,\s]", "", regex=True)
+    return pd.to_numeric(serie, errors="coerce").to_numpy(dtype=np.float64, copy=True)
+
+def _textos(serie: pd.Series) -> pd.Series:
+    """Columna de un archivo como texto sin espacios en los extremos (vacío si falta el valor)"""
+    return serie.fillna("").astype(str).str.strip()
+
+def validar_bloque(tabla: str, bloque: pd.DataFrame) -> tuple[dict[str, np.ndarray], int]:
+    """Columnas tipadas con las filas válidas de un bloque cuyas columnas ya son campos del esquema.
+
+    Una fila es válida si tiene nombre, un monto positivo, una frecuencia conocida (sin
+    distinguir mayúsculas), un día de pago vacío o entre 1 y 31 y, en ingresos, un tipo
+    vacío (se toma "Fijo") o conocido. El día de pago solo se conserva en pagos mensuales.
+    Devuelve también cuántas filas se descartaron.
+    """
+    nombres = _textos(bloque["Nombre"])
+    montos = _numeros(bloque["Monto"])
+    frecuencias = _textos(bloque["Frecuencia"]).str.lower().map({frecuencia.lower(): frecuencia for frecuencia in FRECUENCIAS})
+    dias = _numeros(bloque["Día de pago"]) if "Día de pago" in bloque else np.full(len(bloque), np.nan)
+
+    validas = (nombres != "").to_numpy() & (montos > 0) & np.isfinite(montos) & frecuencias.notna().to_numpy()
+    validas &= np.isnan(dias) | ((dias >= 1) & (dias <= 31) & (dias == np.floor(dias)))
+    dias[(frecuencias != "Mensual").to_numpy()] = np.nan
+
+    columnas = {}
+    if tabla == "ingresos":
+        tipos = _textos(bloque["Tipo"]).str.capitalize().replace("", "Fijo") if "Tipo" in bloque else \
+            pd.Series("Fijo", index=bloque.index)
+        validas &= tipos.isin(TIPOS_INGRESO).to_numpy()
+        columnas["Tipo"] = tipos.to_numpy(dtype=object)[validas]
+    columnas.update({
+        "Nombre": nombres.to_numpy(dtype=object)[validas],
+        "Monto": montos[validas],
+        "Frecuencia": frecuencias.to_numpy(dtype=object)[validas],
+        "Día de pago": dias[validas],
+    })
+    return columnas, int(len(bloque) - validas.sum())
+
+def importar_archivo(archivo: BinaryIO, nombre_archivo: str, tabla: str, mapeo: Mapping[str, str | None],
+                     ruta: str | None = None, tamano_bloque: int = TAMANO_BLOQUE_IMPORTACION,
+                     max_filas: int | None = None) -> tuple[np.ndarray, dict[str, np.ndarray], int]:
+    """Importa un CSV/XLSX por bloques a la base de datos, en una sola transacción.
+
+    `mapeo` indica, para cada campo del esquema, la columna del archivo que lo contiene
+    (o None). Devuelve los ids y las columnas de las filas válidas, para agregarlas al
+    libro de una sola vez, y el número de filas descartadas. Si las filas válidas
+    superan `max_filas`, no se importa ninguna.
+    """
+    mapeo = {campo: columna for campo, columna in mapeo.items() if columna}
+    faltantes = [campo for campo in CAMPOS_OBLIGATORIOS if campo not in mapeo]
+    if faltantes:
+        raise ValueError(f"Falta indicar la columna de: {', '.join(faltantes)}")
+    columnas_leidas = list(dict.fromkeys(mapeo.values()))
+
+    partes = []
+    descartadas = 0
+    conexion = conectar_bd(ruta)
+    try:
+        with conexion:
+            siguiente_id = primer_id = conexion.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {tabla}").fetchone()[0]
+            for bloque in leer_bloques(archivo, nombre_archivo, columnas_leidas, tamano_bloque):
+                bloque = pd.DataFrame({campo: bloque[columna] for campo, columna in mapeo.items()})
+                columnas, descartadas_bloque = validar_bloque(tabla, bloque)
+                ids = np.arange(siguiente_id, siguiente_id + len(columnas["Monto"]), dtype=np.int64)
+                insertar_columnas(conexion, tabla, ids, columnas)
+                siguiente_id += len(ids)
+                descartadas += descartadas_bloque
+                if max_filas is not None and siguiente_id - primer_id > max_filas:
+                    # Sale del bloque `with` con la excepción: se revierte todo lo insertado
+                    raise ValueError(f"El archivo supera el límite de registros: quedan {max(max_filas, 0):,} disponibles.")
+                partes.append((ids, columnas))
+    finally:
+        conexion.close()
+
+    if not partes:
+        return np.zeros(0, dtype=np.int64), {}, descartadas
+    ids = np.concatenate([ids for ids, _ in partes])
+    columnas = {campo: np.concatenate([columnas[campo] for _, columnas in partes]) for campo in partes[0][1]}
+    return ids, columnas, descartadas
@@ -0,0 +1,314 @@
+"""Libro de registros: ingresos o gastos guardados por columnas con tipos fijos."""
+from __future__ import annotations
+
+import hashlib
+import json
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .almacenamiento import COLUMNAS_BD, conectar_bd
+from .calendario import solo_lectura
+from .flujo import FRECUENCIAS, MAX_SEMANAS_MES, matriz_distribucion, matriz_mes
+
+# Tipo de cada columna del libro, por tabla (la frecuencia se guarda como código categórico)
+TIPOS_LIBRO = {
+    "ingresos": {
+        "Nombre": object,
+        "Monto": np.float64,
+        "Tipo": object,
+        "Frecuencia": np.int8,
+        "Día de pago": np.float64,
+    },
+    "gastos": {
+        "Nombre": object,
+        "Monto": np.float64,
+        "Frecuencia": np.int8,
+        "Día de pago": np.float64,
+        "Es deuda": np.bool_,
+        "Deuda total": np.float64,
+        "Plazo (meses)": np.float64,
+        "Pagos realizados": np.float64,
+        "Tasa anual (%)": np.float64,
+        "Distribucion personalizada": np.bool_,
+    },
+}
+
+# Código de cada frecuencia en la columna "Frecuencia" del libro (-1 si no se reconoce)
+CODIGOS_FRECUENCIA = {frecuencia: codigo for codigo, frecuencia in enumerate(FRECUENCIAS)}
+
+def _columna_tipada(campo: str, tipo: type, valores: Sequence[Any]) -> np.ndarray:
+    """Convierte una secuencia de valores de registros al arreglo tipado de su columna.
+
+    Evita construir Series o Categorical: con los pocos registros de una alta o de un
+    perfil pequeño, su costo fijo dominaba la conversión.
+    """
+    if campo == "Frecuencia":
+        return np.fromiter((CODIGOS_FRECUENCIA.get(valor, -1) for valor in valores), dtype=np.int8, count=len(valores))
+    if tipo is np.float64:
+        try:
+            return np.array(valores, dtype=np.float64)  # None se convierte en NaN
+        except (TypeError, ValueError):
+            return pd.to_numeric(pd.Series(list(valores), dtype=object), errors="coerce").to_numpy(dtype=np.float64)
+    columna = np.empty(len(valores), dtype=object)
+    columna[:] = valores
+    if tipo is np.bool_:
+        columna[pd.isna(columna)] = False
+        return columna.astype(bool)
+    return columna
+
+MAX_MESES_MATERIALIZADOS = 24
+
+class Libro:
+    """Registros de ingresos o gastos guardados por columnas con tipos fijos.
+
+    Cada columna es un arreglo NumPy con capacidad de reserva: agregar escribe al final
+    sin tocar las filas existentes y eliminar crea arreglos nuevos, así que las vistas
+    entregadas antes de una modificación (`df`, `montos`, ...) nunca cambian por debajo.
+    La distribución semanal de los gastos es una matriz items × MAX_SEMANAS_MES con
+    solo las distribuciones personalizadas; las demás filas quedan en cero, vengan de
+    la base de datos o de un alta, porque su monto por semana sale de la regla de fechas.
+    """
+
+    def __init__(self, tabla: str) -> None:
+        self.tabla = tabla
+        self.tipos = TIPOS_LIBRO[tabla]
+        self._n = 0
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._datos = {campo: np.zeros(0, dtype=tipo) for campo, tipo in self.tipos.items()}
+        self._distribucion = np.zeros((0, MAX_SEMANAS_MES))
+        self._df = None
+        self._totales = {}  # (año, mes) -> totales por semana materializados
+        self._huella = None
+
+    @classmethod
+    def desde_registros(cls, tabla: str, registros: list[dict]) -> Libro:
+        """Crea un libro a partir de una lista de diccionarios como los de agregar_ingreso/agregar_gasto"""
+        libro = cls(tabla)
+        libro.agregar(registros)
+        return libro
+
+    def __len__(self) -> int:
+        return self._n
+
+    def _reservar(self, extra: int) -> None:
+        """Amplía la capacidad de los arreglos (duplicándola) si no caben `extra` filas más"""
+        requerido = self._n + extra
+        if requerido <= len(self._ids):
+            return
+        capacidad = max(requerido, 2 * len(self._ids), 16)
+
+        def ampliar(arreglo):
+            nuevo = np.zeros((capacidad,) + arreglo.shape[1:], dtype=arreglo.dtype)
+            nuevo[:self._n] = arreglo[:self._n]
+            return nuevo
+
+        self._ids = ampliar(self._ids)
+        self._datos = {campo: ampliar(arreglo) for campo, arreglo in self._datos.items()}
+        self._distribucion = ampliar(self._distribucion)
+
+    def agregar_columnas(self, ids: Sequence[int], columnas: Mapping[str, Sequence[Any]],
+                         distribucion: np.ndarray | None = None) -> None:
+        """Agrega filas dadas por columnas ({campo: valores}) y su matriz de distribución"""
+        k = len(ids)
+        if k == 0:
+            return
+        self._reservar(k)
+        nuevas = slice(self._n, self._n + k)
+        self._ids[nuevas] = ids
+        for campo, tipo in self.tipos.items():
+            self._datos[campo][nuevas] = _columna_tipada(campo, tipo, columnas.get(campo, [None] * k))
+        if distribucion is not None and "Distribucion personalizada" in self._datos:
+            # Como en cargar_libro, solo se conservan las distribuciones personalizadas
+            distribucion = np.where(self._datos["Distribucion personalizada"][nuevas, None], distribucion, 0.0)
+        self._distribucion[nuevas] = 0.0 if distribucion is None else distribucion
+        self._n += k
+        self._df = None
+        self._huella = None
+        self._ajustar_totales(np.arange(self._n - k, self._n), 1.0)
+
+    def agregar(self, registros: list[dict]) -> None:
+        """Agrega registros (diccionarios); usa su "id" o, si no lo tienen, uno consecutivo"""
+        if not registros:
+            return
+        siguiente_id = int(self._ids[:self._n].max(initial=0)) + 1
+        ids = [registro.get("id", siguiente_id + i) for i, registro in enumerate(registros)]
+        columnas = {campo: [registro.get(campo) for registro in registros] for campo in self.tipos}
+        distribucion = matriz_distribucion([registro.get("Distribucion semanas") for registro in registros],
+                                           MAX_SEMANAS_MES)
+        self.agregar_columnas(ids, columnas, distribucion)
+
+    def eliminar(self, posiciones: Sequence[int]) -> None:
+        """Elimina las filas en las posiciones indicadas"""
+        self._ajustar_totales(posiciones, -1.0)
+        conservar = np.ones(self._n, dtype=bool)
+        conservar[list(posiciones)] = False
+        self._ids = self._ids[:self._n][conservar]
+        self._datos = {campo: arreglo[:self._n][conservar] for campo, arreglo in self._datos.items()}
+        self._distribucion = self._distribucion[:self._n][conservar]
+        self._n = int(conservar.sum())
+        self._df = None
+        self._huella = None
+
+    def actualizar(self, ids: Sequence[int], columnas: Mapping[str, Sequence[Any]]) -> None:
+        """Reemplaza campos de las filas con esos ids ("Distribucion semanas" como lista de diccionarios).
+
+        Las columnas modificadas se copian antes de escribir, para que las vistas
+        entregadas antes sigan sin cambiar, y los totales materializados se ajustan
+        restando las filas viejas y sumando las nuevas. Como al agregar, las filas que
+        quedan sin distribución personalizada guardan su distribución en cero.
+        """
+        posiciones = self.posiciones(ids)
+        if posiciones.size == 0:
+            return
+        self._ajustar_totales(posiciones, -1.0)
+        for campo, valores in columnas.items():
+            if campo == "Distribucion semanas":
+                self._distribucion = self._distribucion.copy()
+                self._distribucion[posiciones] = matriz_distribucion(valores, MAX_SEMANAS_MES)
+            else:
+                self._datos[campo] = self._datos[campo].copy()
+                self._datos[campo][posiciones] = _columna_tipada(campo, self.tipos[campo], valores)
+        sin_propia = posiciones[~self.personalizada[posiciones]]
+        if self._distribucion[sin_propia].any():
+            self._distribucion = self._distribucion.copy()
+            self._distribucion[sin_propia] = 0.0
+        self._df = None
+        self._huella = None
+        self._ajustar_totales(posiciones, 1.0)
+
+    def posiciones(self, ids: Sequence[int]) -> np.ndarray:
+        """Posición de cada id en el libro; KeyError si alguno no está"""
+        ids = np.asarray(ids, dtype=np.int64)
+        orden = np.argsort(self.ids, kind="stable")
+        indices = np.searchsorted(self.ids, ids, sorter=orden)
+        encontrados = indices < self._n
+        encontrados[encontrados] = self.ids[orden[indices[encontrados]]] == ids[encontrados]
+        if not encontrados.all():
+            raise KeyError(f"Ids que no están en el libro: {ids[~encontrados].tolist()}")
+        return orden[indices]
+
+    def subconjunto(self, posiciones: Sequence[int]) -> Libro:
+        """Nuevo libro con copia de las filas en las posiciones indicadas"""
+        posiciones = np.asarray(posiciones, dtype=np.intp)
+        sub = Libro(self.tabla)
+        sub._n = len(posiciones)
+        sub._ids = self.ids[posiciones]
+        sub._datos = {campo: self.columna(campo)[posiciones] for campo in self.tipos}
+        sub._distribucion = self.distribucion[posiciones]
+        return sub
+
+    def totales_semanales(self, year: int, month: int) -> np.ndarray:
+        """Total por semana del mes, calculado completo una vez y luego mantenido por deltas"""
+        clave = (year, month)
+        if clave not in self._totales:
+            if len(self._totales) >= MAX_MESES_MATERIALIZADOS:
+                self._totales.pop(next(iter(self._totales)))  # Descartar el mes materializado más antiguo
+            self._totales[clave] = solo_lectura(matriz_mes(self, year, month).sum(axis=0))
+        return self._totales[clave]
+
+    def _ajustar_totales(self, posiciones: Sequence[int], signo: float) -> None:
+        """Suma (signo 1) o resta (signo -1) las filas indicadas a los totales materializados: O(filas × semanas)"""
+        if not self._totales or len(posiciones) == 0:
+            return
+        filas = self.subconjunto(posiciones)
+        for (year, month), totales in self._totales.items():
+            nuevos = totales + signo * matriz_mes(filas, year, month).sum(axis=0)
+            nuevos[np.abs(nuevos) < 1e-6] = 0.0  # Evitar residuos de redondeo tras altas y bajas
+            self._totales[(year, month)] = solo_lectura(nuevos)
+
+    def columna(self, campo: str) -> np.ndarray:
+        """Vista (sin copia) de una columna"""
+        return self._datos[campo][:self._n]
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._ids[:self._n]
+
+    @property
+    def nombres(self) -> np.ndarray:
+        return self.columna("Nombre")
+
+    @property
+    def montos(self) -> np.ndarray:
+        return self.columna("Monto")
+
+    @property
+    def codigos(self) -> np.ndarray:
+        """Códigos de frecuencia para el motor (len(FRECUENCIAS) si no se reconoce)"""
+        codigos = self.columna("Frecuencia").astype(np.intp)
+        codigos[codigos < 0] = len(FRECUENCIAS)
+        return codigos
+
+    @property
+    def personalizada(self) -> np.ndarray:
+        if "Distribucion personalizada" not in self._datos:
+            return np.zeros(self._n, dtype=bool)
+        return self.columna("Distribucion personalizada")
+
+    @property
+    def distribucion(self) -> np.ndarray:
+        """Vista (sin copia) de la matriz items × MAX_SEMANAS_MES de distribución semanal"""
+        return self._distribucion[:self._n]
+
+    @property
+    def huella(self) -> str:
+        """Hash del contenido (columnas y distribución, sin los ids), recalculado solo tras una modificación.
+
+        Dos libros con el mismo contenido tienen la misma huella aunque pertenezcan a
+        sesiones distintas, por eso sirve como clave de la caché de resultados.
+        """
+        if self._huella is None:
+            huella = hashlib.blake2b(self.tabla.encode(), digest_size=16)
+            for campo in self.tipos:
+                columna = self.columna(campo)
+                huella.update(campo.encode())
+                if columna.dtype == object:
+                    huella.update("\x1f".join(map(str, columna)).encode())
+                else:
+                    huella.update(np.ascontiguousarray(columna).tobytes())
+            huella.update(np.ascontiguousarray(self.distribucion).tobytes())
+            self._huella = huella.hexdigest()
+        return self._huella
+
+    @property
+    def df(self) -> pd.DataFrame:
+        """DataFrame de solo lectura sobre las columnas, reconstruido solo tras una modificación"""
+        if self._df is None:
+            datos = {campo: self.columna(campo) for campo in self.tipos}
+            datos["Frecuencia"] = pd.Categorical.from_codes(datos["Frecuencia"], categories=FRECUENCIAS)
+            self._df = pd.DataFrame(datos, copy=False)
+        return self._df
+
+def cargar_libro(tabla: str, ruta: str | None = None) -> Libro:
+    """Lee una tabla completa de la base de datos directamente a un Libro, sin pasar por diccionarios"""
+    campos = list(COLUMNAS_BD[tabla])
+    # Solo se leen las distribuciones personalizadas; las demás se calculan por fecha
+    columnas_sql = [
+        "CASE WHEN distribucion_personalizada THEN distribucion_semanas END" if columna == "distribucion_semanas" else columna
+        for columna in COLUMNAS_BD[tabla].values()
+    ]
+    conexion = conectar_bd(ruta)
+    try:
+        filas = conexion.execute(f"SELECT id, {', '.join(columnas_sql)} FROM {tabla} ORDER BY id").fetchall()
+    finally:
+        conexion.close()
+
+    libro = Libro(tabla)
+    if not filas:
+        return libro
+    valores = list(zip(*filas))
+    columnas = dict(zip(campos, valores[1:]))
+
+    distribucion = None
+    if "Distribucion semanas" in columnas:
+        personalizada = np.array(columnas["Distribucion personalizada"], dtype=bool)
+        distribucion = np.zeros((len(filas), MAX_SEMANAS_MES))
+        if personalizada.any():
+            textos = np.array(columnas["Distribucion semanas"], dtype=object)[personalizada]
+            distribucion[personalizada] = matriz_distribucion(
+                json.loads("[" + ",".join(texto or "{}" for texto in textos) + "]"), MAX_SEMANAS_MES
+            )
+    libro.agregar_columnas(np.array(valores[0], dtype=np.int64), columnas, distribucion)
+    return libro
@@ -0,0 +1,120 @@
+"""Cálculo por lotes del flujo mensual y la proyección de muchos perfiles en paralelo.
+
+Cada perfil es una base de datos SQLite con el mismo esquema que usa la aplicación
+(un archivo .db por persona). Uso:
+
+    python -m motor_financiero.lotes perfiles/ --year 2025 --month 3 --meses 12 --salida resultados.parquet
+
+El resultado es una sola tabla con una fila por perfil, vista ("Mes" o "Proyección")
+y semana; el formato se elige por la extensión de --salida (.parquet, .csv o .csv.gz).
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import os
+import shutil
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from .calendario import calendario_mes
+from .exportacion import exportar_tablas
+from .flujo import resumen_flujo_mensual
+from .libro import cargar_libro
+from .proyeccion import calcular_proyeccion
+
+# Formato de exportación según la extensión del archivo de salida
+FORMATOS_SALIDA = {".parquet": "Parquet", ".csv": "CSV", ".gz": "CSV comprimido"}
+
+# Columnas de la tabla consolidada
+COLUMNAS_RESULTADO = ["Perfil", "Vista", "Semana", "Inicio", "Ingresos", "Gastos", "Flujo", "Saldo Acumulado"]
+
+def _columnas_vista(perfil: str, vista: str, inicios: np.ndarray, resultado: Mapping[str, Any]) -> dict[str, np.ndarray]:
+    num_semanas = len(inicios)
+    return {
+        "Perfil": np.full(num_semanas, perfil, dtype=object),
+        "Vista": np.full(num_semanas, vista, dtype=object),
+        "Semana": np.array(resultado["nombres"], dtype=object),
+        "Inicio": inicios,
+        "Ingresos": resultado["ingresos"],
+        "Gastos": resultado["gastos"],
+        "Flujo": resultado["flujo"],
+        "Saldo Acumulado": resultado["saldo"],
+    }
+
+def calcular_perfil(ruta: str, year: int, month: int, meses: int) -> dict[str, np.ndarray]:
+    """Flujo semanal del mes y proyección de `meses` meses de un perfil guardado en `ruta`, por columnas"""
+    ingresos = cargar_libro("ingresos", ruta)
+    gastos = cargar_libro("gastos", ruta)
+    perfil = Path(ruta).stem
+
+    resumen = resumen_flujo_mensual(ingresos, gastos, year, month)
+    vistas = [_columnas_vista(perfil, "Mes", calendario_mes(year, month).inicios, resumen)]
+    if meses:
+        proyeccion = calcular_proyeccion(ingresos, gastos, year, month, meses)
+        vistas.append(_columnas_vista(perfil, "Proyección", proyeccion["inicios"], proyeccion))
+    return {columna: np.concatenate([vista[columna] for vista in vistas]) for columna in COLUMNAS_RESULTADO}
+
+def _calcular_perfil_args(args: tuple[str, int, int, int]) -> dict[str, np.ndarray]:
+    return calcular_perfil(*args)
+
+def calcular_perfiles(rutas: Sequence[str], year: int, month: int, meses: int,
+                      procesos: int | None = None) -> pd.DataFrame:
+    """Calcula todos los perfiles repartiéndolos entre `procesos` procesos (todos los núcleos por defecto).
+
+    Cada proceso devuelve arreglos por columna y la tabla consolidada se arma una sola
+    vez al final, sin un DataFrame intermedio por perfil.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    tareas = [(str(ruta), year, month, meses) for ruta in rutas]
+    if not tareas:
+        return pd.DataFrame(columns=COLUMNAS_RESULTADO)
+    if procesos == 1:
+        resultados = list(map(_calcular_perfil_args, tareas))
+    else:
+        # Bloques grandes para que el costo de comunicación entre procesos no domine con perfiles pequeños
+        bloque = max(1, len(tareas) // (procesos * 8))
+        with ProcessPoolExecutor(max_workers=procesos) as ejecutor:
+            resultados = list(ejecutor.map(_calcular_perfil_args, tareas, chunksize=bloque))
+    return pd.DataFrame({
+        columna: np.concatenate([resultado[columna] for resultado in resultados]) for columna in COLUMNAS_RESULTADO
+    })
+
+def guardar_resultados(tabla: pd.DataFrame, salida: str) -> None:
+    """Escribe la tabla consolidada en el formato que indica la extensión de `salida`"""
+    formato = FORMATOS_SALIDA.get(Path(salida).suffix.lower())
+    if formato is None:
+        raise ValueError(f"Extensión no soportada: {salida} (usa .parquet, .csv o .csv.gz)")
+    with exportar_tablas({"Resultados": tabla}, formato) as origen, open(salida, "wb") as destino:
+        shutil.copyfileobj(origen, destino)
+
+def main(argv: Sequence[str] | None = None) -> int:
+    hoy = datetime.date.today()
+    parser = argparse.ArgumentParser(
+        prog="python -m motor_financiero.lotes",
+        description="Calcula el flujo mensual y la proyección de cada perfil (.db) de un directorio.",
+    )
+    parser.add_argument("directorio", help="Directorio con una base de datos .db por perfil")
+    parser.add_argument("--year", type=int, default=hoy.year, help="Año del mes a calcular (por defecto, el actual)")
+    parser.add_argument("--month", type=int, default=hoy.month, help="Mes a calcular, 1-12 (por defecto, el actual)")
+    parser.add_argument("--meses", type=int, default=12, help="Meses de proyección; 0 para solo el mes (por defecto, 12)")
+    parser.add_argument("--salida", default="resultados.parquet", help="Archivo .parquet, .csv o .csv.gz de salida")
+    parser.add_argument("--procesos", type=int, default=None, help="Procesos en paralelo (por defecto, uno por núcleo)")
+    args = parser.parse_args(argv)
+
+    rutas = sorted(Path(args.directorio).glob("*.db"))
+    if not rutas:
+        print(f"No se encontraron perfiles .db en {args.directorio}", file=sys.stderr)
+        return 1
+    tabla = calcular_perfiles(rutas, args.year, args.month, args.meses, args.procesos)
+    guardar_resultados(tabla, args.salida)
+    print(f"{len(rutas)} perfiles, {len(tabla)} filas -> {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
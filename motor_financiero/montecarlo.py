@@ -0,0 +1,67 @@
+"""Simulación Monte Carlo de la proyección con ingresos variables (y, opcionalmente, gastos) inciertos."""
+from __future__ import annotations
+
+from typing import Sequence, TypedDict
+
+import numpy as np
+
+from .libro import Libro
+from .proyeccion import calcular_proyeccion
+
+PERCENTILES_MONTECARLO = (5, 25, 50, 75, 95)
+
+class SimulacionMonteCarlo(TypedDict):
+    """Resultado de simular_montecarlo: una posición por semana del eje de la proyección"""
+    inicios: np.ndarray
+    nombres: tuple[str, ...]
+    percentiles: tuple[int, ...]
+    bandas: np.ndarray               # percentiles × semanas con el saldo acumulado de cada percentil
+    saldo_medio: np.ndarray
+    prob_saldo_negativo: np.ndarray  # Fracción de escenarios con saldo acumulado < 0 en cada semana
+    escenarios: int
+
+def factores_lognormales(rng: np.random.Generator, forma: tuple[int, int], variabilidad: float) -> np.ndarray:
+    """Factores multiplicativos lognormales con media 1 y coeficiente de variación `variabilidad`"""
+    if variabilidad <= 0:
+        return np.ones(forma)
+    sigma2 = np.log1p(variabilidad ** 2)
+    return rng.lognormal(mean=-sigma2 / 2, sigma=np.sqrt(sigma2), size=forma)
+
+def simular_montecarlo(ingresos: Libro, gastos: Libro, year: int, month: int, meses: int,
+                       escenarios: int = 10_000, variabilidad_ingresos: float = 0.3,
+                       variabilidad_gastos: float = 0.0, semilla: int | None = None,
+                       percentiles: Sequence[int] = PERCENTILES_MONTECARLO) -> SimulacionMonteCarlo:
+    """Simula `escenarios` trayectorias del saldo acumulado semana a semana.
+
+    Los ingresos de tipo "Variable" de cada semana se multiplican por un factor
+    lognormal independiente por semana y escenario (media 1, coeficiente de variación
+    `variabilidad_ingresos`); los ingresos fijos quedan como en la proyección y los
+    gastos solo varían si `variabilidad_gastos` > 0. Todo se calcula sobre la matriz
+    semanas × escenarios, sin ciclos por escenario.
+    """
+    proyeccion = calcular_proyeccion(ingresos, gastos, year, month, meses)
+    variables = np.flatnonzero(ingresos.columna("Tipo") == "Variable")
+    ingresos_variables = calcular_proyeccion(ingresos.subconjunto(variables), Libro("gastos"),
+                                             year, month, meses)["ingresos"]
+    ingresos_fijos = proyeccion["ingresos"] - ingresos_variables
+
+    rng = np.random.default_rng(semilla)
+    forma = (len(proyeccion["inicios"]), escenarios)
+    flujo = factores_lognormales(rng, forma, variabilidad_ingresos)
+    flujo *= ingresos_variables[:, None]
+    flujo += ingresos_fijos[:, None]
+    gastos_semana = proyeccion["gastos"][:, None]
+    if variabilidad_gastos > 0:
+        gastos_semana = factores_lognormales(rng, forma, variabilidad_gastos) * gastos_semana
+    flujo -= gastos_semana
+    saldo = np.cumsum(flujo, axis=0, out=flujo)  # Reutiliza la matriz del flujo
+
+    return {
+        "inicios": proyeccion["inicios"],
+        "nombres": proyeccion["nombres"],
+        "percentiles": tuple(percentiles),
+        "bandas": np.percentile(saldo, percentiles, axis=1),
+        "saldo_medio": saldo.mean(axis=1),
+        "prob_saldo_negativo": (saldo < 0).mean(axis=1),
+        "escenarios": escenarios,
+    }
@@ -0,0 +1,202 @@
+"""Proyección semana a semana de varios meses sin matrices items × semanas."""
+from __future__ import annotations
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, TypedDict
+
+import numpy as np
+
+from .calendario import solo_lectura, dia_semana, format_date_range
+from .deudas import MAX_MESES_AMORTIZACION, Amortizacion, EstadoDeudas, amortizar
+from .flujo import dias_de_pago, estado_deudas_mes, factores_gasto, montos_por_frecuencia
+
+if TYPE_CHECKING:
+    from .libro import Libro
+
+@lru_cache(maxsize=32)
+def eje_proyeccion(year: int, month: int, meses: int) -> dict[str, Any]:
+    """Construye de una vez el eje de semanas del horizonte.
+
+    Trabaja en el espacio "mes-semana" (cada semana de get_month_calendar de cada mes,
+    como en la vista mensual) y asigna a cada una su posición en un eje continuo de
+    semanas únicas: la semana compartida entre dos meses aparece una sola vez en el eje.
+    """
+    primer_mes = np.datetime64(f"{year:04d}-{month:02d}", "M")
+    meses_horizonte = primer_mes + np.arange(meses)
+    primer_dia = meses_horizonte.astype("datetime64[D]")
+    ultimo_dia = (meses_horizonte + 1).astype("datetime64[D]") - 1
+
+    # Mismo criterio que get_month_calendar: del domingo anterior al sábado posterior
+    inicio_mes = primer_dia - (dia_semana(primer_dia) + 1) % 7
+    fin_mes = ultimo_dia + (5 - dia_semana(ultimo_dia)) % 7
+    semanas_por_mes = ((fin_mes - inicio_mes).astype(np.int64) + 1) // 7
+
+    mes_idx = np.repeat(np.arange(meses), semanas_por_mes)
+    primera_semana_mes = np.cumsum(semanas_por_mes) - semanas_por_mes
+    semana_en_mes = np.arange(mes_idx.size) - primera_semana_mes[mes_idx]
+    inicios_mes_semana = inicio_mes[mes_idx] + 7 * semana_en_mes
+
+    semana_eje = (inicios_mes_semana - inicio_mes[0]).astype(np.int64) // 7
+    dias_en_mes = (ultimo_dia - primer_dia).astype(np.int64) + 1
+    inicios = inicio_mes[0] + 7 * np.arange(semana_eje[-1] + 1)
+
+    fines = inicios + 6
+    return {
+        "inicios": solo_lectura(inicios),
+        "fines": solo_lectura(fines),
+        "nombres": tuple(f"{format_date_range(inicio, fin)} {fin.year}"
+                         for inicio, fin in zip(inicios.tolist(), fines.tolist())),
+        "meses": {
+            "dias_en_mes": solo_lectura(dias_en_mes),
+            "desfase": solo_lectura((primer_dia - inicio_mes).astype(np.int64)),  # Días de la semana 1 antes del día 1
+            "primera_semana": solo_lectura(primera_semana_mes),  # Posición de su semana 1 en el espacio mes-semana
+            "semanas": solo_lectura(semanas_por_mes),
+        },
+        "mes_semana": {
+            "inicios": solo_lectura(inicios_mes_semana),
+            "fines": solo_lectura(inicios_mes_semana + 6),
+            "primer_dia": solo_lectura(primer_dia[mes_idx]),
+            "ultimo_dia": solo_lectura(ultimo_dia[mes_idx]),
+            "semana_en_mes": solo_lectura(semana_en_mes),
+            "mes": solo_lectura(mes_idx),
+            "semana_eje": solo_lectura(semana_eje),
+        },
+    }
+
+def montos_dia_pago_mes_semana(dias: np.ndarray, montos: np.ndarray, eje: dict[str, Any]) -> np.ndarray:
+    """Suma, en el espacio mes-semana del eje, los pagos mensuales con día de pago"""
+    montos_por_dia = np.bincount(dias, weights=montos, minlength=32)[1:]
+    meses = eje["meses"]
+    dias = np.minimum(np.arange(1, 32), meses["dias_en_mes"][:, None])  # meses × 31
+    semanas_ms = meses["primera_semana"][:, None] + (dias - 1 + meses["desfase"][:, None]) // 7
+    return np.bincount(semanas_ms.ravel(), weights=np.broadcast_to(montos_por_dia, semanas_ms.shape).ravel(),
+                       minlength=len(eje["mes_semana"]["semana_eje"]))
+
+def montos_programados_mes_semana(libro: Libro, filas: np.ndarray, eje: dict[str, Any],
+                                  factores: np.ndarray) -> np.ndarray:
+    """Suma, en el espacio mes-semana del eje, los items seleccionados (máscara) según la regla de fechas de matriz_programada"""
+    dias = dias_de_pago(libro)
+    por_frecuencia = filas & (dias == 0)
+    montos_ms = montos_por_frecuencia(libro.codigos[por_frecuencia], libro.montos[por_frecuencia]) @ factores
+    con_dia = filas & (dias > 0)
+    if con_dia.any():
+        montos_ms += montos_dia_pago_mes_semana(dias[con_dia], libro.montos[con_dia], eje)
+    return montos_ms
+
+def distribucion_mes_semana(distribucion: np.ndarray, eje: dict[str, Any]) -> np.ndarray:
+    """Lleva distribuciones por semana del mes (… × MAX_SEMANAS_MES) al espacio mes-semana del eje.
+
+    Cada mes toma la semana de la misma posición; en su última semana se suman además
+    las semanas que no tiene (como plegar_distribucion), sin remapear lo guardado.
+    """
+    ms = eje["mes_semana"]
+    ultima = ms["semana_en_mes"] == eje["meses"]["semanas"][ms["mes"]] - 1
+    resto = np.cumsum(distribucion[..., ::-1], axis=-1)[..., ::-1]  # Suma desde cada semana hasta el final
+    return np.where(ultima, resto[..., ms["semana_en_mes"]], distribucion[..., ms["semana_en_mes"]])
+
+BLOQUE_DEUDAS = 4096  # Deudas por bloque al armar sus cargos deudas × semanas
+
+def cargos_deudas_mes_semana(gastos: Libro, posiciones: np.ndarray, eje: dict[str, Any],
+                             factores: np.ndarray) -> np.ndarray:
+    """Cargo programado de cada deuda en cada semana del espacio mes-semana (deudas × semanas)"""
+    meses = eje["meses"]
+    cargos = gastos.montos[posiciones, None] * factores[gastos.codigos[posiciones]]
+
+    dias = dias_de_pago(gastos)[posiciones]
+    personalizados = gastos.personalizada[posiciones]
+    con_dia = np.flatnonzero((dias > 0) & ~personalizados)
+    if con_dia.size:
+        dias_mes = np.minimum(dias[con_dia, None], meses["dias_en_mes"])  # deudas × meses
+        semanas = meses["primera_semana"] + (dias_mes - 1 + meses["desfase"]) // 7
+        cargos[con_dia] = 0.0
+        cargos[con_dia[:, None], semanas] = gastos.montos[posiciones[con_dia], None]
+    if personalizados.any():
+        cargos[personalizados] = distribucion_mes_semana(gastos.distribucion[posiciones[personalizados]], eje)
+    return cargos
+
+class PlanAmortizacion(TypedDict):
+    """Resultado de plan_amortizacion: estado de las deudas y su amortización mes a mes"""
+    meses: np.ndarray  # datetime64[M] de cada mes del horizonte
+    estado: EstadoDeudas
+    cargos: np.ndarray  # deudas × meses: cargo programado de cada deuda en cada mes
+    amortizacion: Amortizacion
+
+def plan_amortizacion(gastos: Libro, year: int, month: int, meses: int | None = None,
+                      referencia: tuple[int, int] | None = None) -> PlanAmortizacion:
+    """Amortiza las deudas desde el mes indicado con los mismos cargos que la proyección.
+
+    Parte del estado de las deudas al inicio de ese mes (estado_deudas_mes). Sin
+    `meses`, el horizonte alcanza el plazo restante más largo (o
+    MAX_MESES_AMORTIZACION si alguna deuda no tiene plazo) para encontrar todas las
+    fechas de liquidación.
+    """
+    estado = estado_deudas_mes(gastos, year, month, referencia)
+    if meses is None:
+        meses = int(np.clip(estado.pagos_restantes.max(initial=1), 1, MAX_MESES_AMORTIZACION))
+    eje = eje_proyeccion(year, month, meses)
+    ms = eje["mes_semana"]
+    factores = factores_gasto(ms["inicios"], ms["fines"], ms["primer_dia"], ms["ultimo_dia"])
+    cargos = np.add.reduceat(cargos_deudas_mes_semana(gastos, estado.posiciones, eje, factores),
+                             eje["meses"]["primera_semana"], axis=1)
+    return {
+        "meses": np.datetime64(f"{year:04d}-{month:02d}", "M") + np.arange(meses),
+        "estado": estado,
+        "cargos": cargos,
+        "amortizacion": amortizar(estado, cargos),
+    }
+
+class Proyeccion(TypedDict):
+    """Resultado de calcular_proyeccion: una posición por semana del eje continuo"""
+    inicios: np.ndarray  # datetime64[D]
+    fines: np.ndarray
+    nombres: tuple[str, ...]
+    ingresos: np.ndarray
+    gastos: np.ndarray
+    flujo: np.ndarray
+    saldo: np.ndarray
+
+def calcular_proyeccion(ingresos: Libro, gastos: Libro, year: int, month: int, meses: int) -> Proyeccion:
+    """Proyecta ingresos, gastos y saldo acumulado semana a semana durante `meses` meses.
+
+    No construye matrices items × semanas: los montos se agregan por frecuencia y por
+    semana del mes, por lo que la memoria depende solo del número de items más el número
+    de semanas, y el saldo sale de una única suma acumulada sobre todo el horizonte.
+    Ingresos y gastos siguen la misma regla de fechas que la vista mensual. Solo
+    las deudas, que dejan de cobrarse al terminar su plazo o liquidarse, se amortizan
+    fila por fila (por bloques de BLOQUE_DEUDAS).
+    """
+    eje = eje_proyeccion(year, month, meses)
+    ms = eje["mes_semana"]
+
+    factores = factores_gasto(ms["inicios"], ms["fines"], ms["primer_dia"], ms["ultimo_dia"])
+    ingresos_ms = montos_programados_mes_semana(ingresos, np.ones(len(ingresos), dtype=bool), eje, factores)
+
+    deudas = estado_deudas_mes(gastos, year, month)
+    fijos = np.ones(len(gastos), dtype=bool)
+    fijos[deudas.posiciones] = False
+    personalizados = gastos.personalizada & fijos
+    gastos_ms = montos_programados_mes_semana(gastos, fijos & ~personalizados, eje, factores)
+    if personalizados.any():
+        gastos_ms += distribucion_mes_semana(gastos.distribucion[personalizados].sum(axis=0), eje)
+
+    for inicio in range(0, deudas.posiciones.size, BLOQUE_DEUDAS):
+        bloque = EstadoDeudas(*(campo[inicio:inicio + BLOQUE_DEUDAS] for campo in deudas))
+        cargos = cargos_deudas_mes_semana(gastos, bloque.posiciones, eje, factores)
+        factor = amortizar(bloque, np.add.reduceat(cargos, eje["meses"]["primera_semana"], axis=1))["factor"]
+        gastos_ms += (cargos * factor[:, ms["mes"]]).sum(axis=0)
+
+    # Plegar el espacio mes-semana sobre el eje continuo de semanas
+    num_semanas = len(eje["inicios"])
+    ingresos_semana = np.bincount(ms["semana_eje"], weights=ingresos_ms, minlength=num_semanas)
+    gastos_semana = np.bincount(ms["semana_eje"], weights=gastos_ms, minlength=num_semanas)
+    flujo = ingresos_semana - gastos_semana
+
+    return {
+        "inicios": eje["inicios"],
+        "fines": eje["fines"],
+        "nombres": eje["nombres"],
+        "ingresos": ingresos_semana,
+        "gastos": gastos_semana,
+        "flujo": flujo,
+        "saldo": np.cumsum(flujo),
+    }
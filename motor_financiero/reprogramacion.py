@@ -0,0 +1,122 @@
+"""Reprogramación de gastos dentro del mes para que ninguna semana termine con saldo acumulado negativo."""
+from __future__ import annotations
+
+from itertools import product
+from typing import TYPE_CHECKING, Any, Mapping, NamedTuple, TypedDict
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from .libro import Libro
+
+class Movimiento(NamedTuple):
+    """Parte de un gasto que pasa de una semana a otra posterior del mismo mes (semanas 0-indexadas)"""
+    posicion: int  # Fila del libro de gastos
+    desde: int
+    hacia: int
+    monto: float
+
+class Reprogramacion(TypedDict):
+    """Resultado de reprogramar_gastos"""
+    movimientos: list[Movimiento]
+    matriz_gastos: np.ndarray  # items × semanas después de los movimientos
+    saldo: np.ndarray          # Saldo acumulado por semana después de los movimientos
+    deficit: float             # Saldo negativo que no se pudo corregir (0 si todas las semanas quedan ≥ 0)
+
+def gastos_movibles(gastos: Libro) -> np.ndarray:
+    """Gastos que se pueden mover entre semanas: los que no son deudas ni tienen día de pago fijo"""
+    return ~gastos.columna("Es deuda") & np.isnan(gastos.columna("Día de pago"))
+
+def _rachas_negativas(saldo: np.ndarray) -> list[tuple[int, int]]:
+    """Rachas (inicio, fin) de semanas con saldo negativo, sin la última semana del mes"""
+    negativas = np.concatenate([[False], saldo[:-1] < -1e-6, [False]])
+    cambios = np.flatnonzero(np.diff(negativas.astype(np.int8)))
+    return list(zip(cambios[::2], cambios[1::2] - 1))
+
+def _cubrir(disponible: np.ndarray, hasta: int, faltante: float) -> tuple[np.ndarray, np.ndarray, float]:
+    """Elige las celdas (item, semana ≤ hasta) más grandes hasta juntar `faltante`.
+
+    Tomar siempre las más grandes minimiza el número de movimientos para cubrir un
+    monto. Devuelve las celdas (índices planos de disponible[:, :hasta+1]), el monto
+    tomado de cada una y lo que no se pudo cubrir.
+    """
+    celdas = disponible[:, :hasta + 1].ravel()
+    orden = np.argsort(celdas, kind="stable")[::-1]
+    acumulado = np.cumsum(celdas[orden])
+    cuantas = min(int(np.searchsorted(acumulado, faltante - 1e-9)) + 1, int(np.count_nonzero(celdas)))
+    elegidas = orden[:cuantas]
+    montos = celdas[elegidas].copy()
+    if cuantas:
+        montos[-1] -= max(acumulado[cuantas - 1] - faltante, 0.0)  # La última solo aporta lo que falta
+    return elegidas, montos, max(faltante - montos.sum(), 0.0)
+
+def reprogramar_gastos(flujo: Mapping[str, Any], gastos: Libro, movibles: np.ndarray | None = None) -> Reprogramacion:
+    """Pospone partes de los gastos movibles para que el saldo acumulado no quede negativo.
+
+    Posponer un monto de la semana a a la semana b sube el saldo de las semanas a..b-1
+    sin cambiar el de las demás, así que cada racha de semanas negativas se corrige
+    llevando gastos de antes de la racha a la primera semana no negativa que la sigue.
+    Varias rachas pueden corregirse juntas con un solo destino más lejano (movimientos
+    más grandes pero menos): se prueban todas las formas de agruparlas, con la
+    selección codiciosa de las celdas más grandes en cada grupo, y se queda la que deja
+    menos déficit y luego menos movimientos. Un mes tiene a lo más 6 semanas, así que
+    las agrupaciones son pocas y el costo lo domina ordenar las celdas.
+    """
+    matriz = flujo["matriz_gastos"]
+    saldo = np.asarray(flujo["saldo"], dtype=np.float64)
+    movibles = gastos_movibles(gastos) if movibles is None else movibles
+    filas = np.flatnonzero(movibles)
+    rachas = _rachas_negativas(saldo)
+    if not rachas:
+        # Sin semanas negativas antes de la última no hay a dónde posponer: el plan queda igual
+        return {
+            "movimientos": [],
+            "matriz_gastos": matriz.astype(np.float64),
+            "saldo": saldo,
+            "deficit": float(-saldo.min(initial=0.0)),
+        }
+
+    mejor = None
+    for cortes in product((False, True), repeat=max(len(rachas) - 1, 0)):
+        # cortes[k]: la racha k cierra un grupo (la última siempre lo cierra)
+        disponible = matriz[filas].astype(np.float64)
+        movimientos, deficit = [], 0.0
+        inicio = 0
+        for k, corta in enumerate((*cortes, True)):
+            if not corta:
+                continue
+            desde, hasta = rachas[inicio][0], rachas[k][1]
+            destino = hasta + 1
+            faltante = float(-saldo[desde:destino].min())
+            elegidas, montos, sin_cubrir = _cubrir(disponible, desde, faltante)
+            item, semana = np.divmod(elegidas, desde + 1)
+            disponible[item, semana] -= montos
+            movimientos += [Movimiento(int(filas[i]), int(s), destino, float(m)) for i, s, m in zip(item, semana, montos)]
+            deficit += sin_cubrir
+            inicio = k + 1
+        clave = (deficit, len(movimientos), sum(m.monto for m in movimientos))
+        if mejor is None or clave < mejor[0]:
+            mejor = (clave, movimientos)
+
+    movimientos = mejor[1] if mejor else []
+    nueva = matriz.astype(np.float64)
+    for movimiento in movimientos:
+        nueva[movimiento.posicion, movimiento.desde] -= movimiento.monto
+        nueva[movimiento.posicion, movimiento.hacia] += movimiento.monto
+    nuevo_saldo = saldo + np.cumsum(matriz.sum(axis=0) - nueva.sum(axis=0))
+    return {
+        "movimientos": movimientos,
+        "matriz_gastos": nueva,
+        "saldo": nuevo_saldo,
+        "deficit": float(-nuevo_saldo.min(initial=0.0)),
+    }
+
+def distribuciones_reprogramadas(reprogramacion: Reprogramacion) -> tuple[list[int], list[dict[str, float]]]:
+    """Posiciones de los gastos movidos y su nueva "Distribucion semanas" ({"Semana i": monto})"""
+    posiciones = sorted({movimiento.posicion for movimiento in reprogramacion["movimientos"]})
+    distribuciones = [
+        {f"Semana {semana + 1}": float(monto) for semana, monto in enumerate(reprogramacion["matriz_gastos"][posicion])
+         if abs(monto) > 1e-9}
+        for posicion in posiciones
+    ]
+    return posiciones, distribuciones
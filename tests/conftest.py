@@ -0,0 +1,44 @@
+"""Configuración común de las pruebas del motor financiero."""
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+import pytest
+
+RAIZ = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(RAIZ))
+
+from motor_financiero import Libro  # noqa: E402
+
+# Noviembre de 2026 empieza en domingo: semanas 1-7, 8-14, 15-21, 22-28 y 29 nov-5 dic
+YEAR, MONTH = 2026, 11
+
+def gasto(nombre: str, monto: float, frecuencia: str, **campos) -> dict:
+    """Registro de gasto como los de agregar_gasto, sin deuda ni distribución personalizada salvo que se indique"""
+    registro = {
+        "Nombre": nombre,
+        "Monto": monto,
+        "Frecuencia": frecuencia,
+        "Día de pago": None,
+        "Es deuda": False,
+        "Distribucion personalizada": False,
+        "Distribucion semanas": None,
+    }
+    registro.update(campos)
+    return registro
+
+@pytest.fixture
+def ingresos() -> Libro:
+    return Libro.desde_registros("ingresos", [
+        {"Nombre": "Salario", "Monto": 1000.0, "Tipo": "Fijo", "Frecuencia": "Quincenal"},
+        {"Nombre": "Bono", "Monto": 500.0, "Tipo": "Variable", "Frecuencia": "Mensual", "Día de pago": 10},
+    ])
+
+@pytest.fixture
+def gastos() -> Libro:
+    return Libro.desde_registros("gastos", [
+        gasto("Comida", 100.0, "Semanal"),
+        gasto("Renta", 800.0, "Mensual"),
+        gasto("Café", 5.0, "Diario"),
+    ])
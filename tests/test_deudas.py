@@ -0,0 +1,73 @@
+"""Amortización de deudas contra la fórmula cerrada de la anualidad."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from conftest import MONTH, YEAR, gasto
+
+from motor_financiero import EstadoDeudas, Libro, amortizar, estado_deudas, matriz_gastos, plan_amortizacion
+
+def _estado(saldo: float, tasa_mensual: float, pagos_restantes: float) -> EstadoDeudas:
+    return EstadoDeudas(np.array([0]), np.array([saldo]), np.array([tasa_mensual]), np.array([pagos_restantes]))
+
+def test_anualidad_se_liquida_en_el_plazo():
+    principal, i, n = 10_000.0, 0.01, 12
+    cuota = principal * i / (1 - (1 + i) ** -n)
+    amortizacion = amortizar(_estado(principal, i, n), np.full((1, n), cuota))
+
+    m = np.arange(n + 1)
+    esperado = principal * (1 + i) ** m - cuota * ((1 + i) ** m - 1) / i
+    np.testing.assert_allclose(amortizacion["saldos"][0], np.maximum(esperado, 0.0), atol=1e-6)
+    np.testing.assert_allclose(amortizacion["pagos"][0], cuota)
+    np.testing.assert_allclose(amortizacion["intereses"].sum(), n * cuota - principal)
+    np.testing.assert_allclose(amortizacion["factor"][0], 1.0)
+    assert amortizacion["mes_liquidacion"][0] == n - 1
+
+def test_ultimo_pago_solo_cubre_el_saldo():
+    amortizacion = amortizar(_estado(250.0, 0.0, np.inf), np.full((1, 4), 100.0))
+    np.testing.assert_allclose(amortizacion["pagos"][0], [100, 100, 50, 0])
+    np.testing.assert_allclose(amortizacion["factor"][0], [1, 1, 0.5, 0])
+    assert amortizacion["mes_liquidacion"][0] == 2
+
+def test_pagos_se_detienen_al_agotar_el_plazo():
+    amortizacion = amortizar(_estado(np.nan, 0.0, 2), np.full((1, 4), 100.0))
+    np.testing.assert_allclose(amortizacion["pagos"][0], [100, 100, 0, 0])
+    assert amortizacion["mes_liquidacion"][0] == 1
+
+def test_estado_descuenta_los_pagos_realizados():
+    principal, i, cuota, realizados = 10_000.0, 0.01, 500.0, 6
+    gastos = Libro.desde_registros("gastos", [
+        gasto("Préstamo", cuota, "Mensual", **{"Es deuda": True, "Deuda total": principal, "Plazo (meses)": 24,
+                                              "Pagos realizados": realizados, "Tasa anual (%)": 12.0}),
+        gasto("Renta", 800.0, "Mensual"),
+    ])
+    estado = estado_deudas(gastos)
+
+    crecimiento = (1 + i) ** realizados
+    np.testing.assert_array_equal(estado.posiciones, [0])
+    np.testing.assert_allclose(estado.saldo, principal * crecimiento - cuota * (crecimiento - 1) / i)
+    np.testing.assert_allclose(estado.pagos_restantes, 24 - realizados)
+
+@pytest.mark.parametrize("meses_despues", [0, 1, 2, 4, 7])
+def test_cascada_coincide_con_el_plan_de_amortizacion(meses_despues):
+    gastos = Libro.desde_registros("gastos", [
+        gasto("Renta", 800.0, "Mensual"),
+        gasto("Préstamo", 500.0, "Mensual", **{"Día de pago": 5, "Es deuda": True, "Deuda total": 2000.0,
+                                               "Plazo (meses)": 24, "Tasa anual (%)": 12.0}),
+        gasto("Tienda", 100.0, "Semanal", **{"Es deuda": True, "Deuda total": 1500.0, "Pagos realizados": 2}),
+        gasto("Tarjeta", 200.0, "Mensual", **{"Es deuda": True, "Plazo (meses)": 5, "Distribucion personalizada": True,
+                                              "Distribucion semanas": {"Semana 1": 150.0, "Semana 6": 50.0}}),
+    ])
+    plan = plan_amortizacion(gastos, YEAR, MONTH, meses_despues + 1, referencia=(YEAR, MONTH))
+    mes = plan["meses"][-1].item()
+    pagos = plan["amortizacion"]["pagos"][:, -1]
+
+    # Desde el mismo mes de referencia, la cascada de un mes posterior cobra lo que el plan paga ese mes
+    matriz = matriz_gastos(gastos, mes.year, mes.month, referencia=(YEAR, MONTH))
+    np.testing.assert_allclose(matriz[plan["estado"].posiciones].sum(axis=1), pagos, atol=1e-9)
+    assert matriz[0].sum() == 800.0
+
+    # Y un plan que empieza en ese mes parte del saldo que le deja el plan desde la referencia
+    posterior = plan_amortizacion(gastos, mes.year, mes.month, 1, referencia=(YEAR, MONTH))
+    np.testing.assert_allclose(posterior["estado"].saldo, plan["amortizacion"]["saldos"][:, -2], atol=1e-9)
+    np.testing.assert_allclose(posterior["amortizacion"]["pagos"][:, 0], pagos, atol=1e-9)
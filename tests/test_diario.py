@@ -0,0 +1,46 @@
+"""Flujo día a día y su agregación a las semanas de la cascada."""
+from __future__ import annotations
+
+import numpy as np
+from conftest import MONTH, YEAR, gasto
+
+from motor_financiero import Libro, agregar_semanas, calcular_flujo_diario, calcular_flujo_semanal
+
+def test_sobregiro_dentro_de_la_semana():
+    ingresos = Libro.desde_registros("ingresos", [
+        {"Nombre": "Sueldo", "Monto": 1000.0, "Frecuencia": "Mensual", "Día de pago": 13},
+    ])
+    gastos = Libro.desde_registros("gastos", [gasto("Renta", 800.0, "Mensual", **{"Día de pago": 9})])
+    diario = calcular_flujo_diario(ingresos, gastos, YEAR, MONTH)
+    flujo = calcular_flujo_semanal(ingresos, gastos, YEAR, MONTH)
+
+    # La renta sale el lunes 9 y el sueldo llega el viernes 13: la semana cierra en positivo
+    assert diario["dia_minimo"] == np.datetime64("2026-11-09")
+    assert diario["saldo_minimo"] == -800.0
+    assert flujo["saldo"][1] == 200.0
+    np.testing.assert_allclose(agregar_semanas(diario["saldo"], np.min), [0, -800, 200, 200, 200])
+
+def test_distribucion_personalizada_repartida_en_los_dias_del_mes():
+    gastos = Libro.desde_registros("gastos", [
+        gasto("Súper", 170.0, "Mensual", **{"Distribucion personalizada": True,
+                                            "Distribucion semanas": {"Semana 1": 70.0, "Semana 5": 100.0}}),
+    ])
+    diario = calcular_flujo_diario(Libro("ingresos"), gastos, YEAR, MONTH)
+
+    # La semana 1 es del 1 al 7; de la semana 5 solo el 29 y el 30 son de noviembre
+    np.testing.assert_allclose(diario["gastos"][:7], 10.0)
+    np.testing.assert_allclose(diario["gastos"][28:30], 50.0)
+    np.testing.assert_allclose(diario["gastos"][30:], 0.0)
+    assert diario["gastos"].sum() == 170.0
+
+def test_semanas_agregadas_igual_a_la_cascada(ingresos, gastos):
+    gastos.agregar([
+        gasto("Súper", 400.0, "Mensual", **{"Distribucion personalizada": True,
+                                            "Distribucion semanas": {"Semana 2": 150.0, "Semana 6": 250.0}}),
+        gasto("Auto", 300.0, "Mensual", **{"Día de pago": 20, "Es deuda": True, "Deuda total": 450.0}),
+    ])
+    diario = calcular_flujo_diario(ingresos, gastos, YEAR, MONTH)
+    flujo = calcular_flujo_semanal(ingresos, gastos, YEAR, MONTH)
+    for clave in ("ingresos", "gastos", "flujo"):
+        np.testing.assert_allclose(agregar_semanas(diario[clave]), flujo[clave], atol=1e-9)
+    np.testing.assert_allclose(diario["saldo"][6::7], flujo["saldo"], atol=1e-9)
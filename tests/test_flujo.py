@@ -0,0 +1,38 @@
+"""Flujo semanal del mes contra montos calculados a mano."""
+from __future__ import annotations
+
+import numpy as np
+from conftest import MONTH, YEAR
+
+from motor_financiero import (
+    calcular_flujo_semanal,
+    calcular_ingreso_inicial_mensual,
+    inicializar_distribucion,
+    resumen_flujo_mensual,
+)
+
+def test_flujo_semanal_noviembre(ingresos, gastos):
+    flujo = calcular_flujo_semanal(ingresos, gastos, YEAR, MONTH)
+
+    # Quincenas el 15 (semana 3) y el 30 (semana 5); bono el día 10 (semana 2)
+    np.testing.assert_allclose(flujo["ingresos"], [0, 500, 1000, 0, 1000])
+    # Comida los sábados 7, 14, 21 y 28; renta el día 30; café 7 días por semana y 2 en la última
+    np.testing.assert_allclose(flujo["gastos"], [135, 135, 135, 135, 810])
+    np.testing.assert_allclose(flujo["flujo"], [-135, 365, 865, -135, 190])
+    np.testing.assert_allclose(flujo["saldo"], [-135, 230, 1095, 960, 1150])
+
+def test_resumen_materializado_igual_al_flujo(ingresos, gastos):
+    flujo = calcular_flujo_semanal(ingresos, gastos, YEAR, MONTH)
+    resumen = resumen_flujo_mensual(ingresos, gastos, YEAR, MONTH)
+    for clave in ("ingresos", "gastos", "flujo", "saldo"):
+        np.testing.assert_allclose(resumen[clave], flujo[clave])
+
+def test_ingreso_mensual_igual_a_la_suma_semanal(ingresos, gastos):
+    flujo = calcular_flujo_semanal(ingresos, gastos, YEAR, MONTH)
+    assert calcular_ingreso_inicial_mensual(ingresos, YEAR, MONTH) == flujo["ingresos"].sum() == 2500
+
+def test_distribucion_por_defecto_sigue_la_regla_de_fechas():
+    assert inicializar_distribucion(1000.0, "Quincenal", YEAR, MONTH) == {
+        "Semana 1": 0.0, "Semana 2": 0.0, "Semana 3": 1000.0, "Semana 4": 0.0, "Semana 5": 1000.0,
+    }
+    assert inicializar_distribucion(800.0, "Mensual", YEAR, MONTH, dia_pago=10)["Semana 2"] == 800.0
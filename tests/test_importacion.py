@@ -0,0 +1,55 @@
+"""Lectura y validación de archivos importados."""
+from __future__ import annotations
+
+import io
+
+import numpy as np
+import pandas as pd
+
+from motor_financiero import cargar_libro, importar_archivo, validar_bloque
+
+def test_montos_con_moneda_y_separadores():
+    bloque = pd.DataFrame({
+        "Nombre": ["Renta", "Luz", "Agua", "Gas", "Internet"],
+        "Monto": ["$1,234.50", " 80 ", "abc", "-5", None],
+        "Frecuencia": ["mensual", "Mensual", "Mensual", "Mensual", "Mensual"],
+        "Día de pago": ["5", "", "", "", ""],
+    }, dtype=object)
+    columnas, descartadas = validar_bloque("gastos", bloque)
+
+    np.testing.assert_allclose(columnas["Monto"], [1234.5, 80.0])
+    assert list(columnas["Nombre"]) == ["Renta", "Luz"]
+    assert list(columnas["Frecuencia"]) == ["Mensual", "Mensual"]
+    np.testing.assert_array_equal(columnas["Día de pago"], [5.0, np.nan])
+    assert descartadas == 3
+
+def test_columnas_de_texto_de_pandas():
+    # pandas 3 lee el texto con su propio tipo str en lugar de object
+    bloque = pd.DataFrame({"Nombre": ["Salario"], "Monto": ["$2,000"], "Frecuencia": ["Quincenal"]}).astype(str)
+    columnas, descartadas = validar_bloque("ingresos", bloque)
+    np.testing.assert_allclose(columnas["Monto"], [2000.0])
+    assert list(columnas["Tipo"]) == ["Fijo"]
+    assert descartadas == 0
+
+def test_dia_de_pago_invalido_o_no_mensual():
+    bloque = pd.DataFrame({
+        "Nombre": ["A", "B", "C"],
+        "Monto": [10, 20, 30],
+        "Frecuencia": ["Mensual", "Semanal", "Mensual"],
+        "Día de pago": [32, 3, 2.5],
+    })
+    columnas, descartadas = validar_bloque("gastos", bloque)
+    assert list(columnas["Nombre"]) == ["B"]
+    assert np.isnan(columnas["Día de pago"]).all()  # Solo los pagos mensuales conservan el día
+    assert descartadas == 2
+
+def test_importar_csv(tmp_path):
+    ruta = str(tmp_path / "finanzas.db")
+    archivo = io.BytesIO('concepto,importe,cada\nRenta,"$1,000",Mensual\nSin monto,,Mensual\n'.encode())
+    mapeo = {"Nombre": "concepto", "Monto": "importe", "Frecuencia": "cada"}
+    ids, columnas, descartadas = importar_archivo(archivo, "gastos.csv", "gastos", mapeo, ruta)
+
+    assert descartadas == 1
+    gastos = cargar_libro("gastos", ruta)
+    np.testing.assert_array_equal(gastos.ids, ids)
+    np.testing.assert_allclose(gastos.montos, [1000.0])
@@ -0,0 +1,98 @@
+"""Altas, bajas y actualizaciones del libro: la huella y los totales materializados siguen al contenido."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from conftest import MONTH, YEAR, gasto
+
+from motor_financiero import (
+    Libro,
+    aplicar_edicion,
+    cargar_libro,
+    guardar_registros,
+    inicializar_distribucion,
+    matriz_mes,
+    preparar_edicion,
+    tabla_editable,
+)
+
+def _registros(libro: Libro) -> list[dict]:
+    """Registros equivalentes al contenido del libro, para reconstruirlo desde cero"""
+    registros = libro.df.astype(object).where(libro.df.notna(), None).to_dict("records")
+    for registro, propia, fila in zip(registros, libro.personalizada, libro.distribucion):
+        registro["Distribucion semanas"] = {f"Semana {i}": monto for i, monto in enumerate(fila, start=1)} if propia else None
+    return registros
+
+def _comprobar(libro: Libro) -> None:
+    """Los totales mantenidos por deltas y la huella coinciden con los de un libro construido de cero"""
+    nuevo = Libro.desde_registros(libro.tabla, _registros(libro))
+    np.testing.assert_allclose(libro.totales_semanales(YEAR, MONTH), matriz_mes(libro, YEAR, MONTH).sum(axis=0), atol=1e-6)
+    np.testing.assert_allclose(libro.totales_semanales(YEAR, MONTH), nuevo.totales_semanales(YEAR, MONTH), atol=1e-6)
+    assert libro.huella == nuevo.huella
+
+def test_altas_bajas_y_cambios(gastos):
+    huella_inicial = gastos.huella
+    gastos.totales_semanales(YEAR, MONTH)  # Materializar antes de modificar
+    _comprobar(gastos)
+
+    gastos.agregar([
+        gasto("Gimnasio", 300.0, "Mensual", **{"Día de pago": 3}),
+        gasto("Viaje", 600.0, "Mensual", **{"Distribucion personalizada": True,
+                                            "Distribucion semanas": {"Semana 2": 200.0, "Semana 4": 400.0}}),
+    ])
+    assert gastos.huella != huella_inicial
+    _comprobar(gastos)
+
+    gastos.actualizar([1, 5], {"Monto": [150.0, 900.0], "Distribucion semanas": [None, {"Semana 6": 900.0}]})
+    _comprobar(gastos)
+    np.testing.assert_allclose(gastos.totales_semanales(YEAR, MONTH)[-1], 810 + 900)  # La semana 6 se pliega en la 5
+
+    gastos.eliminar(gastos.posiciones([2, 4]))
+    np.testing.assert_array_equal(gastos.ids, [1, 3, 5])
+    _comprobar(gastos)
+
+def test_vistas_anteriores_no_cambian(gastos):
+    montos = gastos.montos
+    gastos.actualizar([1], {"Monto": [1.0]})
+    gastos.eliminar([0])
+    np.testing.assert_allclose(montos, [100.0, 800.0, 5.0])
+
+def test_huella_no_depende_de_los_ids(gastos):
+    registros = [dict(registro, id=10 * (i + 1)) for i, registro in enumerate(_registros(gastos))]
+    assert Libro.desde_registros("gastos", registros).huella == gastos.huella
+
+def test_posiciones_de_ids_desconocidos(gastos):
+    gastos.eliminar([1])
+    np.testing.assert_array_equal(gastos.posiciones([3, 1]), [1, 0])
+    for ids in ([2], [1, 99], [0]):
+        with pytest.raises(KeyError):
+            gastos.posiciones(ids)
+    with pytest.raises(KeyError):
+        Libro("gastos").posiciones([1])
+    assert Libro("gastos").posiciones([]).size == 0
+
+def test_misma_representacion_al_agregar_y_al_recargar(tmp_path):
+    ruta = str(tmp_path / "finanzas.db")
+    # Como agregar_gasto: los gastos sin distribución personalizada también llevan la calculada para el mes
+    registros = [
+        gasto("Renta", 800.0, "Mensual", **{"Distribucion semanas": inicializar_distribucion(800.0, "Mensual", YEAR, MONTH)}),
+        gasto("Viaje", 600.0, "Mensual", **{"Distribucion personalizada": True,
+                                            "Distribucion semanas": {"Semana 2": 200.0, "Semana 4": 400.0}}),
+    ]
+    gastos = Libro("gastos")
+    gastos.agregar(guardar_registros("gastos", registros, ruta))
+
+    def comparar_con_recargado():
+        recargado = cargar_libro("gastos", ruta)
+        assert gastos.huella == recargado.huella
+        assert tabla_editable(gastos, 0, len(gastos)).equals(tabla_editable(recargado, 0, len(recargado)))
+
+    comparar_con_recargado()
+    np.testing.assert_array_equal(gastos.distribucion[0], 0.0)
+
+    # Quitar la distribución personalizada desde la tabla editable recalcula la de la regla de fechas
+    edicion = preparar_edicion(gastos, gastos.ids, {1: {"Distribucion personalizada": False}, 0: {"Monto": 900.0}},
+                               YEAR, MONTH)
+    aplicar_edicion(gastos, edicion, ruta)
+    comparar_con_recargado()
+    np.testing.assert_array_equal(gastos.distribucion, 0.0)
@@ -0,0 +1,92 @@
+"""Reprogramación de gastos para que ninguna semana antes de la última quede en negativo."""
+from __future__ import annotations
+
+import numpy as np
+import pytest
+from conftest import MONTH, RAIZ, YEAR, gasto
+
+from motor_financiero import Libro, calcular_flujo_semanal, gastos_movibles, reprogramar_gastos
+
+@pytest.fixture
+def salario() -> Libro:
+    # Quincenas en las semanas 3 y 5 de noviembre de 2026
+    return Libro.desde_registros("ingresos", [{"Nombre": "Salario", "Monto": 1000.0, "Frecuencia": "Quincenal"}])
+
+def _reprogramar(ingresos: Libro, gastos: Libro):
+    flujo = calcular_flujo_semanal(ingresos, gastos, YEAR, MONTH)
+    return flujo, reprogramar_gastos(flujo, gastos)
+
+def test_sin_semanas_negativas(salario):
+    gastos = Libro.desde_registros("gastos", [gasto("Renta", 800.0, "Mensual")])
+    flujo, resultado = _reprogramar(salario, gastos)
+    assert resultado["movimientos"] == []
+    np.testing.assert_array_equal(resultado["matriz_gastos"], flujo["matriz_gastos"])
+    np.testing.assert_array_equal(resultado["saldo"], flujo["saldo"])
+    assert resultado["deficit"] == 0.0
+
+def test_solo_la_ultima_semana_negativa(salario):
+    # Nada puede posponerse después de la última semana: el plan queda igual con su déficit
+    gastos = Libro.desde_registros("gastos", [gasto("Renta", 2500.0, "Mensual")])
+    flujo, resultado = _reprogramar(salario, gastos)
+    assert resultado["movimientos"] == []
+    np.testing.assert_array_equal(resultado["saldo"], flujo["saldo"])
+    assert resultado["deficit"] == pytest.approx(500.0)
+
+def test_semanas_negativas_se_corrigen(salario):
+    gastos = Libro.desde_registros("gastos", [
+        gasto("Comida", 800.0, "Mensual", **{"Distribucion personalizada": True,
+                                            "Distribucion semanas": {"Semana 1": 600.0, "Semana 3": 200.0}}),
+        gasto("Seguro", 100.0, "Mensual", **{"Día de pago": 2}),
+        gasto("Auto", 25.0, "Semanal", **{"Es deuda": True}),
+    ])
+    flujo, resultado = _reprogramar(salario, gastos)
+    np.testing.assert_allclose(flujo["saldo"], [-725, -750, 25, 0, 1000])
+
+    # Solo la comida se mueve (a la primera semana no negativa): el seguro tiene día fijo y el auto es deuda
+    assert resultado["movimientos"] == [(0, 0, 2, 600.0)]
+    np.testing.assert_allclose(resultado["saldo"], [-125, -150, 25, 0, 1000])
+    assert resultado["deficit"] == pytest.approx(150.0)
+    np.testing.assert_allclose(resultado["matriz_gastos"].sum(axis=1), flujo["matriz_gastos"].sum(axis=1))
+
+def test_gasto_agregado_desde_el_formulario(salario, tmp_path):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(RAIZ / "finanzas.py"), default_timeout=60)
+    at.session_state["ruta_bd"] = str(tmp_path / "finanzas.db")
+    at.session_state["year"], at.session_state["month"] = YEAR, MONTH
+    at.run()
+    at.text_input(key="gasto_nombre").input("Súper")
+    at.number_input(key="gasto_monto").set_value(800.0)
+    at.selectbox(key="gasto_frec").select("Mensual")
+    at.checkbox(key="distribucion_personalizada").check().run()
+    at.number_input(key="semana_1_monto").set_value(800.0).run()
+    next(boton for boton in at.button if boton.label == "Agregar gasto").click().run()
+    assert not at.exception
+
+    # Un gasto mensual sin día de pago fijado no guarda el día por defecto del formulario y se puede mover
+    gastos = at.session_state["gastos"]
+    assert np.isnan(gastos.columna("Día de pago")).all()
+    np.testing.assert_array_equal(gastos_movibles(gastos), [True])
+
+    flujo, resultado = _reprogramar(salario, gastos)
+    np.testing.assert_allclose(flujo["saldo"], [-800, -800, 200, 200, 1200])
+    assert resultado["movimientos"] == [(0, 0, 2, 800.0)]
+    np.testing.assert_allclose(resultado["saldo"], [0, 0, 200, 200, 1200])
+
+def test_dia_de_pago_fijado_en_el_formulario(tmp_path):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(str(RAIZ / "finanzas.py"), default_timeout=60)
+    at.session_state["ruta_bd"] = str(tmp_path / "finanzas.db")
+    at.run()
+    at.text_input(key="gasto_nombre").input("Seguro")
+    at.number_input(key="gasto_monto").set_value(200.0)
+    at.selectbox(key="gasto_frec").select("Mensual").run()
+    at.checkbox(key="gasto_fijar_dia").check().run()
+    at.number_input(key="gasto_dia_pago").set_value(5)
+    next(boton for boton in at.button if boton.label == "Agregar gasto").click().run()
+    assert not at.exception
+
+    gastos = at.session_state["gastos"]
+    np.testing.assert_array_equal(gastos.columna("Día de pago"), [5.0])
+    np.testing.assert_array_equal(gastos_movibles(gastos), [False])